@@ -1,15 +1,22 @@
+import hashlib
 import json
 import logging
 import os
 import random
+import re
 import time
 import requests
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 import dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from core.config import PromptConfig
-from core.llm import call_llm_with_tools, call_llm, LLMError
+from core.cache import TTLCache
+from core.llm import call_llm_with_tools_async, call_llm_async, call_llm_with_tools_stream_async, run_tool_calls, LLMError
+from core.llm_scheduler import PRIORITY_BACKGROUND
+from core.llm_router import TASK_CHAT, TASK_CLASSIFICATION, TASK_EXTRACTION
 from core.imgen import generate_image_with_retry, generate_image_prompt, generate_image_with_retry_smartgen
 from core.voice import transcribe_audio, speak_text
 from core.embedding import get_embedding, MessageStore, PostgresConfig, PostgresVectorStorage, EmbeddingError, SQLiteConfig, SQLiteVectorStorage, MessageData
@@ -36,6 +43,12 @@ SMALL_MODEL_ID = os.getenv("SMALL_MODEL_ID")
 TWEET_WORD_LIMITS = [15, 20, 30, 35]
 IMAGE_GENERATION_PROBABILITY = 0.3
 BASE_IMAGE_PROMPT = ""
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", 8))
+PRE_VALIDATION_CACHE_TTL = int(os.getenv("PRE_VALIDATION_CACHE_TTL", 3600))
+PRE_VALIDATION_CACHE_SIZE = int(os.getenv("PRE_VALIDATION_CACHE_SIZE", 4096))
+# Interfaces whose LLM calls are hedged by default, e.g. "api,telegram"
+LLM_HEDGE_INTERFACES = [name.strip() for name in os.getenv("LLM_HEDGE_INTERFACES", "").split(",") if name.strip()]
+PRE_VALIDATION_NOISE_PATTERN = re.compile(r"(https?://\S+|@\w+|[^\w\s])", re.UNICODE)
 
 class CoreAgent:
     def __init__(self):
@@ -46,6 +59,16 @@ class CoreAgent:
         self._lock = threading.Lock()
         self.last_tweet_id = 0
         self.last_raid_tweet_id = 0
+        self._pre_validation_cache = TTLCache(
+            max_size=PRE_VALIDATION_CACHE_SIZE,
+            ttl_seconds=PRE_VALIDATION_CACHE_TTL
+        )
+        self._filter_message_tool = None
+        self._filter_rules_version = None
+        # Blocking work (embedding HTTP calls, audio) runs here instead of on the event loop.
+        # Message store access gets its own single thread since DB connections are shared.
+        self._executor = ThreadPoolExecutor(max_workers=BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="core-agent")
+        self._storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="core-agent-storage")
 
         # Use PostgreSQL if configured, otherwise default to SQLite
         if all([os.getenv(env) for env in ["VECTOR_DB_NAME", "VECTOR_DB_USER", "VECTOR_DB_PASSWORD"]]):
@@ -64,6 +87,16 @@ class CoreAgent:
         
         self.message_store = MessageStore(storage)
     
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking function in the agent's executor without stalling the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def _run_storage(self, func, *args, **kwargs):
+        """Run a message store call in the dedicated storage thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._storage_executor, partial(func, *args, **kwargs))
+
     def register_interface(self, name, interface):
         with self._lock:
             self.interfaces[name] = interface
@@ -77,16 +110,10 @@ class CoreAgent:
             basic_options) + ' ' + ' '.join(style_options)
         return system_prompt
     
-    async def pre_validation(self, message: str) -> bool:
-        """
-        Pre-validation of the message
-        
-        Args:
-            message: The user's message
-            
-        Returns:
-            True if the message is valid, False otherwise
-        """
+    def _get_filter_message_tool(self) -> List[Dict[str, Any]]:
+        """Build the filter_message tool once and derive the filter-rule version from it"""
+        if self._filter_message_tool is not None:
+            return self._filter_message_tool
         name = self.prompt_config.get_name()
         filter_message_tool = [
             {
@@ -120,26 +147,85 @@ class CoreAgent:
                 }
             }
         ]
+        rules = json.dumps(filter_message_tool, sort_keys=True) + str(SMALL_MODEL_ID)
+        self._filter_rules_version = hashlib.sha256(rules.encode("utf-8")).hexdigest()[:16]
+        self._filter_message_tool = filter_message_tool
+        return filter_message_tool
+
+    @staticmethod
+    def _normalize_message(message: str) -> str:
+        """Normalize message text so trivially different copies share a cache entry"""
+        return " ".join(message.casefold().split())
+
+    def _prefilter_message(self, normalized_message: str) -> Optional[bool]:
+        """
+        Cheap local rules for the unambiguous filter_message cases; whether a message
+        discusses the listed topics is left to the model
+        
+        Args:
+            normalized_message: The normalized user message
+            
+        Returns:
+            True/False when the decision is obvious, None if the LLM should decide
+        """
+        name = self.prompt_config.get_name().casefold()
+        if name and re.search(rf"(?<!\w){re.escape(name)}(?!\w)", normalized_message):
+            return True
+        if re.search(r"\bstart raid\b", normalized_message):
+            return True
+        # Nothing left after stripping links, mentions and punctuation: nothing to reply to
+        if not PRE_VALIDATION_NOISE_PATTERN.sub("", normalized_message).strip():
+            return False
+        return None
+
+    async def pre_validation(self, message: str) -> bool:
+        """
+        Pre-validation of the message
+        
+        Args:
+            message: The user's message
+            
+        Returns:
+            True if the message is valid, False otherwise
+        """
+        filter_message_tool = self._get_filter_message_tool()
+        normalized_message = self._normalize_message(message or "")
+        prefiltered = self._prefilter_message(normalized_message)
+        if prefiltered is not None:
+            logger.debug(f"Pre-validation decided locally: {prefiltered}")
+            return prefiltered
+
+        cache_key = (
+            self._filter_rules_version,
+            hashlib.sha256(normalized_message.encode("utf-8")).hexdigest()
+        )
+        cached = self._pre_validation_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Pre-validation cache hit: {cached}")
+            return cached
+
         try:
-            response = call_llm_with_tools(
+            response = await call_llm_with_tools_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY, 
                 SMALL_MODEL_ID,
                 system_prompt="",#"Always call the filter_message tool with the message as the argument",#self.prompt_config.get_telegram_rules(),
                 user_prompt=message,
                 temperature=0.5,
-                tools=filter_message_tool
+                tools=filter_message_tool,
+                task=TASK_CLASSIFICATION
             )
             print(response)
             #response = response.lower()
             #validation = False if "false" in response else True if "true" in response else False
             validation = False
             if 'tool_calls' in response and response['tool_calls']:
-                tool_call = response['tool_calls']
+                tool_call = response['tool_calls'][0]
                 args = json.loads(tool_call.function.arguments)
                 filter_result = str(args['should_ignore']).lower()
                 validation = False if filter_result == "true" else True
             print("validation: ", validation)
+            self._pre_validation_cache.set(cache_key, validation)
             return validation
         except Exception as e:
             logger.error(f"Pre-validation failed: {str(e)}")
@@ -150,7 +236,7 @@ class CoreAgent:
         prompt = self.prompt_config.get_template_image_prompt().format(tweet=message)
         logger.info("Prompt: %s", prompt)
         try:
-            image_prompt = call_llm(
+            image_prompt = await call_llm_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY, 
                 SMALL_MODEL_ID,
@@ -200,7 +286,7 @@ class CoreAgent:
             Transcribed text
         """
         try:
-            return transcribe_audio(audio_file_path)
+            return await self._run_blocking(transcribe_audio, audio_file_path)
         except Exception as e:
             logger.error(f"Voice transcription failed: {str(e)}")
             raise
@@ -216,11 +302,151 @@ class CoreAgent:
             Path to generated audio file
         """
         try:
-            return speak_text(text)
+            return await self._run_blocking(speak_text, text)
         except Exception as e:
             logger.error(f"Text-to-speech conversion failed: {str(e)}")
             raise
 
+    def _should_pre_validate(self, source_interface: str) -> bool:
+        return source_interface not in [
+            "api", "twitter", "twitter_reply", "farcaster", "farcaster_reply", "telegram",
+            "terminal"
+        ]
+
+    def _should_hedge(self, source_interface: str) -> bool:
+        # Hedging trades extra requests for tail latency, so it is opt-in per interface
+        return source_interface in LLM_HEDGE_INTERFACES
+
+    async def _build_prompt_context(self,
+                                    message: str,
+                                    message_type: str,
+                                    chat_id: str,
+                                    system_prompt: str,
+                                    skip_similar: bool,
+                                    skip_conversation_context: bool):
+        """
+        Build the full system prompt for a message
+        
+        Returns:
+            tuple: (system_prompt, message_embedding)
+        """
+        if system_prompt is None:
+            system_prompt = self.basic_personality_settings()
+            
+        system_prompt = self.prompt_config.get_system_prompt() + system_prompt
+
+        message_embedding = await self._run_blocking(get_embedding, message)
+        logger.info(f"Generated embedding for message: {message[:50]}...")
+        system_prompt_context = await self._run_storage(self.get_knowledge_base, message, message_embedding)
+        
+        if not skip_conversation_context:
+            system_prompt += await self._run_storage(self.get_conversation_context, chat_id)
+
+        if not skip_similar:
+            system_prompt_context += await self._run_storage(self.get_similar_messages, message, message_embedding, message_type, chat_id)
+                
+        system_prompt += system_prompt_context
+        return system_prompt, message_embedding
+
+    async def _run_tool_calls(self, tool_calls):
+        """
+        Execute the tool calls returned by the LLM, concurrently (see core.llm.run_tool_calls)
+        
+        Returns:
+            tuple: (text_to_append, image_url, tool_back) with the results appended in call order.
+            tool_back is the JSON record of the call, or a JSON list of records for several calls.
+        """
+        text_response = ""
+        image_url = None
+
+        async def execute(tool_name, args):
+            if not self.tools.has_tool(tool_name):
+                logger.info(f"Tool {tool_name} not found in tools config")
+                return {'tool_call': json.dumps({
+                    "tool_call": tool_name,
+                    "processed": False,
+                    "args": args
+                }, default=str)}  # default=str handles any non-JSON serializable objects
+            logger.info(f"Executing tool {tool_name} with args {args}")
+            return await self.tools.execute_tool(tool_name, args, self)
+
+        # Tools.execute_tool enforces each tool's own deadline
+        results = await run_tool_calls(tool_calls, execute, timeout=None)
+        tool_backs = []
+        for tool_call, tool_result in zip(tool_calls, results):
+            # gather(return_exceptions=True) also returns a cancelled call's CancelledError
+            if isinstance(tool_result, BaseException):
+                logger.error(f"Tool {tool_call.function.name} failed: {tool_result!r}")
+                tool_backs.append(json.dumps({
+                    "tool_call": tool_call.function.name,
+                    "processed": False,
+                    "args": tool_call.function.arguments,
+                    "error": str(tool_result) or type(tool_result).__name__
+                }, default=str))
+            elif tool_result:
+                print("tool_result: ", tool_result)
+                if 'image_url' in tool_result:
+                    image_url = tool_result['image_url']
+                if 'result' in tool_result:
+                    text_response += f"\n{tool_result['result']}"
+                if 'tool_call' in tool_result:
+                    tool_backs.append(tool_result['tool_call'])
+        if not tool_backs:
+            return text_response, image_url, None
+        tool_back = tool_backs[0] if len(tool_backs) == 1 else f"[{', '.join(tool_backs)}]"
+        return text_response, image_url, tool_back
+
+    async def _store_exchange(self,
+                              message: str,
+                              message_embedding: List[float],
+                              text_response: str,
+                              message_type: str,
+                              chat_id: str,
+                              source_interface: str,
+                              tool_back: Optional[str]) -> None:
+        """Store the incoming message and the agent response with their embeddings"""
+        # Create MessageData for incoming message
+        message_data = MessageData(
+            message=message,
+            embedding=message_embedding,
+            timestamp=datetime.now().isoformat(),
+            message_type=message_type,
+            chat_id=chat_id,
+            source_interface=source_interface,
+            original_query=None,
+            original_embedding=None,
+            response_type=None,
+            key_topics=None, 
+            tool_call=None
+        )
+        
+        # Store the incoming message
+        await self._run_storage(self.message_store.add_message, message_data)
+        logger.info("Stored message and embedding in database")
+        # Embedding, classification and topic extraction are independent, run them together
+        response_embedding, response_type, key_topics = await asyncio.gather(
+            self._run_blocking(get_embedding, text_response),
+            self._classify_response_type(text_response),
+            self._extract_key_topics(text_response)
+        )
+        # Create and store MessageData for the response
+        response_data = MessageData(
+            message=text_response,
+            embedding=response_embedding,
+            timestamp=datetime.now().isoformat(),
+            message_type="agent_response",
+            chat_id=chat_id,
+            source_interface=source_interface,
+            original_query=message,
+            original_embedding=message_embedding,
+            response_type=response_type,
+            key_topics=key_topics,
+            tool_call=tool_back
+        )
+        
+        # Store the response
+        await self._run_storage(self.message_store.add_message, response_data)
+
     async def handle_message(self, 
                              message: str, 
                              message_type: str = "user_message",
@@ -236,7 +462,8 @@ class CoreAgent:
                              model_id: str = LARGE_MODEL_ID,
                              temperature: float = 0.4,
                              skip_pre_validation: bool = False,
-                             tool_choice: str = "auto"
+                             tool_choice: str = "auto",
+                             hedge: bool = None
                              ):
         """
         Handle message and optionally notify other interfaces.        
@@ -247,6 +474,7 @@ class CoreAgent:
             skip_validation: Optional flag to skip pre-validation
             skip_embedding: Optional flag to skip embedding
             skip_tools: Optional flag to skip tools
+            hedge: Hedge slow LLM calls (see core.llm). Defaults to on for interfaces in LLM_HEDGE_INTERFACES
 
         Returns:
             tuple: (text_response, image_url, tool_back)
@@ -257,36 +485,16 @@ class CoreAgent:
         chat_id = str(chat_id)
         self.current_message = message
 
-        system_prompt_context = ""
-        system_prompt_conversation_context = ""
-
-        if system_prompt is None:
-            system_prompt = self.basic_personality_settings()
-            
-        system_prompt = self.prompt_config.get_system_prompt() + system_prompt
-
-        do_pre_validation = False if source_interface in [
-            "api", "twitter", "twitter_reply", "farcaster", "farcaster_reply", "telegram",
-            "terminal"
-        ] else True
-        if not skip_pre_validation and do_pre_validation and not await self.pre_validation(message):
+        if not skip_pre_validation and self._should_pre_validate(source_interface) and not await self.pre_validation(message):
             logger.debug(f"Message failed pre-validation: {message[:100]}...")
             return None, None, None
         
         try:
-            message_embedding = get_embedding(message)
-            logger.info(f"Generated embedding for message: {message[:50]}...")
-            system_prompt_context = self.get_knowledge_base(message, message_embedding)
-            
-            if not skip_conversation_context:
-                system_prompt += self.get_conversation_context(chat_id)
-
-            if not skip_similar:
-                system_prompt_context += self.get_similar_messages(message, message_embedding, message_type, chat_id)
-                    
-            system_prompt += system_prompt_context
+            system_prompt, message_embedding = await self._build_prompt_context(
+                message, message_type, chat_id, system_prompt, skip_similar, skip_conversation_context
+            )
             
-            response = call_llm_with_tools(
+            response = await call_llm_with_tools_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY,
                 model_id,
@@ -295,7 +503,9 @@ class CoreAgent:
                 temperature=temperature,
                 max_tokens=max_tokens,
                 tools=self.tools.get_tools_config() + external_tools if not skip_tools else None,
-                tool_choice=tool_choice if not skip_tools else None
+                tool_choice=tool_choice if not skip_tools else None,
+                hedge=self._should_hedge(source_interface) if hedge is None else hedge,
+                task=TASK_CHAT
             )
             
             # Process response and handle tools
@@ -313,70 +523,14 @@ class CoreAgent:
             # Handle tool calls
             
             if 'tool_calls' in response and response['tool_calls']:
-                tool_call = response['tool_calls']
-                args = json.loads(tool_call.function.arguments)
-                tool_name = tool_call.function.name
-                available_tools = [t["function"]["name"] for t in self.tools.get_tools_config()]
-                if tool_name in available_tools:
-                    logger.info(f"Executing tool {tool_name} with args {args}")
-                    tool_result = await self.tools.execute_tool(
-                        tool_name,
-                        args,
-                        self
-                    )
-                    if tool_result:
-                        print("tool_result: ", tool_result)
-                        if 'image_url' in tool_result:
-                            image_url = tool_result['image_url']
-                        if 'result' in tool_result:
-                            text_response += f"\n{tool_result['result']}"
-                        if 'tool_call' in tool_result:
-                            tool_back = tool_result['tool_call']
-                else:
-                    logger.info(f"Tool {tool_name} not found in tools config")
-                    tool_back = json.dumps({
-                        "tool_call": tool_name,
-                        "processed": False,
-                        "args": args
-                    }, default=str)  # default=str handles any non-JSON serializable objects
+                tool_text, image_url, tool_back = await self._run_tool_calls(response['tool_calls'])
+                text_response += tool_text
             
             if not skip_embedding:
                 #moved to post post processing as it is not relevant until finished processing
-                # Create MessageData for incoming message
-                message_data = MessageData(
-                    message=message,
-                    embedding=message_embedding,
-                    timestamp=datetime.now().isoformat(),
-                    message_type=message_type,
-                    chat_id=chat_id,
-                    source_interface=source_interface,
-                    original_query=None,
-                    original_embedding=None,
-                    response_type=None,
-                    key_topics=None, 
-                    tool_call=None
+                await self._store_exchange(
+                    message, message_embedding, text_response, message_type, chat_id, source_interface, tool_back
                 )
-                
-                # Store the incoming message
-                self.message_store.add_message(message_data)
-                logger.info("Stored message and embedding in database")
-                # Create and store MessageData for the response
-                response_data = MessageData(
-                    message=text_response,
-                    embedding=get_embedding(text_response),
-                    timestamp=datetime.now().isoformat(),
-                    message_type="agent_response",
-                    chat_id=chat_id,
-                    source_interface=source_interface,
-                    original_query=message,
-                    original_embedding=message_embedding,
-                    response_type=await self._classify_response_type(text_response),
-                    key_topics=await self._extract_key_topics(text_response),
-                    tool_call=tool_back
-                )
-                
-                # Store the response
-                self.message_store.add_message(response_data)
             
             # Notify other interfaces if needed
             # if source_interface and chat_id:
@@ -398,6 +552,88 @@ class CoreAgent:
         except Exception as e:
             logger.error(f"Message handling failed: {str(e)}")
             return "Sorry, something went wrong.", None, None
+
+    async def handle_message_stream(self, 
+                                    message: str, 
+                                    message_type: str = "user_message",
+                                    source_interface: str = None, 
+                                    chat_id: str = None, 
+                                    system_prompt: str = None, 
+                                    skip_embedding: bool = False, 
+                                    skip_similar: bool = True,
+                                    skip_tools: bool = False,
+                                    skip_conversation_context: bool = True,
+                                    external_tools: List[str] = [],
+                                    max_tokens: int = None,
+                                    model_id: str = LARGE_MODEL_ID,
+                                    temperature: float = 0.4,
+                                    skip_pre_validation: bool = False,
+                                    tool_choice: str = "auto",
+                                    hedge: bool = None
+                                    ):
+        """
+        Streaming variant of handle_message. Takes the same arguments.
+        
+        Yields:
+            dict: {'type': 'text', 'content': delta} while the response is generated,
+            then a single {'type': 'done', 'text': ..., 'image_url': ..., 'tool_call': ...}.
+            Nothing is yielded if the message fails pre-validation.
+        """
+        logger.info(f"Handling streamed message from {source_interface}")
+
+        chat_id = str(chat_id)
+        self.current_message = message
+
+        if not skip_pre_validation and self._should_pre_validate(source_interface) and not await self.pre_validation(message):
+            logger.debug(f"Message failed pre-validation: {message[:100]}...")
+            return
+
+        text_response = ""
+        image_url = None
+        tool_back = None
+        try:
+            system_prompt, message_embedding = await self._build_prompt_context(
+                message, message_type, chat_id, system_prompt, skip_similar, skip_conversation_context
+            )
+
+            response = None
+            async for event in call_llm_with_tools_stream_async(
+                HEURIST_BASE_URL,
+                HEURIST_API_KEY,
+                model_id,
+                system_prompt=system_prompt,
+                user_prompt=message,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                tools=self.tools.get_tools_config() + external_tools if not skip_tools else None,
+                tool_choice=tool_choice if not skip_tools else None,
+                hedge=self._should_hedge(source_interface) if hedge is None else hedge,
+                task=TASK_CHAT
+            ):
+                if event['type'] == 'content':
+                    text_response += event['content']
+                    yield {'type': 'text', 'content': event['content']}
+                else:
+                    response = event['response']
+
+            if isinstance(response, dict) and response.get('tool_calls'):
+                tool_text, image_url, tool_back = await self._run_tool_calls(response['tool_calls'])
+                if tool_text:
+                    text_response += tool_text
+                    yield {'type': 'text', 'content': tool_text}
+
+            if not skip_embedding:
+                await self._store_exchange(
+                    message, message_embedding, text_response, message_type, chat_id, source_interface, tool_back
+                )
+        except LLMError as e:
+            logger.error(f"LLM processing failed: {str(e)}")
+            text_response = "Sorry, I encountered an error processing your message."
+        except Exception as e:
+            logger.error(f"Message handling failed: {str(e)}")
+            text_response = "Sorry, something went wrong."
+
+        yield {'type': 'done', 'text': text_response, 'image_url': image_url, 'tool_call': tool_back}
         
     async def agent_cot(self, message: str, user: str = "User", display_name: str = None, chat_id: str = "General", source_interface: str = "None", final_format_prompt: str = "") -> str:
         message_info = message,
@@ -645,13 +881,16 @@ class CoreAgent:
             "content": "Classify this response as one of: FACTUAL, OPINION, QUESTION, EMOTIONAL, ACTION. Response:"
         }
         try:
-            classification = await call_llm(
+            classification = await call_llm_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY,
                 SMALL_MODEL_ID,  # Use smaller model for classification
                 system_prompt=classify_prompt["content"],
                 user_prompt=response,
-                temperature=0.3
+                temperature=0.3,
+                use_cache=True,
+                priority=PRIORITY_BACKGROUND,
+                task=TASK_CLASSIFICATION
             )
             return classification.strip().upper()
         except:
@@ -664,13 +903,15 @@ class CoreAgent:
             "content": "Extract 2-3 main topics from this text as comma-separated keywords:"
         }
         try:
-            topics = await call_llm(
+            topics = await call_llm_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY,
                 SMALL_MODEL_ID,
                 system_prompt=topic_prompt["content"],
                 user_prompt=text,
-                temperature=0.3
+                temperature=0.3,
+                priority=PRIORITY_BACKGROUND,
+                task=TASK_EXTRACTION
             )
             return [t.strip() for t in topics.split(',')]
         except:
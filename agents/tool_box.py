@@ -1,6 +1,10 @@
 from typing import List, Dict, Any, Optional, Callable
 import logging
 from .tool_decorator import get_tool_schemas, tool
+from clients.binance_client import get_binance_client
+from clients.defillama_client import get_defillama_client
+from clients.tvl_store import get_tvl_store
+import asyncio
 import aiohttp
 
 logger = logging.getLogger(__name__)
@@ -39,11 +43,12 @@ class ToolBox:
             self.get_crypto_price, 
             self.handle_image_generation,
             self.generate_image_prompt_for_posts,
-            self.get_current_time
+            self.get_current_time,
+            self.compare_chain_tvl
         ]
 
     @staticmethod
-    @tool("Generate an image based on a text prompt")
+    @tool("Generate an image based on a text prompt", max_concurrency=2)
     #async def handle_image_generation(self, args: Dict[str, Any], agent_context: Any) -> Dict[str, Any]: #example for explicitly defined schema
     async def handle_image_generation(prompt: str, agent_context: Any) -> Dict[str, Any]:
         """Generate an image based on a text prompt. Use this tool only when the user explicitly requests to create an image."""
@@ -57,7 +62,8 @@ class ToolBox:
 
     
     @staticmethod
-    @tool("Get the current or historical price of a cryptocurrency in USD")
+    # Not cached here: BinanceClient caches prices and prefers fresher websocket prices
+    @tool("Get the current or historical price of a cryptocurrency in USD", max_concurrency=16)
     async def get_crypto_price(ticker: str, timestamp: Optional[str] = None) -> Dict[str, Any]:
         """
         Get the current or historical price of a cryptocurrency in USD from Binance.
@@ -71,61 +77,44 @@ class ToolBox:
         """
         try:
             normalized_ticker = f"{ticker.upper()}USDT"
+            client = get_binance_client()
             
             if timestamp is None:
-                # Get current price (existing logic)
-                async with aiohttp.ClientSession() as session:
-                    url = f"https://api.binance.com/api/v3/ticker/price?symbol={normalized_ticker}"
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            price = float(data['price'])
-                            logger.info(f"The current price for {normalized_ticker}: ${price:.2f}")
-                            return {"result": f"The current price for {normalized_ticker}: ${price:.2f}"}
+                # Get current price, from the price feed or a briefly cached quote
+                price = await client.get_spot_price(normalized_ticker)
+                logger.info(f"The current price for {normalized_ticker}: ${price:.2f}")
+                return {"result": f"The current price for {normalized_ticker}: ${price:.2f}"}
             else:
                 # Get historical price
                 from datetime import datetime
-                import time
                 
                 # Convert timestamp to milliseconds
                 dt = datetime.fromisoformat(timestamp)
                 timestamp_ms = int(dt.timestamp() * 1000)
                 
-                async with aiohttp.ClientSession() as session:
-                    # Get klines (candlestick) data around the specified time
-                    url = f"https://api.binance.com/api/v3/klines"
-                    params = {
-                        "symbol": normalized_ticker,
-                        "interval": "1m",  # 1 minute interval
-                        "startTime": timestamp_ms - 60000,  # 1 minute before
-                        "endTime": timestamp_ms + 60000,    # 1 minute after
-                        "limit": 1
-                    }
-                    
-                    async with session.get(url, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if data:
-                                price = float(data[0][4])  # Close price
-                                logger.info(f"The price for {normalized_ticker} at {timestamp}: ${price:.2f}")
-                                return {"result": f"The price for {normalized_ticker} at {timestamp}: ${price:.2f}"}
-                            return {"error": f"No price data available for {normalized_ticker} at {timestamp}"}
-            
-            error_msg = f"Failed to get price for {normalized_ticker}"
-            logger.error(error_msg)
-            return {"error": error_msg}
+                # Close of the 1 minute kline (candlestick) around the specified time
+                price = await client.get_historical_price(normalized_ticker, timestamp_ms)
+                if price is not None:
+                    logger.info(f"The price for {normalized_ticker} at {timestamp}: ${price:.2f}")
+                    return {"result": f"The price for {normalized_ticker} at {timestamp}: ${price:.2f}"}
+                return {"error": f"No price data available for {normalized_ticker} at {timestamp}", "invalid_input": True}
                         
+        except aiohttp.ClientResponseError as e:
+            error_msg = f"Failed to get price for {normalized_ticker}"
+            logger.error(f"{error_msg}: {e.status}")
+            # Binance answers 400 for unknown symbols; that is the caller's ticker, not an outage
+            return {"error": error_msg, "invalid_input": e.status == 400}
         except ValueError as ve:
             error_msg = f"Invalid timestamp format. Please use ISO format (e.g., '2024-03-20 14:30:00'): {str(ve)}"
             logger.error(error_msg)
-            return {"error": error_msg}
+            return {"error": error_msg, "invalid_input": True}
         except Exception as e:
             error_msg = f"Error getting crypto price: {str(e)}"
             logger.error(error_msg)
             return {"error": error_msg}
 
     @staticmethod
-    @tool("Generate an image prompt based on text input")
+    @tool("Generate an image prompt based on text input", cache_ttl=3600, max_concurrency=4)
     async def generate_image_prompt_for_posts(text: str, agent_context: Any) -> Dict[str, str]:
         """
         Generate a detailed image prompt using the core agent's image prompt generator.
@@ -148,6 +137,7 @@ class ToolBox:
             return {"error": str(e)}
 
     @staticmethod
+    # Not cached: the result changes every second
     @tool("Get the current time in ISO format")
     async def get_current_time() -> Dict[str, str]:
         """
@@ -162,4 +152,49 @@ class ToolBox:
             return {"result": current_time}
         except Exception as e:
             logger.error(f"Error getting current time: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+    @staticmethod
+    # Not cached here: the local TVL store already answers from disk between refreshes
+    @tool("Compare the current TVL of blockchains and how it changed over the last day, week and month", max_concurrency=4)
+    async def compare_chain_tvl(chains: str) -> Dict[str, Any]:
+        """
+        Compare total value locked (TVL) across blockchains using DefiLlama history.
+
+        Args:
+            chains: Comma-separated chain names as used by DefiLlama (e.g. 'Ethereum, Solana, Arbitrum')
+
+        Returns:
+            Dict with the latest TVL and its 1d/7d/30d percent change for each chain
+        """
+        names = [name.strip() for name in chains.split(",") if name.strip()]
+        if not names:
+            return {"error": "No chains given", "invalid_input": True}
+        store = get_tvl_store()
+        client = get_defillama_client()
+        refreshed = await asyncio.gather(*(store.refresh(name, client) for name in names), return_exceptions=True)
+        for name, outcome in zip(names, refreshed):
+            if isinstance(outcome, BaseException):
+                # Answer from whatever history is already stored
+                logger.warning(f"Failed to refresh TVL for {name}: {outcome}")
+
+        day = 86400
+        comparison = {}
+        for name in names:
+            _, values = store.series(name)
+            if not len(values):
+                comparison[name] = None
+                continue
+            comparison[name] = {
+                "tvl": float(values[-1]),
+                "pct_change_1d": store.change_over(name, day),
+                "pct_change_7d": store.change_over(name, 7 * day),
+                "pct_change_30d": store.change_over(name, 30 * day)
+            }
+        if all(entry is None for entry in comparison.values()):
+            errors = [outcome for outcome in refreshed if isinstance(outcome, BaseException)]
+            # DefiLlama answers 4xx for unknown chains; that is the caller's input, not an outage
+            unknown = all(isinstance(e, aiohttp.ClientResponseError) and e.status < 500 for e in errors)
+            message = f"Failed to get TVL history: {errors[0]}" if errors else f"No TVL history for {', '.join(names)}"
+            return {"error": message, "invalid_input": unknown}
+        return {"result": comparison}
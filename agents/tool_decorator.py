@@ -1,11 +1,48 @@
+import asyncio
 import inspect
-from typing import Callable, Dict, Any
+import json
+import logging
+import os
+import weakref
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Optional
+from core import metrics
+from core.cache import get_default_cache
 
+logger = logging.getLogger(__name__)
 
-def tool(description: str):
+# How long results of deterministic tools without a cache_ttl are kept
+TOOL_CACHE_DETERMINISTIC_TTL = float(os.getenv("TOOL_CACHE_DETERMINISTIC_TTL", 86400))
+
+TOOL_CACHE_TOTAL = metrics.get_registry().counter("tool_cache_total", "Tool result cache lookups, by tool and outcome")
+
+# Deadline of one tool execution, set by Tools.execute_tool. It starts once the call holds a
+# max_concurrency slot, so time spent queued behind other calls never counts as a timeout.
+execution_timeout: ContextVar[Optional[float]] = ContextVar("tool_execution_timeout", default=None)
+
+_MISSING = object()
+
+def _default_cache_key(args: Dict[str, Any]) -> str:
+    return json.dumps({name: value for name, value in args.items() if name != "agent_context"}, sort_keys=True, default=str)
+
+def tool(description: str,
+         cache_ttl: Optional[float] = None,
+         cache_key: Optional[Callable[[Dict[str, Any]], str]] = None,
+         deterministic: bool = False,
+         max_concurrency: Optional[int] = None):
     """
     A decorator factory that creates a tool decorator with a specified description.
+
+    Results are memoized in the shared cache from core.cache.get_default_cache() when the
+    tool sets cache_ttl (seconds) or is deterministic, i.e. its result depends only on its
+    arguments; deterministic tools without a cache_ttl are kept for TOOL_CACHE_DETERMINISTIC_TTL.
+    The key is cache_key(args), or by default the arguments except agent_context. Results
+    with an 'error' are not cached. max_concurrency caps how many calls run at once; the
+    execution_timeout deadline applies from when a call gets to run.
     """
+    ttl = cache_ttl if cache_ttl is not None else TOOL_CACHE_DETERMINISTIC_TTL if deterministic else None
+    make_key = cache_key or _default_cache_key
+
     def decorator(func):
         # Add metadata to the function
         func.name = func.__name__
@@ -29,17 +66,58 @@ def tool(description: str):
             ]
         }
         
+        # Semaphores are bound to an event loop, so there is one per loop
+        semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+        async def run(args: Dict[str, Any]):
+            return await func(**args) if inspect.iscoroutinefunction(func) else func(**args)
+
+        async def call(args: Dict[str, Any]):
+            timeout = execution_timeout.get()
+            if not max_concurrency:
+                return await asyncio.wait_for(run(args), timeout)
+            loop = asyncio.get_running_loop()
+            semaphore = semaphores.get(loop)
+            if semaphore is None:
+                semaphore = semaphores[loop] = asyncio.Semaphore(max_concurrency)
+            async with semaphore:
+                return await asyncio.wait_for(run(args), timeout)
+
         async def wrapper(args: Dict[str, Any], agent_context: Any):
             # Remove agent_context from args if it exists
             if "agent_context" in args:
                 args["agent_context"] = agent_context   
-            result = await func(**args) if inspect.iscoroutinefunction(func) else func(**args)
+            if not ttl:
+                return await call(args)
+
+            cache = get_default_cache()
+            key = f"tool:{func.__module__}.{func.__qualname__}:{make_key(args)}"
+            result = await asyncio.to_thread(cache.get, key, _MISSING) if cache.blocking else cache.get(key, _MISSING)
+            if result is not _MISSING:
+                TOOL_CACHE_TOTAL.inc(tool=func.name, outcome="hit")
+                return dict(result) if isinstance(result, dict) else result
+            TOOL_CACHE_TOTAL.inc(tool=func.name, outcome="miss")
+
+            result = await call(args)
+            if not (isinstance(result, dict) and "error" in result):
+                # Store a copy; callers such as Tools.execute_tool add keys to the result
+                value = dict(result) if isinstance(result, dict) else result
+                try:
+                    if cache.blocking:
+                        await asyncio.to_thread(cache.set, key, value, ttl)
+                    else:
+                        cache.set(key, value, ttl)
+                except Exception as e:
+                    logger.warning(f"Failed to cache result of tool {func.name}: {e}")
             return result
             
         wrapper.name = func.name
         wrapper.description = func.description
         wrapper.args_schema = func.args_schema
         wrapper.original = func
+        wrapper.cache_ttl = ttl
+        wrapper.max_concurrency = max_concurrency
+        wrapper.applies_timeout = True
         
         return wrapper
     return decorator
@@ -1,31 +1,123 @@
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
+import asyncio
 import logging
+import os
 import requests
 import json
-from .tool_decorator import get_tool_schemas
+import threading
+import time
+from core import metrics
+from .tool_decorator import convert_to_function_schema, execution_timeout
 from .tool_box import ToolBox
 from .tool_decorator_example import DECORATED_TOOLS_EXAMPLES
 
 logger = logging.getLogger(__name__)
 
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", 30)) or None
+# Per-tool overrides of TOOL_TIMEOUT, as name=seconds pairs separated by commas
+TOOL_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, _, seconds in (pair.partition("=") for pair in os.getenv("TOOL_TIMEOUTS", "handle_image_generation=120").split(","))
+    if name.strip() and seconds
+}
+TOOL_BREAKER_FAILURES = int(os.getenv("TOOL_BREAKER_FAILURES", 5))
+TOOL_BREAKER_RESET = float(os.getenv("TOOL_BREAKER_RESET", 30))
+
+_registry = metrics.get_registry()
+TOOL_SECONDS = _registry.histogram("tool_seconds", "Execution time of agent tools, by tool")
+TOOL_CALLS_TOTAL = _registry.counter("tool_calls_total", "Agent tool executions, by tool and outcome")
+TOOL_OUTCOMES = ("ok", "invalid_input", "error", "timeout", "exception", "rejected")
+# Outcomes that say the tool itself is failing; they count towards its circuit breaker
+TOOL_FAILURE_OUTCOMES = ("error", "timeout", "exception")
+
+class CircuitBreaker:
+    """
+    Stops calling a failing tool for a while.
+
+    After failure_threshold consecutive failures the breaker opens and calls are rejected
+    for reset_timeout seconds. Then a single trial call is let through: success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = TOOL_BREAKER_FAILURES, reset_timeout: float = TOOL_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_ignored(self) -> None:
+        """The call says nothing about the tool's health, e.g. it was cancelled or given bad input"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
 class Tools(ToolBox):
+    """
+    Tool registry. Schemas are compiled once when a tool is registered; the full tool list,
+    filtered views of it and its JSON form are built on first use and reused until the
+    registry changes. Returned configs are shared, so callers must not modify them.
+
+    execute_tool runs each tool under a deadline (TOOL_TIMEOUT, or its TOOL_TIMEOUTS entry)
+    and a per-tool circuit breaker, and records latency and outcomes in core.metrics.
+    """
+
     def __init__(self):
         # Initialize the base class
         super().__init__()
         
-        # Store decorated tools
-        # Not necessary to as it is already stored in the ToolBox class
-        # But explicitly storing it here for clarity
-        self._decorated_tools: List[Callable] = self.decorated_tools
+        # Registered decorated tools, including the ToolBox ones
+        self._decorated_tools: List[Callable] = []
+        # Compiled schemas of decorated tools, by tool name in registration order
+        self._decorated_schemas: Dict[str, Dict[str, Any]] = {}
+        self._config: Optional[List[Dict[str, Any]]] = None
+        self._config_names: frozenset = frozenset()
+        self._config_json: Optional[str] = None
+        self._filtered_configs: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        self.tool_timeouts: Dict[str, float] = dict(TOOL_TIMEOUTS)
+        self._breakers: Dict[str, CircuitBreaker] = {}
         
         # Register the decorated tools
-        self.register_decorated_tools(DECORATED_TOOLS_EXAMPLES + self._decorated_tools)
+        self.register_decorated_tools(DECORATED_TOOLS_EXAMPLES + self.decorated_tools)
 
     def register_decorated_tool(self, tool_func: Callable) -> None:
-        """Register a decorated tool function"""
+        """Register a decorated tool function; a tool with the same name is replaced"""
         if hasattr(tool_func, 'name') and hasattr(tool_func, 'args_schema'):
+            if tool_func.name in self._decorated_schemas:
+                self._decorated_tools = [t for t in self._decorated_tools if t.name != tool_func.name]
             self._decorated_tools.append(tool_func)
+            self._decorated_schemas[tool_func.name] = convert_to_function_schema(tool_func)
             self.tool_handlers[tool_func.name] = tool_func
+            self.invalidate_tools_config()
         else:
             logger.warning(f"Tool {tool_func.__name__} is not properly decorated")
 
@@ -34,6 +126,13 @@ class Tools(ToolBox):
         for tool in tools:
             self.register_decorated_tool(tool)
 
+    def invalidate_tools_config(self) -> None:
+        """Drop the cached configs; call after changing tools_config or tool_handlers directly"""
+        self._config = None
+        self._config_names = frozenset()
+        self._config_json = None
+        self._filtered_configs.clear()
+
     def get_tools_config(self, filter_tools: List[str] = None) -> List[Dict[str, Any]]:
         """
         Get tool configurations, optionally filtered by tool names
@@ -42,28 +141,117 @@ class Tools(ToolBox):
             filter_tools: Optional list of tool names to include
             
         Returns:
-            List of tool configurations
+            List of tool configurations (shared, do not modify)
         """
-        all_tools = self.tools_config + get_tool_schemas(self._decorated_tools)
-        
-        if filter_tools:
-            return [tool for tool in all_tools 
-                    if tool["function"]["name"] in filter_tools]
-        return all_tools
+        if self._config is None:
+            self._config = self.tools_config + list(self._decorated_schemas.values())
+            self._config_names = frozenset(tool["function"]["name"] for tool in self._config)
+        if not filter_tools:
+            return self._config
+
+        key = tuple(sorted(set(filter_tools)))
+        filtered = self._filtered_configs.get(key)
+        if filtered is None:
+            names = set(key)
+            filtered = [tool for tool in self._config if tool["function"]["name"] in names]
+            self._filtered_configs[key] = filtered
+        return filtered
+
+    def get_tools_config_json(self) -> str:
+        """The full tool configuration serialized as JSON, e.g. for returning it over an API"""
+        if self._config_json is None:
+            self._config_json = json.dumps(self.get_tools_config())
+        return self._config_json
+
+    def has_tool(self, tool_name: str) -> bool:
+        """Whether a tool of this name is configured and has a handler"""
+        self.get_tools_config()
+        return tool_name in self._config_names and tool_name in self.tool_handlers
 
     async def execute_tool(self, tool_name: str, args: Dict[str, Any], agent_context: Any) -> Optional[Dict[str, Any]]:
-        """Execute a tool by name with given arguments"""
+        """
+        Execute a tool by name with given arguments.
+
+        A tool that exceeds its deadline is cancelled. Timeouts, exceptions and error results
+        count as failures for the tool's circuit breaker; while it is open the tool is not
+        called. In all these cases the result holds an 'error' instead of raising. Tools mark
+        errors caused by the caller's arguments with 'invalid_input': True; those are not
+        failures of the tool and leave the breaker alone.
+        """
         if tool_name not in self.tool_handlers:
             logger.error(f"Unknown tool: {tool_name}")
             return None
-        result = await self.tool_handlers[tool_name](args, agent_context)
+        breaker = self._breakers.setdefault(tool_name, CircuitBreaker())
+        if not breaker.allow():
+            logger.warning(f"Circuit open for tool {tool_name}, skipping call")
+            TOOL_CALLS_TOTAL.inc(tool=tool_name, outcome="rejected")
+            return self._tool_result(tool_name, args, {"error": f"Tool {tool_name} is temporarily unavailable"}, processed=False)
+
+        timeout = self.tool_timeouts.get(tool_name, TOOL_TIMEOUT)
+        started = time.perf_counter()
+        try:
+            handler = self.tool_handlers[tool_name]
+            if getattr(handler, 'applies_timeout', False):
+                # @tool handlers start the deadline once they hold a concurrency slot
+                token = execution_timeout.set(timeout)
+                try:
+                    result = await handler(args, agent_context)
+                finally:
+                    execution_timeout.reset(token)
+            else:
+                result = await asyncio.wait_for(handler(args, agent_context), timeout)
+            if isinstance(result, dict) and "error" in result:
+                outcome = "invalid_input" if result.get("invalid_input") else "error"
+            else:
+                outcome = "ok"
+        except asyncio.TimeoutError:
+            logger.error(f"Tool {tool_name} timed out after {timeout}s")
+            result, outcome = {"error": f"Tool {tool_name} timed out"}, "timeout"
+        except asyncio.CancelledError:
+            breaker.record_ignored()
+            raise
+        except Exception as e:
+            logger.error(f"Tool {tool_name} failed: {e!r}")
+            result, outcome = {"error": f"Tool {tool_name} failed: {e}"}, "exception"
+        finally:
+            TOOL_SECONDS.observe(time.perf_counter() - started, tool=tool_name)
+
+        TOOL_CALLS_TOTAL.inc(tool=tool_name, outcome=outcome)
+        if outcome == "ok":
+            breaker.record_success()
+        elif outcome in TOOL_FAILURE_OUTCOMES:
+            breaker.record_failure()
+        else:
+            breaker.record_ignored()
+        if not isinstance(result, dict):
+            result = {"result": result}
+        return self._tool_result(tool_name, args, result, processed=outcome in ("ok", "invalid_input", "error"))
+
+    @staticmethod
+    def _tool_result(tool_name: str, args: Dict[str, Any], result: Dict[str, Any], processed: bool) -> Dict[str, Any]:
         result["tool_call"] = json.dumps({
                         "tool_call": tool_name,
-                        "processed": True,
+                        "processed": processed,
                         "args": args,
                         "result": result["result"] if "result" in result else None,
                         "data": result["data"] if "data" in result else None
                     }, default=str)
         return result
 
-
+    def get_tool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool call counts, error rate, latency percentiles and circuit state, for tools called so far"""
+        stats = {}
+        for tool_name in self.tool_handlers:
+            outcomes = {outcome: int(TOOL_CALLS_TOTAL.value(tool=tool_name, outcome=outcome)) for outcome in TOOL_OUTCOMES}
+            calls = sum(outcomes.values())
+            if not calls:
+                continue
+            breaker = self._breakers.get(tool_name)
+            stats[tool_name] = {
+                'calls': calls,
+                'outcomes': outcomes,
+                'error_rate': sum(outcomes[outcome] for outcome in TOOL_FAILURE_OUTCOMES + ("rejected",)) / calls,
+                'latency': TOOL_SECONDS.snapshot(tool=tool_name),
+                'circuit': breaker.state if breaker else "closed"
+            }
+        return stats
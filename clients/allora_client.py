@@ -0,0 +1,33 @@
+from typing import Dict
+from .base_client import BaseAPIClient
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class AlloraClient(BaseAPIClient):
+    """Allora price prediction API implementation (served through Upshot)"""
+    
+    def __init__(self, network: str = "ethereum-11155111"):
+        super().__init__(
+            "https://api.upshot.xyz/v2/allora",
+            headers={"accept": "application/json", "x-api-key": os.getenv("ALLORA_API_KEY", "")}
+        )
+        self.network = network
+    
+    async def get_price_prediction(self, token: str, timeframe: str) -> Dict:
+        """
+        Get the network price inference for a token
+        
+        Args:
+            token: Token symbol (e.g. 'ETH', 'BTC')
+            timeframe: Prediction horizon (e.g. '5m', '8h')
+                
+        Returns:
+            Dictionary whose data.inference_data holds the normalized network inference
+            and its confidence interval percentiles and values
+        """
+        return await self._make_request(
+            "get",
+            f"/consumer/price/{self.network}/{token.upper()}/{timeframe}"
+        )
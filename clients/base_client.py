@@ -1,42 +1,189 @@
 import aiohttp
 import asyncio
-from typing import Dict, Optional, Any
+import math
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Type
 import logging
-import json
 import hashlib
+from core import metrics
+from .session_manager import HTTP_CONNECT_TIMEOUT, get_session_manager
+from .http_cache import freshness_lifetime, get_http_cache
+from . import json_codec
 
 logger = logging.getLogger(__name__)
 
+# Response bodies larger than this are decoded in a worker thread
+DECODE_IN_THREAD_BYTES = 1024 * 1024
+
 class BaseAPIClient:
-    """Base class for all API clients with shared functionality"""
+    """
+    Base class for all API clients with shared functionality.
+
+    Requests go through the process-wide session from clients.session_manager, so all
+    clients share one connection pool per event loop. GET responses are kept in the
+    HTTP cache from clients.http_cache, honoring Cache-Control and revalidating with
+    ETag/Last-Modified. cache_ttls maps endpoint prefixes to a freshness lifetime in
+    seconds that overrides the server's, for APIs that send no caching headers.
+    """
     
-    def __init__(self, base_url: str):
+    def __init__(self,
+                 base_url: str,
+                 headers: Optional[Dict[str, str]] = None,
+                 timeout: Optional[float] = None,
+                 cache_ttls: Optional[Dict[str, float]] = None):
         self.base_url = base_url
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.headers = headers or {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=HTTP_CONNECT_TIMEOUT) if timeout else None
+        self.cache_ttls = cache_ttls or {}
     
+    def _cache_ttl(self, endpoint: str) -> Optional[float]:
+        """TTL override of the longest matching endpoint prefix"""
+        matches = [prefix for prefix in self.cache_ttls if endpoint.startswith(prefix)]
+        return self.cache_ttls[max(matches, key=len)] if matches else None
+
     async def _make_request(
         self,
         method: str,
         endpoint: str,
+        schema: Optional[Type] = None,
         **kwargs
     ) -> Any:
-        """Make an API request"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            
+        """
+        Make an API request. With a schema (e.g. List[SomeDataclass]) the response is
+        decoded into that type, keeping only its fields; see clients.json_codec.
+        """
+        session = await get_session_manager().get_session()
+        if self.headers:
+            kwargs['headers'] = {**self.headers, **(kwargs.get('headers') or {})}
+        if self.timeout and 'timeout' not in kwargs:
+            kwargs['timeout'] = self.timeout
+
+        url = f"{self.base_url}{endpoint}"
+        http_cache = get_http_cache() if method.lower() == "get" else None
+        if http_cache is None:
+            return await self._send(session, method, url, schema, **kwargs)
+
+        key = http_cache.make_key(url, kwargs.get('params'), kwargs.get('headers'))
+        entry = http_cache.lookup(key)
+        if entry is not None and entry.is_fresh():
+            body = await asyncio.to_thread(http_cache.load, entry)
+            if body is not None:
+                http_cache.hits += 1
+                http_cache.bytes_saved += entry.size
+                return await self._decode(body, schema)
+            entry = None
+        if entry is not None:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), **entry.validators()}
+
         try:
-            async with getattr(self.session, method)(
-                f"{self.base_url}{endpoint}", **kwargs
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
+            with metrics.phase("external_api"):
+                async with getattr(session, method)(url, **kwargs) as response:
+                    lifetime = freshness_lifetime(response.headers, self._cache_ttl(endpoint))
+                    if response.status == 304 and entry is not None:
+                        body = await asyncio.to_thread(http_cache.load, entry)
+                        if body is not None:
+                            http_cache.revalidations += 1
+                            http_cache.bytes_saved += entry.size
+                            await asyncio.to_thread(http_cache.refresh, entry, response.headers, lifetime or 0.0)
+                            return await self._decode(body, schema)
+                        # The body vanished from disk; fetch it again unconditionally
+                        for header in entry.validators():
+                            kwargs['headers'].pop(header, None)
+                        return await self._send(session, method, url, schema, **kwargs)
+                    response.raise_for_status()
+                    body = await response.read()
+        except aiohttp.ClientError as e:
+            logger.error(f"API request failed: {e}")
+            raise
+
+        http_cache.misses += 1
+        data = await self._decode(body, schema)
+        if lifetime is not None and (lifetime > 0 or 'ETag' in response.headers or 'Last-Modified' in response.headers):
+            await asyncio.to_thread(http_cache.store, key, url, body, response.headers, lifetime)
+        return data
+
+    async def paginate(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_param: str = "page",
+        size_param: str = "items",
+        page_size: int = 100,
+        first_page: int = 0,
+        concurrency: int = 4,
+        max_pages: Optional[int] = None,
+        items_key: Optional[str] = None,
+        total_key: Optional[str] = None,
+        item_schema: Optional[Type] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Iterate over the items of a paged GET endpoint, fetching up to `concurrency` pages at once.
+
+        The page count comes from the first response's total_key (total item count) when the API
+        reports one; otherwise pages are fetched until one comes back short. Items are yielded in
+        page order, and leaving the loop early cancels the pages still in flight. Items are
+        decoded into item_schema when given.
+        """
+        params = dict(params or {})
+        schema = List[item_schema] if item_schema and not items_key else None
+
+        def page_items(response: Any) -> list:
+            items = (response.get(items_key) or []) if items_key else (response or [])
+            return json_codec.convert(items, List[item_schema]) if item_schema and items_key else items
+
+        async def fetch(page: int) -> list:
+            return page_items(await self._make_request("get", endpoint, schema=schema, params={**params, page_param: page, size_param: page_size}))
+
+        first = await self._make_request("get", endpoint, schema=schema, params={**params, page_param: first_page, size_param: page_size})
+        items = page_items(first)
+        for item in items:
+            yield item
+        if len(items) < page_size:
+            return
+
+        last_page = None
+        if total_key and isinstance(first, dict) and first.get(total_key) is not None:
+            last_page = first_page + math.ceil(int(first[total_key]) / page_size) - 1
+        if max_pages is not None:
+            last_page = min(last_page if last_page is not None else math.inf, first_page + max_pages - 1)
+
+        next_page = first_page + 1
+        pending: Deque[asyncio.Task] = deque()
+        try:
+            while True:
+                while len(pending) < concurrency and (last_page is None or next_page <= last_page):
+                    pending.append(asyncio.create_task(fetch(next_page)))
+                    next_page += 1
+                if not pending:
+                    return
+                items = await pending.popleft()
+                for item in items:
+                    yield item
+                if len(items) < page_size:
+                    return
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _send(self, session: aiohttp.ClientSession, method: str, url: str, schema: Optional[Type], **kwargs) -> Any:
+        try:
+            with metrics.phase("external_api"):
+                async with getattr(session, method)(url, **kwargs) as response:
+                    response.raise_for_status()
+                    body = await response.read()
                 
         except aiohttp.ClientError as e:
             logger.error(f"API request failed: {e}")
             raise
+        return await self._decode(body, schema)
+
+    @staticmethod
+    async def _decode(body: bytes, schema: Optional[Type]) -> Any:
+        # Decoding a multi-megabyte body takes long enough to stall other tasks on the loop
+        if len(body) > DECODE_IN_THREAD_BYTES:
+            return await asyncio.to_thread(json_codec.decode, body, schema)
+        return json_codec.decode(body, schema)
 
     async def close(self):
-        """Close the API client session"""
-        if self.session:
-            await self.session.close()
-            self.session = None
\ No newline at end of file
+        """Release the client; the shared session stays open for other clients"""
+        pass
@@ -0,0 +1,180 @@
+import aiohttp
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from core.cache import TTLCache
+from decorators import with_cache, single_flight
+from .base_client import BaseAPIClient
+from .session_manager import get_session_manager
+from . import json_codec
+
+logger = logging.getLogger(__name__)
+
+BINANCE_BASE_URL = os.getenv("BINANCE_BASE_URL", "https://api.binance.com/api/v3")
+MARKET_PRICE_TTL = float(os.getenv("MARKET_PRICE_TTL", 5))
+MARKET_PRICE_CACHE_SIZE = int(os.getenv("MARKET_PRICE_CACHE_SIZE", 1024))
+MARKET_KLINE_CACHE_SIZE = int(os.getenv("MARKET_KLINE_CACHE_SIZE", 10000))
+# e.g. wss://stream.binance.com:9443/ws/!miniTicker@arr; unset keeps prices on REST only
+MARKET_PRICE_FEED_URL = os.getenv("MARKET_PRICE_FEED_URL") or None
+MARKET_PRICE_FEED_MAX_AGE = float(os.getenv("MARKET_PRICE_FEED_MAX_AGE", 10))
+
+KLINE_INTERVAL_MS = 60_000
+
+# Spot prices are shared by every caller for MARKET_PRICE_TTL seconds
+_spot_prices = TTLCache(max_size=MARKET_PRICE_CACHE_SIZE, ttl_seconds=MARKET_PRICE_TTL)
+
+class PriceFeed:
+    """
+    Latest prices kept current from a Binance-style miniTicker websocket stream.
+
+    The stream pushes {'s': symbol, 'c': close price} objects, singly or as an array.
+    Prices older than max_age are ignored, so a stalled feed falls back to REST.
+    """
+
+    def __init__(self, url: str, max_age: float = MARKET_PRICE_FEED_MAX_AGE, reconnect_delay: float = 5):
+        self.url = url
+        self.max_age = max_age
+        self.reconnect_delay = reconnect_delay
+        # symbol -> (price, monotonic time of the update)
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self, symbol: str) -> Optional[float]:
+        entry = self._prices.get(symbol)
+        if entry is None or time.monotonic() - entry[1] > self.max_age:
+            return None
+        return entry[0]
+
+    def ensure_started(self) -> None:
+        """Start listening on the running loop, unless already listening on a live one"""
+        if self._task is not None and not self._task.done() and not self._loop.is_closed():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                session = await get_session_manager().get_session()
+                async with session.ws_connect(self.url, heartbeat=30) as ws:
+                    logger.info(f"Connected to price feed {self.url}")
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            self._update(json_codec.loads(message.data))
+                        elif message.type == aiohttp.WSMsgType.ERROR:
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Price feed {self.url} failed: {e}")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _update(self, data) -> None:
+        now = time.monotonic()
+        for ticker in data if isinstance(data, list) else [data]:
+            try:
+                self._prices[ticker['s']] = (float(ticker['c']), now)
+            except (KeyError, TypeError, ValueError):
+                continue
+
+class BinanceClient(BaseAPIClient):
+    """
+    Binance market data API implementation.
+
+    Spot prices come from the websocket price table when a fresh one is available, and
+    otherwise from REST, cached for MARKET_PRICE_TTL seconds with concurrent lookups of
+    the same symbol sharing one request. Closed 1-minute klines never change, so they
+    are cached without expiry.
+    """
+
+    def __init__(self, base_url: str = BINANCE_BASE_URL, feed: Optional[PriceFeed] = None):
+        super().__init__(base_url)
+        self.feed = feed
+        self._klines = TTLCache(max_size=MARKET_KLINE_CACHE_SIZE, ttl_seconds=None)
+
+    async def get_spot_price(self, symbol: str) -> float:
+        """
+        Get the current price of a trading pair
+
+        Args:
+            symbol: Binance symbol, e.g. 'BTCUSDT'
+
+        Returns:
+            Last traded price
+        """
+        if self.feed is not None:
+            self.feed.ensure_started()
+            price = self.feed.get(symbol)
+            if price is not None:
+                return price
+        return await self._fetch_spot_price(symbol)
+
+    @with_cache(ttl_seconds=MARKET_PRICE_TTL, cache=_spot_prices)
+    async def _fetch_spot_price(self, symbol: str) -> float:
+        data = await self._make_request("get", "/ticker/price", params={"symbol": symbol})
+        return float(data['price'])
+
+    async def get_historical_price(self, symbol: str, timestamp_ms: int) -> Optional[float]:
+        """
+        Get the close of the first 1-minute kline within a minute of a timestamp
+
+        Args:
+            symbol: Binance symbol, e.g. 'BTCUSDT'
+            timestamp_ms: Unix time in milliseconds
+
+        Returns:
+            Close price, or None if Binance has no kline for that time
+        """
+        key = (self.base_url, symbol, timestamp_ms)
+        price = self._klines.get(key)
+        if price is not None:
+            return price
+        price = await self._fetch_kline_close(symbol, timestamp_ms)
+        # The kline is final once its minute has passed; an open one may still change
+        if price is not None and timestamp_ms + 2 * KLINE_INTERVAL_MS <= time.time() * 1000:
+            self._klines.set(key, price)
+        return price
+
+    @single_flight()
+    async def _fetch_kline_close(self, symbol: str, timestamp_ms: int) -> Optional[float]:
+        klines: List[list] = await self._make_request(
+            "get",
+            "/klines",
+            params={
+                "symbol": symbol,
+                "interval": "1m",
+                "startTime": timestamp_ms - KLINE_INTERVAL_MS,
+                "endTime": timestamp_ms + KLINE_INTERVAL_MS,
+                "limit": 1
+            }
+        )
+        return float(klines[0][4]) if klines else None
+
+    def stats(self) -> Dict[str, Dict]:
+        return {'spot_prices': _spot_prices.stats(), 'klines': self._klines.stats()}
+
+    async def close(self):
+        if self.feed is not None:
+            await self.feed.stop()
+
+_binance_client: Optional[BinanceClient] = None
+
+def get_binance_client() -> BinanceClient:
+    """Process-wide Binance client, with a price feed when MARKET_PRICE_FEED_URL is set"""
+    global _binance_client
+    if _binance_client is None:
+        feed = PriceFeed(MARKET_PRICE_FEED_URL) if MARKET_PRICE_FEED_URL else None
+        _binance_client = BinanceClient(feed=feed)
+    return _binance_client
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from .base_client import BaseAPIClient
 import logging
 
@@ -8,7 +8,11 @@ class DefiLlamaClient(BaseAPIClient):
     """DefiLlama API implementation"""
     
     def __init__(self):
-        super().__init__("https://api.llama.fi")
+        super().__init__(
+            "https://api.llama.fi",
+            # Protocol lists and TVL series change slowly and come without caching headers
+            cache_ttls={"/protocols": 600, "/protocol/": 300, "/v2/historicalChainTvl/": 600}
+        )
     
     async def get_protocol_tvl(self, protocol: str) -> Dict:
         """
@@ -91,3 +95,12 @@ class DefiLlamaClient(BaseAPIClient):
             ]
         """
         return self._make_request("/v2/chains")
+
+_defillama_client: Optional[DefiLlamaClient] = None
+
+def get_defillama_client() -> DefiLlamaClient:
+    """Process-wide DefiLlama client"""
+    global _defillama_client
+    if _defillama_client is None:
+        _defillama_client = DefiLlamaClient()
+    return _defillama_client
@@ -0,0 +1,29 @@
+from typing import Dict
+from .base_client import BaseAPIClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+class GoPlusClient(BaseAPIClient):
+    """GoPlus Security API implementation"""
+    
+    def __init__(self):
+        super().__init__("https://api.gopluslabs.io/api/v1", headers={"accept": "*/*"})
+    
+    async def get_token_security(self, contract_address: str, chain_id: int = 8453) -> Dict:
+        """
+        Get security details of token contracts
+        
+        Args:
+            contract_address: Token contract address (several may be comma-separated)
+            chain_id: Blockchain chain ID, or 'tron'
+                
+        Returns:
+            Dictionary with a 'result' mapping each lowercased contract address to its
+            security metrics (honeypot, taxes, holders, owner rights, etc.)
+        """
+        return await self._make_request(
+            "get",
+            f"/token_security/{chain_id}",
+            params={"contract_addresses": contract_address}
+        )
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "cache/http")
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", 1024))
+
+# Request headers a response may vary by; credential-like headers are matched by name too
+KEY_HEADERS = {'authorization', 'proxy-authorization', 'cookie', 'accept', 'accept-language'}
+KEY_HEADER_MARKERS = ('key', 'token', 'auth', 'secret')
+
+@dataclass
+class CacheEntry:
+    key: str
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+    size: int
+    stored_at: float
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Headers for a conditional request revalidating this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+def freshness_lifetime(headers: Mapping[str, str], ttl_override: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds a response stays fresh, or None if it must not be stored.
+
+    A per-endpoint ttl_override wins over the server's max-age/Expires, but never over no-store.
+    Responses without freshness information get 0, i.e. they are revalidated on every use.
+    """
+    cache_control = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in cache_control:
+        return None
+    if ttl_override is not None:
+        return ttl_override
+    if 'no-cache' in cache_control:
+        return 0.0
+    # This is a private cache, so s-maxage (shared caches only) does not apply
+    if cache_control.get('max-age'):
+        try:
+            return max(0.0, float(cache_control['max-age']) - float(headers.get('Age', 0)))
+        except ValueError:
+            pass
+    if headers.get('Expires'):
+        try:
+            return max(0.0, parsedate_to_datetime(headers['Expires']).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+class HTTPCache:
+    """
+    Cache of HTTP GET response bodies, zlib-compressed on disk with an in-memory index.
+
+    Entries keep the ETag/Last-Modified validators so stale entries can be revalidated
+    with a conditional request instead of downloading the body again. The index holds
+    at most max_entries entries and evicts the least recently used.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_entries: int = HTTP_CACHE_MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self._index: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Mapping[str, Any]] = None, headers: Optional[Mapping[str, str]] = None) -> str:
+        """
+        Key for a GET request. Credential and content-negotiation headers are part of it,
+        so callers with different API keys or Accept headers never share an entry; only
+        their hash is stored.
+        """
+        query = json.dumps(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        varying = json.dumps(sorted(
+            (name.lower(), str(value)) for name, value in (headers or {}).items()
+            if name.lower() in KEY_HEADERS or any(marker in name.lower() for marker in KEY_HEADER_MARKERS)
+        ))
+        return hashlib.sha256(f"{url}|{query}|{varying}".encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.directory / f"{key}.body.z"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.meta.json"
+
+    def _load_index(self) -> None:
+        entries = []
+        for meta_path in self.directory.glob("*.meta.json"):
+            try:
+                entries.append(CacheEntry(**json.loads(meta_path.read_text(encoding="utf-8"))))
+            except (OSError, ValueError, TypeError) as e:
+                logger.debug(f"Skipping unreadable HTTP cache entry {meta_path}: {e}")
+        for entry in sorted(entries, key=lambda e: e.stored_at)[-self.max_entries:]:
+            self._index[entry.key] = entry
+        if entries:
+            logger.info(f"Loaded {len(self._index)} HTTP cache entries from {self.directory}")
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                self._index.move_to_end(key)
+            return entry
+
+    def load(self, entry: CacheEntry) -> Optional[bytes]:
+        """Read and decompress a cached body; blocking, run it off the event loop"""
+        try:
+            return zlib.decompress(self._body_path(entry.key).read_bytes())
+        except (OSError, zlib.error) as e:
+            logger.warning(f"Dropping broken HTTP cache entry for {entry.url}: {e}")
+            self.delete(entry.key)
+            return None
+
+    def store(self, key: str, url: str, body: bytes, headers: Mapping[str, str], lifetime: float) -> None:
+        """Compress and write a body with its validators; blocking, run it off the event loop"""
+        entry = CacheEntry(
+            key=key,
+            url=url,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            expires_at=time.time() + lifetime,
+            size=len(body),
+            stored_at=time.time()
+        )
+        self._write(self._body_path(key), zlib.compress(body, 6))
+        self._write(self._meta_path(key), json.dumps(asdict(entry)).encode("utf-8"))
+        with self._lock:
+            self._index[key] = entry
+            self._index.move_to_end(key)
+            evicted = []
+            while len(self._index) > self.max_entries:
+                evicted.append(self._index.popitem(last=False)[0])
+        for old_key in evicted:
+            self._remove_files(old_key)
+
+    def refresh(self, entry: CacheEntry, headers: Mapping[str, str], lifetime: float) -> None:
+        """Extend an entry after a 304 Not Modified, taking any updated validators"""
+        entry.etag = headers.get('ETag', entry.etag)
+        entry.last_modified = headers.get('Last-Modified', entry.last_modified)
+        entry.expires_at = time.time() + lifetime
+        self._write(self._meta_path(entry.key), json.dumps(asdict(entry)).encode("utf-8"))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._index.pop(key, None)
+        self._remove_files(key)
+
+    def _remove_files(self, key: str) -> None:
+        for path in (self._body_path(key), self._meta_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        # Write then rename, so other processes sharing the directory never read a partial file
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            'entries': len(self._index),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'misses': self.misses,
+            'bytes_saved': self.bytes_saved,
+            'hit_rate': (self.hits + self.revalidations) / lookups if lookups else 0.0
+        }
+
+_http_cache: Optional[HTTPCache] = None
+_http_cache_lock = threading.Lock()
+
+def get_http_cache() -> Optional[HTTPCache]:
+    """Process-wide HTTP cache used by BaseAPIClient, or None when HTTP_CACHE_ENABLED is false"""
+    global _http_cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HTTPCache()
+        return _http_cache
@@ -0,0 +1,97 @@
+import dataclasses
+import functools
+import json
+import logging
+import typing
+from typing import Any, Callable, Optional, Type, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Library used by loads()
+BACKEND = "orjson" if orjson else "msgspec" if msgspec else "json"
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON with the fastest available library: orjson, msgspec, then the stdlib"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+def decode(data: Union[bytes, str], schema: Optional[Type] = None) -> Any:
+    """
+    Decode JSON, optionally projected onto a schema type such as a dataclass or List[dataclass].
+
+    Only the fields declared on the dataclasses are kept; everything else is dropped. With
+    msgspec installed the unwanted fields are skipped while parsing, which is where the
+    speedup on large payloads comes from; otherwise the document is decoded in full and
+    then converted.
+    """
+    if schema is None:
+        return loads(data)
+    if msgspec is not None:
+        return msgspec.json.decode(data, type=schema)
+    return convert(loads(data), schema)
+
+def convert(value: Any, schema: Type) -> Any:
+    """Project already decoded JSON onto a schema type, as decode() does"""
+    if msgspec is not None:
+        return msgspec.convert(value, schema)
+    return _convert(value, schema)
+
+def _convert(value: Any, schema: Any) -> Any:
+    return _converter(schema)(value)
+
+def _identity(value: Any) -> Any:
+    return value
+
+@functools.lru_cache(maxsize=None)
+def _converter(schema: Any) -> Callable[[Any], Any]:
+    """Build (once per type) a function projecting decoded JSON onto schema"""
+    if schema is Any:
+        return _identity
+    if dataclasses.is_dataclass(schema):
+        hints = typing.get_type_hints(schema)
+        plan = [
+            (field.name, _converter(hints[field.name]),
+             field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING)
+            for field in dataclasses.fields(schema)
+        ]
+
+        def convert_dataclass(value):
+            if value is None:
+                return None
+            kwargs = {}
+            for name, convert_field, required in plan:
+                if name in value:
+                    kwargs[name] = convert_field(value[name])
+                elif required:
+                    raise ValueError(f"Missing required field '{name}' for {schema.__name__}")
+            return schema(**kwargs)
+        return convert_dataclass
+    origin = typing.get_origin(schema)
+    args = typing.get_args(schema)
+    if origin is Union:
+        non_null = [arg for arg in args if arg is not type(None)]
+        return _converter(non_null[0]) if len(non_null) == 1 else _identity
+    if origin is list and args:
+        convert_item = _converter(args[0])
+        if convert_item is _identity:
+            return _identity
+        return lambda value: None if value is None else [convert_item(item) for item in value]
+    if origin is dict and args:
+        convert_item = _converter(args[1])
+        if convert_item is _identity:
+            return _identity
+        return lambda value: None if value is None else {key: convert_item(item) for key, item in value.items()}
+    return _identity
@@ -1,14 +1,40 @@
-from typing import Dict, List, Optional, Union
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Type, Union
 from .base_client import BaseAPIClient
 import logging
 
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True)
+class MerklToken:
+    id: Optional[str] = None
+    icon: Optional[str] = None
+
+@dataclass(slots=True)
+class MerklProtocol:
+    name: Optional[str] = None
+    icon: Optional[str] = None
+
+@dataclass(slots=True)
+class MerklOpportunity:
+    """Projection of an opportunity onto the fields the agents use, for iter_opportunities(item_schema=...)"""
+    name: str
+    status: str
+    apr: Optional[float] = None
+    tvl: Optional[float] = None
+    dailyRewards: Optional[float] = None
+    protocol: Optional[MerklProtocol] = None
+    tokens: List[MerklToken] = field(default_factory=list)
+    rewardsRecord: Optional[Dict[str, Any]] = None
+
 class MerklClient(BaseAPIClient):
     """Merkl API implementation for accessing DeFi opportunities and rewards data"""
     
     def __init__(self):
-        super().__init__("https://api.merkl.xyz/v4")
+        super().__init__(
+            "https://api.merkl.xyz/v4",
+            cache_ttls={"/opportunities/": 120, "/campaigns/": 120, "/protocols/": 600, "/chains/": 3600}
+        )
     
     async def get_opportunities(self, 
                               name: Optional[str] = None,
@@ -51,6 +77,27 @@ class MerklClient(BaseAPIClient):
             params=params
         )
 
+    def iter_opportunities(self,
+                           page_size: int = 100,
+                           concurrency: int = 4,
+                           max_pages: Optional[int] = None,
+                           item_schema: Optional[Type] = None,
+                           **filters) -> AsyncIterator[Dict]:
+        """
+        Iterate over all opportunities matching the filters of get_opportunities,
+        fetching pages concurrently. Break out of the loop to stop fetching.
+        Pass item_schema=MerklOpportunity to decode only the commonly used fields.
+        """
+        params = {k: v for k, v in filters.items() if v is not None}
+        return self.paginate(
+            "/opportunities/",
+            params=params,
+            page_size=page_size,
+            concurrency=concurrency,
+            max_pages=max_pages,
+            item_schema=item_schema
+        )
+
     async def get_opportunity_detail(self, opportunity_id: str) -> Dict:
         """Get detailed information about a specific opportunity"""
         return await self._make_request(
@@ -0,0 +1,92 @@
+import aiohttp
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 20))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 30))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+
+class SessionManager:
+    """
+    Process-wide aiohttp sessions shared by all API clients.
+
+    aiohttp sessions are bound to the event loop they were created on, so there is one
+    session per running loop, created on first use. Sessions of loops that have since
+    been closed are dropped on the next lookup.
+    """
+
+    def __init__(self,
+                 limit: int = HTTP_MAX_CONNECTIONS,
+                 limit_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+                 keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                 dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+                 timeout: float = HTTP_TIMEOUT,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    def _drop_closed_loops(self) -> None:
+        for loop in [loop for loop in self._sessions if loop.is_closed()]:
+            # The loop is gone, so the session cannot be awaited; close its connector synchronously
+            session = self._sessions.pop(loop)
+            connector = session.connector
+            session.detach()
+            if connector is not None:
+                connector._close()
+            logger.debug("Dropped HTTP session of a closed event loop")
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the session for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._drop_closed_loops()
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                session = self._sessions[loop] = self._create_session()
+        return session
+
+    async def close(self) -> None:
+        """Close the session of the running event loop; call once at shutdown"""
+        with self._lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session and not session.closed:
+            await session.close()
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            'sessions': len(self._sessions),
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host
+        }
+
+_session_manager = SessionManager()
+
+def get_session_manager() -> SessionManager:
+    return _session_manager
+
+async def close_sessions() -> None:
+    """Close the shared HTTP session of the running event loop"""
+    await _session_manager.close()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TVL_STORE_DIR = os.getenv("TVL_STORE_DIR", "cache/tvl")
+# Daily series; refreshing more often than this finds no new points
+TVL_REFRESH_INTERVAL = float(os.getenv("TVL_REFRESH_INTERVAL", 3600))
+
+TIMESTAMP_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<f8")
+
+class TVLStore:
+    """
+    Local columnar store of historical chain TVL from DefiLlama.
+
+    Each chain is two append-only binary files of little-endian int64 timestamps and
+    float64 TVL values, read back as memory maps, so queries are vectorized NumPy
+    operations on local data. refresh() appends only points newer than the last one stored,
+    and rewrites the last point when DefiLlama revises it (the current day's value moves
+    until the day closes).
+    """
+
+    def __init__(self, directory: str = TVL_STORE_DIR, refresh_interval: float = TVL_REFRESH_INTERVAL):
+        self.directory = Path(directory)
+        self.refresh_interval = refresh_interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # chain -> (timestamps, values, point count the maps were taken at)
+        self._maps: Dict[str, Tuple[np.ndarray, np.ndarray, int]] = {}
+        self._refreshed_at: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, chain: str) -> Tuple[Path, Path]:
+        name = re.sub(r"[^a-z0-9_-]", "_", chain.lower())
+        return self.directory / f"{name}.ts.bin", self.directory / f"{name}.tvl.bin"
+
+    def series(self, chain: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Read-only (timestamps, values) arrays for a chain, oldest first"""
+        ts_path, value_path = self._paths(chain)
+        if not ts_path.exists() or not value_path.exists():
+            return np.empty(0, TIMESTAMP_DTYPE), np.empty(0, VALUE_DTYPE)
+        # A crash between the two appends can leave one file longer; use the common prefix
+        count = min(ts_path.stat().st_size // TIMESTAMP_DTYPE.itemsize, value_path.stat().st_size // VALUE_DTYPE.itemsize)
+        with self._lock:
+            cached = self._maps.get(chain)
+            if cached is not None and cached[2] == count:
+                return cached[0], cached[1]
+            if count == 0:
+                timestamps, values = np.empty(0, TIMESTAMP_DTYPE), np.empty(0, VALUE_DTYPE)
+            else:
+                timestamps = np.memmap(ts_path, dtype=TIMESTAMP_DTYPE, mode="r", shape=(count,))
+                values = np.memmap(value_path, dtype=VALUE_DTYPE, mode="r", shape=(count,))
+            self._maps[chain] = (timestamps, values, count)
+            return timestamps, values
+
+    def append(self, chain: str, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """Append the points newer than the last stored one; returns how many were added or revised"""
+        timestamps = np.asarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+
+        stored, stored_values = self.series(chain)
+        count = len(stored)
+        if count:
+            recent = timestamps >= stored[-1]
+            timestamps, values = timestamps[recent], values[recent]
+        # Keep one value per timestamp
+        if len(timestamps) > 1:
+            unique = np.concatenate(([True], np.diff(timestamps) > 0))
+            timestamps, values = timestamps[unique], values[unique]
+        revised = None
+        if count and len(timestamps) and timestamps[0] == stored[-1]:
+            if values[0] != stored_values[-1]:
+                revised = values[0]
+            timestamps, values = timestamps[1:], values[1:]
+        if revised is None and not len(timestamps):
+            return 0
+
+        ts_path, value_path = self._paths(chain)
+        with self._lock:
+            if revised is not None:
+                # Same size, so mapped views returned by series() stay valid and see the new value
+                with open(value_path, "r+b") as f:
+                    f.seek((count - 1) * VALUE_DTYPE.itemsize)
+                    f.write(np.array([revised], dtype=VALUE_DTYPE).tobytes())
+            if len(timestamps):
+                for path, column, dtype in ((value_path, values, VALUE_DTYPE), (ts_path, timestamps, TIMESTAMP_DTYPE)):
+                    with open(path, "ab") as f:
+                        # Drop a partial tail left by an interrupted append; it lies beyond every mapping
+                        if f.tell() > count * dtype.itemsize:
+                            f.truncate(count * dtype.itemsize)
+                        f.write(column.tobytes())
+            self._maps.pop(chain, None)
+        return len(timestamps) + (revised is not None)
+
+    async def refresh(self, chain: str, client, force: bool = False) -> int:
+        """
+        Bring a chain's series up to date from a DefiLlamaClient; returns the number of new points.
+
+        DefiLlama only serves the full history, so the download cannot be narrowed to the tail,
+        but only new points are written, and calls within refresh_interval skip the request.
+        """
+        lock = self._locks.setdefault(chain, asyncio.Lock())
+        async with lock:
+            if not force and time.monotonic() - self._refreshed_at.get(chain, -math.inf) < self.refresh_interval:
+                return 0
+            history = await client.get_chain_tvl(chain)
+            timestamps = np.fromiter((int(point['date']) for point in history), dtype=TIMESTAMP_DTYPE, count=len(history))
+            values = np.fromiter((float(point['tvl']) for point in history), dtype=VALUE_DTYPE, count=len(history))
+            added = await asyncio.to_thread(self.append, chain, timestamps, values)
+            self._refreshed_at[chain] = time.monotonic()
+            if added:
+                logger.info(f"Appended {added} TVL points for {chain}")
+            return added
+
+    def range(self, chain: str, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Points with start <= timestamp < end (unix seconds); either bound may be omitted"""
+        timestamps, values = self.series(chain)
+        lo = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+        hi = len(timestamps) if end is None else np.searchsorted(timestamps, end, side="left")
+        return timestamps[lo:hi], values[lo:hi]
+
+    def resample(self, chain: str, period: int, how: str = "last",
+                 start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Downsample to buckets of `period` seconds (e.g. 7 * 86400 for weekly), labelled by
+        bucket start. how is 'last', 'first', 'mean', 'min' or 'max'.
+        """
+        timestamps, values = self.range(chain, start, end)
+        if not len(timestamps):
+            return timestamps, values
+        buckets = timestamps // period
+        starts = np.flatnonzero(np.concatenate(([True], np.diff(buckets) > 0)))
+        labels = buckets[starts] * period
+        if how == "first":
+            return labels, values[starts]
+        if how == "last":
+            return labels, values[np.append(starts[1:], len(values)) - 1]
+        if how == "mean":
+            return labels, np.add.reduceat(values, starts) / np.diff(np.append(starts, len(values)))
+        if how == "min":
+            return labels, np.minimum.reduceat(values, starts)
+        if how == "max":
+            return labels, np.maximum.reduceat(values, starts)
+        raise ValueError(f"Unknown resample aggregation: {how}")
+
+    def pct_change(self, chain: str, periods: int = 1,
+                   start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Percent change of each point against the point `periods` earlier"""
+        timestamps, values = self.range(chain, start, end)
+        if len(values) <= periods:
+            return np.empty(0, TIMESTAMP_DTYPE), np.empty(0, VALUE_DTYPE)
+        previous = values[:-periods]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(previous != 0, (values[periods:] - previous) / previous * 100, np.nan)
+        return timestamps[periods:], change
+
+    def change_over(self, chain: str, seconds: int) -> Optional[float]:
+        """Percent change between the latest point and the last point at least `seconds` older"""
+        timestamps, values = self.series(chain)
+        if not len(timestamps):
+            return None
+        index = np.searchsorted(timestamps, timestamps[-1] - seconds, side="right") - 1
+        if index < 0 or values[index] == 0:
+            return None
+        return float((values[-1] - values[index]) / values[index] * 100)
+
+    def compare(self, chains: Iterable[str], seconds: int) -> Dict[str, Dict[str, Optional[float]]]:
+        """Latest TVL and its percent change over `seconds` for several chains"""
+        result = {}
+        for chain in chains:
+            _, values = self.series(chain)
+            result[chain] = {
+                'tvl': float(values[-1]) if len(values) else None,
+                'pct_change': self.change_over(chain, seconds)
+            }
+        return result
+
+_tvl_store: Optional[TVLStore] = None
+
+def get_tvl_store() -> TVLStore:
+    """Process-wide TVL store in TVL_STORE_DIR"""
+    global _tvl_store
+    if _tvl_store is None:
+        _tvl_store = TVLStore()
+    return _tvl_store
@@ -0,0 +1,327 @@
+import logging
+import math
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", 4096))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024)) or None
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "cache/function_cache.sqlite3")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+_MISSING = object()
+
+def _sizeof(value: Any) -> int:
+    """Approximate size of a value in bytes, as its pickled length"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+class TTLCache:
+    """Thread-safe in-memory cache with per-entry TTL and LRU eviction by entry count and total bytes"""
+
+    # get/set never block on I/O, so async callers may use them directly
+    blocking = False
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300, max_bytes: Optional[int] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at, size)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store value under key, evicting expired and then least recently used entries when full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = _sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            logger.debug(f"Not caching {key}: {size} bytes exceeds max_bytes")
+            return
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            if self._over_capacity():
+                self._purge_expired()
+            while self._over_capacity():
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _over_capacity(self) -> bool:
+        return len(self._data) > self.max_size or (self.max_bytes is not None and self._bytes > self.max_bytes)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at, _) in self._data.items() if expires_at is not None and now >= expires_at]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters"""
+        total = self.hits + self.misses
+        return {
+            'backend': 'memory',
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+class SQLiteCache:
+    """
+    Cache persisted to a SQLite file on local disk, shared by the processes of one host.
+
+    Values are pickled. Entries expire by wall-clock TTL and the least recently read
+    entries are evicted beyond max_size entries or max_bytes of pickled values.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_size: int = 10000, ttl_seconds: float = 300, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            if row[1] is not None and now >= row[1]:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.max_bytes and len(data) > self.max_bytes:
+            logger.debug(f"Not caching {key}: {len(data)} bytes exceeds max_bytes")
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+                (key, data, now + ttl if ttl is not None else None, now, len(data))
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if count <= self.max_size and (not self.max_bytes or total <= self.max_bytes):
+            return
+        self.expirations += self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            if count <= self.max_size and (not self.max_bytes or total <= self.max_bytes):
+                break
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'size': count,
+            'max_size': self.max_size,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+class RedisCache:
+    """
+    Cache stored in Redis, shared by every process and host using the same server.
+
+    Works with any client exposing the redis-py get/set(ex=)/delete/scan_iter methods.
+    Values are pickled, so only point it at a trusted server. Expiry uses Redis TTLs and
+    size bounds are left to the server's maxmemory and maxmemory-policy (e.g. allkeys-lru).
+    """
+
+    blocking = True
+
+    def __init__(self, client, prefix: str = "cache:", ttl_seconds: float = 300):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        data = self.client.get(self.prefix + key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(data)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.client.set(
+            self.prefix + key,
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+            ex=max(1, math.ceil(ttl)) if ttl is not None else None
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+def create_cache(backend: str = "memory", **kwargs):
+    """Create a cache backend by name: memory, sqlite or redis"""
+    if backend == "memory":
+        return TTLCache(
+            max_size=kwargs.get('max_size', CACHE_MAX_SIZE),
+            ttl_seconds=kwargs.get('ttl_seconds', 300),
+            max_bytes=kwargs.get('max_bytes', CACHE_MAX_BYTES)
+        )
+    if backend == "sqlite":
+        return SQLiteCache(
+            kwargs.get('path', CACHE_SQLITE_PATH),
+            max_size=kwargs.get('max_size', CACHE_MAX_SIZE),
+            ttl_seconds=kwargs.get('ttl_seconds', 300),
+            max_bytes=kwargs.get('max_bytes', CACHE_MAX_BYTES)
+        )
+    if backend == "redis":
+        if 'client' in kwargs:
+            return RedisCache(kwargs['client'], prefix=kwargs.get('prefix', "cache:"), ttl_seconds=kwargs.get('ttl_seconds', 300))
+        return RedisCache.from_url(kwargs.get('url', CACHE_REDIS_URL), prefix=kwargs.get('prefix', "cache:"), ttl_seconds=kwargs.get('ttl_seconds', 300))
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """Process-wide cache used by decorators.with_cache, built from the CACHE_* settings"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = create_cache(CACHE_BACKEND)
+            logger.info(f"Using {CACHE_BACKEND} cache backend for with_cache")
+        return _default_cache
+
+def set_default_cache(cache) -> None:
+    """Replace the process-wide cache, e.g. with a RedisCache sharing a client"""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
@@ -1,6 +1,6 @@
 import os
-from openai import OpenAI
 import openai
+from .llm import create_embedding
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import logging
@@ -416,19 +416,13 @@ def get_embedding(text: str, model: str = "BAAI/bge-large-en-v1.5") -> list:
         EmbeddingError: If embedding generation fails
     """
     try:
-        client = OpenAI(
-            api_key=os.environ.get("HEURIST_API_KEY"), 
-            base_url=os.environ.get("HEURIST_BASE_URL")
+        # Goes through the LLM scheduler and its retry loop; the pooled client does not retry
+        return create_embedding(
+            os.environ.get("HEURIST_BASE_URL"),
+            os.environ.get("HEURIST_API_KEY"),
+            model,
+            text
         )
-
-        response = client.embeddings.create(
-            model=model,
-            input=text,
-            encoding_format="float"
-        )
-        
-        # Return the embedding vector for the input text
-        return response.data[0].embedding
         
     except Exception as e:
         logger.error(f"Failed to generate embedding: {str(e)}")
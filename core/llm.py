@@ -3,20 +3,257 @@ import json
 import time
 import os
 import logging
-from openai import OpenAI, AsyncOpenAI
-from typing import Dict, List, Union
+import threading
+import weakref
+import sys
+import httpx
+import openai
+from contextlib import AsyncExitStack
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Union
 import requests
 from types import SimpleNamespace
 import re
 import asyncio
+from .llm_cache import LLMResponseCache
+from .llm_scheduler import LLMScheduler, estimate_input_tokens, estimate_tokens
+from .llm_hedging import HedgePolicy, HedgeStats, run_hedged, run_hedged_async
+from .llm_router import ModelRouter
+from . import metrics
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 120))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 10))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 100))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 20))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 30))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 0)) or None
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 0)) or None
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", 0)) or None
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 2048))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() == "true"
+LLM_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD", 0.97))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 0.95))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", 0.5))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", 3))
+LLM_HEDGE_MAX = int(os.getenv("LLM_HEDGE_MAX", 1))
+LLM_HEDGE_FALLBACK_MODEL = os.getenv("LLM_HEDGE_FALLBACK_MODEL") or None
+CONFIG_MODEL_ROUTES = os.getenv("CONFIG_MODEL_ROUTES", "model_routes.yaml")
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", 4))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", 30)) or None
+
 class LLMError(Exception):
     """Custom exception for LLM-related errors"""
     pass
 
+# Pooled clients, keyed on (base_url, api_key). Sync clients are shared by all threads;
+# async clients are bound to the event loop that created them, so they are kept per loop.
+_clients_lock = threading.Lock()
+_sync_clients: Dict[tuple, OpenAI] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+    )
+
+def _http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+def get_openai_client(base_url: str, api_key: str) -> OpenAI:
+    """
+    Get a shared, connection-pooled OpenAI client for the given endpoint.
+
+    Parameters:
+        base_url (str): The API base URL.
+        api_key (str): The API key.
+
+    Returns:
+        OpenAI: A client reused by every call with the same base_url and api_key.
+    """
+    key = (base_url, api_key)
+    with _clients_lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                timeout=_http_timeout(),
+                max_retries=0,
+                http_client=DefaultHttpxClient(limits=_http_limits(), timeout=_http_timeout())
+            )
+            _sync_clients[key] = client
+        return client
+
+def get_async_openai_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """
+    Get a shared, connection-pooled AsyncOpenAI client for the running event loop.
+
+    Parameters:
+        base_url (str): The API base URL.
+        api_key (str): The API key.
+
+    Returns:
+        AsyncOpenAI: A client reused by every call on the current loop with the same base_url and api_key.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    key = (base_url, api_key)
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {}) if loop is not None else {}
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                timeout=_http_timeout(),
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(limits=_http_limits(), timeout=_http_timeout())
+            )
+            clients[key] = client
+        return client
+
+def close_openai_clients() -> None:
+    """
+    Close all pooled sync clients. Pooled async clients are closed on their own loops
+    when those are still running, without waiting; prefer aclose_openai_clients() from
+    inside a loop.
+    """
+    with _clients_lock:
+        sync_clients = list(_sync_clients.values())
+        async_clients = list(_async_clients.items())
+        _sync_clients.clear()
+        _async_clients.clear()
+    for client in sync_clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close LLM client: {e}")
+    for loop, clients in async_clients:
+        if loop.is_closed() or not loop.is_running():
+            # Their connections went with the loop, or cannot be closed without it
+            continue
+        for client in clients.values():
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+
+async def aclose_openai_clients() -> None:
+    """Close the pooled async clients of the running event loop"""
+    with _clients_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close LLM client: {e}")
+
+_scheduler: LLMScheduler = None
+_response_cache: LLMResponseCache = None
+_hedge_policy: HedgePolicy = None
+_hedge_stats = HedgeStats()
+_router: ModelRouter = None
+_router_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    """Get the process-wide scheduler every core.llm request goes through"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+            latency_target=LLM_LATENCY_TARGET
+        )
+    return _scheduler
+
+def configure_scheduler(**kwargs) -> LLMScheduler:
+    """Replace the process-wide scheduler, e.g. to set per-model limits. Takes LLMScheduler arguments."""
+    global _scheduler
+    _scheduler = LLMScheduler(**kwargs)
+    return _scheduler
+
+def get_response_cache() -> LLMResponseCache:
+    """Get the process-wide response cache used by calls made with use_cache=True"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = LLMResponseCache(
+            max_size=LLM_CACHE_SIZE,
+            ttl_seconds=LLM_CACHE_TTL,
+            semantic=LLM_CACHE_SEMANTIC,
+            similarity_threshold=LLM_CACHE_SIMILARITY_THRESHOLD
+        )
+    return _response_cache
+
+def configure_response_cache(**kwargs) -> LLMResponseCache:
+    """Replace the process-wide response cache, e.g. to enable the semantic tier. Takes LLMResponseCache arguments."""
+    global _response_cache
+    _response_cache = LLMResponseCache(**kwargs)
+    return _response_cache
+
+def get_hedge_policy() -> HedgePolicy:
+    """Get the default policy used by calls made with hedge=True"""
+    global _hedge_policy
+    if _hedge_policy is None:
+        _hedge_policy = HedgePolicy(
+            percentile=LLM_HEDGE_PERCENTILE,
+            min_delay=LLM_HEDGE_MIN_DELAY,
+            default_delay=LLM_HEDGE_DEFAULT_DELAY,
+            max_hedges=LLM_HEDGE_MAX,
+            fallback_model_id=LLM_HEDGE_FALLBACK_MODEL
+        )
+    return _hedge_policy
+
+def configure_hedging(**kwargs) -> HedgePolicy:
+    """Replace the default hedge policy. Takes HedgePolicy arguments."""
+    global _hedge_policy
+    _hedge_policy = HedgePolicy(**kwargs)
+    return _hedge_policy
+
+def hedge_stats() -> Dict:
+    """Counters for hedged calls: hedges issued, hedges won, etc."""
+    return _hedge_stats.stats()
+
+def get_router() -> ModelRouter:
+    """Get the router that picks models for calls made with task=..., loaded from config/CONFIG_MODEL_ROUTES"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter.from_yaml(Path(__file__).parent.parent / "config" / CONFIG_MODEL_ROUTES)
+        return _router
+
+def configure_router(**kwargs) -> ModelRouter:
+    """Replace the model router. Takes ModelRouter arguments."""
+    global _router
+    with _router_lock:
+        _router = ModelRouter(**kwargs)
+    return _router
+
+def _resolve_hedge(hedge: Union[bool, HedgePolicy]) -> Optional[HedgePolicy]:
+    if isinstance(hedge, HedgePolicy):
+        return hedge
+    return get_hedge_policy() if hedge else None
+
+async def _cache_get_async(cache: LLMResponseCache, *key):
+    # The semantic tier makes a blocking embedding request
+    if cache.semantic:
+        return await asyncio.to_thread(cache.get, *key)
+    return cache.get(*key)
+
+async def _cache_set_async(cache: LLMResponseCache, *key_and_value):
+    if cache.semantic:
+        await asyncio.to_thread(cache.set, *key_and_value)
+    else:
+        cache.set(*key_and_value)
+
 def _format_messages(system_prompt: str = None, user_prompt: str = None, messages: List[Dict] = None) -> List[Dict]:
     """Convert between different message formats while maintaining backward compatibility"""
     if messages is not None:
@@ -28,6 +265,182 @@ def _format_messages(system_prompt: str = None, user_prompt: str = None, message
         ]
     raise ValueError("Either (system_prompt, user_prompt) or messages must be provided")
 
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read the server's requested back-off from a rate-limit error, in seconds"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            value = headers['retry-after']
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        for header in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens'):
+            if headers.get(header):
+                match = re.fullmatch(r"(?:(\d+)h)?(?:(\d+)m(?!s))?(?:([\d.]+)s)?(?:(\d+)ms)?", headers[header])
+                if match and any(match.groups()):
+                    hours, minutes, seconds, millis = (float(g) if g else 0.0 for g in match.groups())
+                    return hours * 3600 + minutes * 60 + seconds + millis / 1000
+    except (TypeError, ValueError):
+        pass
+    return None
+
+# Client errors that will fail the same way on every attempt
+_NON_RETRYABLE_ERRORS = (
+    openai.BadRequestError,
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.NotFoundError,
+    openai.UnprocessableEntityError
+)
+
+def _complete(client: OpenAI, model_id: str, request: Dict, parse, priority: Optional[str], max_retries: int, initial_retry_delay: float):
+    """Run a chat completion through the scheduler, retrying transient failures"""
+    scheduler = get_scheduler()
+    tokens = estimate_tokens(request['messages'], request.get('max_tokens'))
+    retry_delay = initial_retry_delay
+    error = None
+
+    for attempt in range(max_retries):
+        retry_after = None
+        with scheduler.slot(model_id, priority, tokens) as slot:
+            try:
+                started = time.monotonic()
+                result = client.chat.completions.create(model=model_id, **request)
+                get_router().record(model_id, time.monotonic() - started, getattr(result, 'usage', None))
+                return parse(result)
+            except openai.RateLimitError as e:
+                retry_after = _retry_after(e)
+                slot.mark_rate_limited(retry_after)
+                error = e
+            except _NON_RETRYABLE_ERRORS as e:
+                slot.mark_failed()
+                raise LLMError(f"LLM API call failed: {str(e)}")
+            except (requests.exceptions.RequestException, KeyError, IndexError, json.JSONDecodeError, Exception) as e:
+                slot.mark_failed()
+                error = e
+        logger.warning(f"{type(error).__name__} (attempt {attempt + 1}/{max_retries}): {str(error)}")
+
+        if attempt < max_retries - 1:
+            # With Retry-After the scheduler pauses the model, so the next acquire waits instead
+            if retry_after is None:
+                logger.info(f"Retrying in {retry_delay} seconds...")
+                time.sleep(retry_delay)
+            retry_delay *= 2
+
+    raise LLMError(f"All retry attempts failed: {str(error)}")
+
+async def _complete_async(client: AsyncOpenAI, model_id: str, request: Dict, parse, priority: Optional[str], max_retries: int, initial_retry_delay: float):
+    """Async version of _complete"""
+    scheduler = get_scheduler()
+    tokens = estimate_tokens(request['messages'], request.get('max_tokens'))
+    retry_delay = initial_retry_delay
+    error = None
+
+    for attempt in range(max_retries):
+        retry_after = None
+        async with scheduler.slot_async(model_id, priority, tokens) as slot:
+            try:
+                started = time.monotonic()
+                result = await client.chat.completions.create(model=model_id, **request)
+                get_router().record(model_id, time.monotonic() - started, getattr(result, 'usage', None))
+                return parse(result)
+            except openai.RateLimitError as e:
+                retry_after = _retry_after(e)
+                slot.mark_rate_limited(retry_after)
+                error = e
+            except _NON_RETRYABLE_ERRORS as e:
+                slot.mark_failed()
+                raise LLMError(f"LLM API call failed: {str(e)}")
+            except (requests.exceptions.RequestException, KeyError, IndexError, json.JSONDecodeError, Exception) as e:
+                slot.mark_failed()
+                error = e
+        logger.warning(f"{type(error).__name__} (attempt {attempt + 1}/{max_retries}): {str(error)}")
+
+        if attempt < max_retries - 1:
+            if retry_after is None:
+                logger.info(f"Retrying in {retry_delay} seconds...")
+                await asyncio.sleep(retry_delay)
+            retry_delay *= 2
+
+    raise LLMError(f"All retry attempts failed: {str(error)}")
+
+def create_embedding(base_url: str, api_key: str, model_id: str, text: str, priority: Optional[str] = None, max_retries: int = 3, initial_retry_delay: float = 1) -> List[float]:
+    """
+    Embed text through the scheduler, retrying transient failures like chat completions.
+
+    The pooled clients have SDK retries disabled, so embeddings need this loop too.
+
+    Returns:
+        list: The embedding vector.
+
+    Raises:
+        LLMError: If every attempt fails or the request is rejected.
+    """
+    client = get_openai_client(base_url, api_key)
+    scheduler = get_scheduler()
+    tokens = estimate_input_tokens([{'content': text}])
+    retry_delay = initial_retry_delay
+    error = None
+
+    for attempt in range(max_retries):
+        retry_after = None
+        with scheduler.slot(model_id, priority, tokens) as slot:
+            try:
+                response = client.embeddings.create(model=model_id, input=text, encoding_format="float")
+                return response.data[0].embedding
+            except openai.RateLimitError as e:
+                retry_after = _retry_after(e)
+                slot.mark_rate_limited(retry_after)
+                error = e
+            except _NON_RETRYABLE_ERRORS as e:
+                slot.mark_failed()
+                raise LLMError(f"Embedding API call failed: {str(e)}")
+            except Exception as e:
+                slot.mark_failed()
+                error = e
+        logger.warning(f"{type(error).__name__} (embedding attempt {attempt + 1}/{max_retries}): {str(error)}")
+
+        if attempt < max_retries - 1:
+            if retry_after is None:
+                time.sleep(retry_delay)
+            retry_delay *= 2
+
+    raise LLMError(f"All embedding attempts failed: {str(error)}")
+
+def _dispatch(client: OpenAI, model_id: str, request: Dict, parse, priority: Optional[str], max_retries: int, initial_retry_delay: float, hedge: Union[bool, HedgePolicy]):
+    """Run _complete, hedged when a policy is given"""
+    policy = _resolve_hedge(hedge)
+    with metrics.phase("llm"):
+        if policy is None:
+            return _complete(client, model_id, request, parse, priority, max_retries, initial_retry_delay)
+        return run_hedged(
+            lambda hedge_model_id: _complete(client, hedge_model_id, request, parse, priority, max_retries, initial_retry_delay),
+            model_id, policy, get_scheduler(), _hedge_stats
+        )
+
+async def _dispatch_async(client: AsyncOpenAI, model_id: str, request: Dict, parse, priority: Optional[str], max_retries: int, initial_retry_delay: float, hedge: Union[bool, HedgePolicy]):
+    """Async version of _dispatch"""
+    policy = _resolve_hedge(hedge)
+    with metrics.phase("llm"):
+        if policy is None:
+            return await _complete_async(client, model_id, request, parse, priority, max_retries, initial_retry_delay)
+        return await run_hedged_async(
+            lambda hedge_model_id: _complete_async(client, hedge_model_id, request, parse, priority, max_retries, initial_retry_delay),
+            model_id, policy, get_scheduler(), _hedge_stats
+        )
+
+def _parse_content(result) -> str:
+    return result.choices[0].message.content
+
+def _parse_tool_response(result) -> Union[str, Dict]:
+    return _handle_tool_response(result.choices[0].message)
+
 def call_llm(
     base_url: str,
     api_key: str,
@@ -38,7 +451,12 @@ def call_llm(
     temperature: float = 0.7,
     max_tokens: int = 500,
     max_retries: int = 3,
-    initial_retry_delay: int = 1
+    initial_retry_delay: int = 1,
+    use_cache: bool = False,
+    priority: str = None,
+    hedge: Union[bool, HedgePolicy] = False,
+    task: str = None,
+    latency_slo: float = None
 ) -> str:
     """
     Call LLM with retry mechanism.
@@ -51,6 +469,16 @@ def call_llm(
         max_tokens (int): Maximum number of tokens to generate.
         max_retries (int): Number of retry attempts on failure.
         initial_retry_delay (int): Initial delay between retries, with exponential backoff.
+        use_cache (bool): Reuse responses for identical (or, with the semantic tier, near-identical)
+            prompts. Only meant for low-temperature calls whose output is effectively deterministic.
+        priority (str): Scheduling lane, "interactive" or "background". Defaults to the
+            priority set with llm_priority(), or "interactive".
+        hedge (bool | HedgePolicy): If no response arrives within the policy's latency
+            percentile, fire a duplicate (or fallback model) request and take the first
+            to finish. True uses the default policy from get_hedge_policy().
+        task (str): Declared task type (see core.llm_router). When the routing table has
+            a route for it, the model is picked from the route instead of model_id.
+        latency_slo (float): Seconds the call should complete in, used by routing.
 
     Returns:
         str: Generated text from LLM.
@@ -58,30 +486,33 @@ def call_llm(
     Raises:
         LLMError: If all retry attempts fail.
     """
-    client = OpenAI(base_url=base_url, api_key=api_key)
+    client = get_openai_client(base_url, api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
-    retry_delay = initial_retry_delay
-    
-    for attempt in range(max_retries):
-        try:
-            result = client.chat.completions.create(
-                model=model_id,
-                messages=formatted_messages,
-                stream=False,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            return result.choices[0].message.content
-            
-        except (requests.exceptions.RequestException, KeyError, IndexError, json.JSONDecodeError, Exception) as e:
-            logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{max_retries}): {str(e)}")
-            
-            if attempt < max_retries - 1:
-                logger.info(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-    
-    raise LLMError("All retry attempts failed")
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
+    cache = get_response_cache() if use_cache else None
+    if cache:
+        cached = cache.get(model_id, formatted_messages, None, temperature, max_tokens)
+        if cached is not None:
+            return cached
+
+    content = _dispatch(
+        client,
+        model_id,
+        {
+            'messages': formatted_messages,
+            'stream': False,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        },
+        _parse_content,
+        priority,
+        max_retries,
+        initial_retry_delay,
+        hedge
+    )
+    if cache:
+        cache.set(model_id, formatted_messages, None, temperature, max_tokens, content)
+    return content
 
 def call_llm_with_tools(
     base_url: str,
@@ -94,24 +525,43 @@ def call_llm_with_tools(
     max_tokens: int = None,
     max_retries: int = 3,
     tools: List[Dict] = None,
-    tool_choice: str = "auto"
+    tool_choice: str = "auto",
+    use_cache: bool = False,
+    priority: str = None,
+    initial_retry_delay: int = 1,
+    hedge: Union[bool, HedgePolicy] = False,
+    task: str = None,
+    latency_slo: float = None
 ) -> Union[str, Dict]:
-    client = OpenAI(base_url=base_url, api_key=api_key)
+    client = get_openai_client(base_url, api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
+    cache = get_response_cache() if use_cache else None
+    cache_key = (model_id, formatted_messages, [tools, tool_choice], temperature, max_tokens)
+    if cache:
+        cached = cache.get(*cache_key)
+        if cached is not None:
+            return cached
 
-    try:
-        response = client.chat.completions.create(
-            model=model_id,
-            messages=formatted_messages,
-            temperature=temperature,
-            tools=tools,
-            tool_choice=tool_choice if tools else None,
-            max_tokens=max_tokens
-        )
-        return _handle_tool_response(response.choices[0].message)
-
-    except Exception as e:
-        raise LLMError(f"LLM API call failed: {str(e)}")
+    result = _dispatch(
+        client,
+        model_id,
+        {
+            'messages': formatted_messages,
+            'temperature': temperature,
+            'tools': tools,
+            'tool_choice': tool_choice if tools else None,
+            'max_tokens': max_tokens
+        },
+        _parse_tool_response,
+        priority,
+        max_retries,
+        initial_retry_delay,
+        hedge
+    )
+    if cache:
+        cache.set(*cache_key, result)
+    return result
 
 async def call_llm_async(
     base_url: str,
@@ -123,34 +573,250 @@ async def call_llm_async(
     temperature: float = 0.7,
     max_tokens: int = 500,
     max_retries: int = 3,
-    initial_retry_delay: int = 1
+    initial_retry_delay: int = 1,
+    use_cache: bool = False,
+    priority: str = None,
+    hedge: Union[bool, HedgePolicy] = False,
+    task: str = None,
+    latency_slo: float = None
 ) -> str:
-    client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+    client = get_async_openai_client(base_url, api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
-    retry_delay = initial_retry_delay
-    
-    for attempt in range(max_retries):
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
+    cache = get_response_cache() if use_cache else None
+    if cache:
+        cached = await _cache_get_async(cache, model_id, formatted_messages, None, temperature, max_tokens)
+        if cached is not None:
+            return cached
+
+    content = await _dispatch_async(
+        client,
+        model_id,
+        {
+            'messages': formatted_messages,
+            'stream': False,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        },
+        _parse_content,
+        priority,
+        max_retries,
+        initial_retry_delay,
+        hedge
+    )
+    if cache:
+        await _cache_set_async(cache, model_id, formatted_messages, None, temperature, max_tokens, content)
+    return content
+
+async def call_llm_with_tools_async(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    system_prompt: str = None,
+    user_prompt: str = None,
+    messages: List[Dict] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 500,
+    max_retries: int = 3,
+    tools: List[Dict] = None,
+    tool_choice: str = "auto",
+    use_cache: bool = False,
+    priority: str = None,
+    initial_retry_delay: int = 1,
+    hedge: Union[bool, HedgePolicy] = False,
+    task: str = None,
+    latency_slo: float = None
+) -> Union[str, Dict]:
+    client = get_async_openai_client(base_url, api_key)
+    formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
+    cache = get_response_cache() if use_cache else None
+    cache_key = (model_id, formatted_messages, [tools, tool_choice], temperature, max_tokens)
+    if cache:
+        cached = await _cache_get_async(cache, *cache_key)
+        if cached is not None:
+            return cached
+
+    result = await _dispatch_async(
+        client,
+        model_id,
+        {
+            'messages': formatted_messages,
+            'temperature': temperature,
+            'tools': tools,
+            'tool_choice': tool_choice if tools else None,
+            'max_tokens': max_tokens
+        },
+        _parse_tool_response,
+        priority,
+        max_retries,
+        initial_retry_delay,
+        hedge
+    )
+    if cache:
+        await _cache_set_async(cache, *cache_key, result)
+    return result
+
+def _open_stream(slot, create, **request):
+    try:
+        return create(**request)
+    except openai.RateLimitError as e:
+        slot.mark_rate_limited(_retry_after(e))
+        raise
+
+async def _open_stream_async(slot, create, **request):
+    try:
+        return await create(**request)
+    except openai.RateLimitError as e:
+        slot.mark_rate_limited(_retry_after(e))
+        raise
+
+async def _start_stream_async(client: AsyncOpenAI, model_id: str, request: Dict, priority: Optional[str]):
+    """
+    Open a streamed completion inside a scheduler slot and wait for its first chunk.
+
+    Returns:
+        tuple: (exit stack owning the slot and stream, stream, first chunk or None)
+    """
+    stack = AsyncExitStack()
+    try:
+        slot = await stack.enter_async_context(
+            get_scheduler().slot_async(model_id, priority, estimate_tokens(request['messages'], request.get('max_tokens')))
+        )
+        slot.mark_streaming()
+        stream = await _open_stream_async(slot, client.chat.completions.create, model=model_id, **request)
+        stack.push_async_callback(stream.close)
         try:
-            result = await client.chat.completions.create(
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = None
+        slot.mark_first_chunk()
+        return stack, stream, first
+    except BaseException:
+        await stack.__aexit__(*sys.exc_info())
+        raise
+
+async def _discard_stream(started) -> None:
+    await started[0].aclose()
+
+async def _stream_chunks_async(client: AsyncOpenAI, model_id: str, request: Dict, priority: Optional[str], hedge: Union[bool, HedgePolicy]):
+    """Yield the chunks of a streamed completion, hedging time to first chunk when a policy is given"""
+    policy = _resolve_hedge(hedge)
+    if policy is None:
+        stack, stream, first = await _start_stream_async(client, model_id, request, priority)
+    else:
+        stack, stream, first = await run_hedged_async(
+            lambda hedge_model_id: _start_stream_async(client, hedge_model_id, request, priority),
+            model_id, policy, get_scheduler(), _hedge_stats, discard=_discard_stream, first_chunk=True
+        )
+    async with stack:
+        if first is not None:
+            yield first
+        async for chunk in stream:
+            yield chunk
+
+_TEXT_TOOL_CALL_PREFIX = "<function"
+
+class _StreamAccumulator:
+    """Collect streamed content and tool-call fragments into a complete message"""
+
+    def __init__(self, hold_text_tool_calls: bool = False):
+        self.content = ""
+        self.tool_calls: Dict[int, Dict[str, str]] = {}
+        self._hold_text_tool_calls = hold_text_tool_calls
+        self._released = 0
+
+    def add(self, chunk) -> str:
+        """
+        Merge one streamed chunk.
+
+        Returns:
+            str: The content that can be shown to the user now (may be empty).
+        """
+        if not chunk.choices:
+            return ""
+        delta = chunk.choices[0].delta
+        for fragment in getattr(delta, 'tool_calls', None) or []:
+            call = self.tool_calls.setdefault(fragment.index, {'id': None, 'name': "", 'arguments': ""})
+            if fragment.id:
+                call['id'] = fragment.id
+            if fragment.function:
+                if fragment.function.name:
+                    call['name'] += fragment.function.name
+                if fragment.function.arguments:
+                    call['arguments'] += fragment.function.arguments
+        if not getattr(delta, 'content', None):
+            return ""
+        self.content += delta.content
+        if self._hold_text_tool_calls:
+            # Some models emit <function=NAME>{...}</function> as plain text; don't leak it to the user
+            stripped = self.content.lstrip()
+            if stripped.startswith(_TEXT_TOOL_CALL_PREFIX) or _TEXT_TOOL_CALL_PREFIX.startswith(stripped):
+                return ""
+        released = self.content[self._released:]
+        self._released = len(self.content)
+        return released
+
+    def message(self) -> SimpleNamespace:
+        """Build a message object shaped like a non-streamed completion message"""
+        tool_calls = [
+            SimpleNamespace(
+                id=call['id'],
+                type='function',
+                function=SimpleNamespace(name=call['name'], arguments=call['arguments'] or "{}")
+            )
+            for _, call in sorted(self.tool_calls.items())
+        ]
+        return SimpleNamespace(content=self.content, tool_calls=tool_calls or None)
+
+def call_llm_stream(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    system_prompt: str = None,
+    user_prompt: str = None,
+    messages: List[Dict] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 500,
+    priority: str = None,
+    task: str = None,
+    latency_slo: float = None
+) -> Iterator[str]:
+    """
+    Stream an LLM completion.
+
+    Yields:
+        str: Content deltas as they arrive.
+
+    Raises:
+        LLMError: If the request fails.
+    """
+    client = get_openai_client(base_url, api_key)
+    formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
+    try:
+        with get_scheduler().slot(model_id, priority, estimate_tokens(formatted_messages, max_tokens)) as slot:
+            slot.mark_streaming()
+            stream = _open_stream(
+                slot,
+                client.chat.completions.create,
                 model=model_id,
                 messages=formatted_messages,
-                stream=False,
+                stream=True,
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-            return result.choices[0].message.content
-            
-        except (requests.exceptions.RequestException, KeyError, IndexError, json.JSONDecodeError, Exception) as e:
-            logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{max_retries}): {str(e)}")
-            
-            if attempt < max_retries - 1:
-                logger.info(f"Retrying in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-                retry_delay *= 2
-    
-    raise LLMError("All retry attempts failed")
+            accumulator = _StreamAccumulator()
+            for index, chunk in enumerate(stream):
+                if index == 0:
+                    slot.mark_first_chunk()
+                delta = accumulator.add(chunk)
+                if delta:
+                    yield delta
+    except Exception as e:
+        raise LLMError(f"LLM streaming call failed: {str(e)}")
 
-async def call_llm_with_tools_async(
+async def call_llm_stream_async(
     base_url: str,
     api_key: str,
     model_id: str,
@@ -159,49 +825,145 @@ async def call_llm_with_tools_async(
     messages: List[Dict] = None,
     temperature: float = 0.7,
     max_tokens: int = 500,
-    max_retries: int = 3,
-    tools: List[Dict] = None,
-    tool_choice: str = "auto"
-) -> Union[str, Dict]:
-    client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+    priority: str = None,
+    hedge: Union[bool, HedgePolicy] = False,
+    task: str = None,
+    latency_slo: float = None
+) -> AsyncIterator[str]:
+    """Async version of call_llm_stream. With hedge, the time to first chunk is hedged."""
+    client = get_async_openai_client(base_url, api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
+    request = {
+        'messages': formatted_messages,
+        'stream': True,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }
+    try:
+        accumulator = _StreamAccumulator()
+        async for chunk in _stream_chunks_async(client, model_id, request, priority, hedge):
+            delta = accumulator.add(chunk)
+            if delta:
+                yield delta
+    except Exception as e:
+        raise LLMError(f"LLM streaming call failed: {str(e)}")
 
+def call_llm_with_tools_stream(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    system_prompt: str = None,
+    user_prompt: str = None,
+    messages: List[Dict] = None,
+    temperature: float = 0.7,
+    max_tokens: int = None,
+    tools: List[Dict] = None,
+    tool_choice: str = "auto",
+    priority: str = None,
+    task: str = None,
+    latency_slo: float = None
+) -> Iterator[Dict]:
+    """
+    Stream an LLM completion that may call tools.
+
+    Yields:
+        dict: {'type': 'content', 'content': delta} for each content delta, then one
+        {'type': 'final', 'response': ...} where response has the same shape as
+        the return value of call_llm_with_tools.
+
+    Raises:
+        LLMError: If the request fails.
+    """
+    client = get_openai_client(base_url, api_key)
+    formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
     try:
-        response = await client.chat.completions.create(
-            model=model_id,
-            messages=formatted_messages,
-            temperature=temperature,
-            tools=tools,
-            tool_choice=tool_choice if tools else None,
-            max_tokens=max_tokens
-        )
-        return _handle_tool_response(response.choices[0].message)
+        with get_scheduler().slot(model_id, priority, estimate_tokens(formatted_messages, max_tokens)) as slot:
+            slot.mark_streaming()
+            stream = _open_stream(
+                slot,
+                client.chat.completions.create,
+                model=model_id,
+                messages=formatted_messages,
+                stream=True,
+                temperature=temperature,
+                tools=tools,
+                tool_choice=tool_choice if tools else None,
+                max_tokens=max_tokens
+            )
+            accumulator = _StreamAccumulator(hold_text_tool_calls=bool(tools))
+            for index, chunk in enumerate(stream):
+                if index == 0:
+                    slot.mark_first_chunk()
+                delta = accumulator.add(chunk)
+                if delta:
+                    yield {'type': 'content', 'content': delta}
+    except Exception as e:
+        raise LLMError(f"LLM streaming call failed: {str(e)}")
+    yield {'type': 'final', 'response': _handle_tool_response(accumulator.message())}
 
+async def call_llm_with_tools_stream_async(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    system_prompt: str = None,
+    user_prompt: str = None,
+    messages: List[Dict] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 500,
+    tools: List[Dict] = None,
+    tool_choice: str = "auto",
+    priority: str = None,
+    hedge: Union[bool, HedgePolicy] = False,
+    task: str = None,
+    latency_slo: float = None
+) -> AsyncIterator[Dict]:
+    """Async version of call_llm_with_tools_stream. With hedge, the time to first chunk is hedged."""
+    client = get_async_openai_client(base_url, api_key)
+    formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+    model_id = get_router().route(task, model_id, formatted_messages, max_tokens, latency_slo)
+    request = {
+        'messages': formatted_messages,
+        'stream': True,
+        'temperature': temperature,
+        'tools': tools,
+        'tool_choice': tool_choice if tools else None,
+        'max_tokens': max_tokens
+    }
+    try:
+        accumulator = _StreamAccumulator(hold_text_tool_calls=bool(tools))
+        async for chunk in _stream_chunks_async(client, model_id, request, priority, hedge):
+            delta = accumulator.add(chunk)
+            if delta:
+                yield {'type': 'content', 'content': delta}
     except Exception as e:
-        raise LLMError(f"LLM API call failed: {str(e)}")
+        raise LLMError(f"LLM streaming call failed: {str(e)}")
+    yield {'type': 'final', 'response': _handle_tool_response(accumulator.message())}
 
-def extract_function_calls_to_tool_calls(llm_text: str) -> SimpleNamespace:
+def extract_function_calls_to_tool_calls(llm_text: str) -> Optional[List[SimpleNamespace]]:
     
     """
-    Scan the LLM's text output for a <function=NAME>{...}</function> pattern,
-    and convert to appropriate format for tool calls
+    Scan the LLM's text output for <function=NAME>{...}</function> patterns,
+    and convert them to the format of tool calls
     """
     pattern = r"<function=([^>]+)>(.*?)(?:</function>|<function>|<function/>|></function>)"
     matches = re.findall(pattern, llm_text)
     
     # If we find at least one match
     if matches:
-        function_name, args_json_str = matches[0]  # Just take the first match
-        # Parse the JSON to ensure it's valid
-        parsed_args = json.loads(args_json_str.strip())
-        
-
-        function_obj = SimpleNamespace(
-            name=function_name,
-            arguments=json.dumps(parsed_args)
-        )
-        # Build the structure that your existing code expects
-        return SimpleNamespace(function=function_obj)
+        tool_calls = []
+        for index, (function_name, args_json_str) in enumerate(matches):
+            # Parse the JSON to ensure it's valid
+            parsed_args = json.loads(args_json_str.strip())
+
+            function_obj = SimpleNamespace(
+                name=function_name,
+                arguments=json.dumps(parsed_args)
+            )
+            # Build the structure that your existing code expects
+            tool_calls.append(SimpleNamespace(id=f"call_{index}", type='function', function=function_obj))
+        return tool_calls
     
     # If no matches, return an empty dict or whatever fallback you need
     return None
@@ -209,14 +971,14 @@ def extract_function_calls_to_tool_calls(llm_text: str) -> SimpleNamespace:
 def _handle_tool_response(message):
     if hasattr(message, 'tool_calls') and message.tool_calls:
         return {
-            'tool_calls': message.tool_calls[0],
+            'tool_calls': list(message.tool_calls),
             'content': message.content
         }
     if hasattr(message, 'content') and message.content:
         text_response = message.content
         tool_calls = extract_function_calls_to_tool_calls(text_response)
         if tool_calls:
-            logger.info("found tool calls in response")
+            logger.info(f"found {len(tool_calls)} tool calls in response")
             return {
                 'tool_calls': tool_calls,
                 'content': ""
@@ -225,4 +987,46 @@ def _handle_tool_response(message):
             return {
                 'content': text_response
             }
-    return message
\ No newline at end of file
+    return message
+
+def tool_calls_message(tool_calls: List, content: str = None) -> Dict:
+    """
+    Assistant message repeating the model's tool calls. It goes before the tool messages
+    answering them when the results are sent back in a follow-up call.
+    """
+    return {
+        'role': 'assistant',
+        'content': content or "",
+        'tool_calls': [
+            {
+                'id': tool_call.id,
+                'type': 'function',
+                'function': {'name': tool_call.function.name, 'arguments': tool_call.function.arguments}
+            }
+            for tool_call in tool_calls
+        ]
+    }
+
+async def run_tool_calls(
+    tool_calls: List,
+    execute,
+    concurrency: int = TOOL_CALL_CONCURRENCY,
+    timeout: Optional[float] = TOOL_CALL_TIMEOUT
+) -> List:
+    """
+    Run await execute(name, args) for each tool call, at most `concurrency` at a time
+    and each limited to `timeout` seconds.
+
+    Returns:
+        list: One result per tool call, in call order. A call that fails, times out or is
+        cancelled gives its exception instead (check BaseException, as CancelledError is
+        one), so one bad call does not lose the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(tool_call):
+        async with semaphore:
+            args = json.loads(tool_call.function.arguments or "{}")
+            return await asyncio.wait_for(execute(tool_call.function.name, args), timeout)
+
+    return await asyncio.gather(*(run(tool_call) for tool_call in tool_calls), return_exceptions=True)
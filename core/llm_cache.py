@@ -0,0 +1,169 @@
+import copy
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _prompt_text(messages: List[Dict]) -> str:
+    return "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages)
+
+class LLMResponseCache:
+    """
+    Response cache for (near-)deterministic LLM calls.
+
+    The exact tier is keyed on (model, messages hash, tools hash, temperature, max_tokens).
+    The optional semantic tier embeds the prompt and reuses the response of a previous
+    prompt whose embedding is at least similarity_threshold similar, as long as model,
+    tools, temperature and max_tokens match exactly.
+
+    Responses are copied in and out, so callers may modify what they get back.
+    """
+
+    def __init__(self,
+                 max_size: int = 2048,
+                 ttl_seconds: float = 3600,
+                 semantic: bool = False,
+                 similarity_threshold: float = 0.97,
+                 max_semantic_entries: int = 512,
+                 embed_fn: Optional[Callable[[str], List[float]]] = None):
+        self.exact = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self._embed_fn = embed_fn
+        # scope -> OrderedDict[exact key, normalized embedding]
+        self._vectors: Dict[str, "OrderedDict[str, np.ndarray]"] = {}
+        self._vector_count = 0
+        # exact key -> embedding computed by a missed lookup, reused when the response is stored
+        self._pending: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_id: str, messages: List[Dict], tools: Optional[List[Dict]], temperature: float, max_tokens: Optional[int]) -> str:
+        return f"{model_id}:{_digest(messages)}:{_digest(tools)}:{temperature}:{max_tokens}"
+
+    @staticmethod
+    def _scope(model_id: str, tools: Optional[List[Dict]], temperature: float, max_tokens: Optional[int]) -> str:
+        return f"{model_id}:{_digest(tools)}:{temperature}:{max_tokens}"
+
+    def _embed(self, messages: List[Dict]) -> Optional[np.ndarray]:
+        if self._embed_fn is None:
+            from .embedding import get_embedding
+            self._embed_fn = get_embedding
+        try:
+            vector = np.asarray(self._embed_fn(_prompt_text(messages)), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Failed to embed prompt for semantic cache: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get(self, model_id: str, messages: List[Dict], tools: Optional[List[Dict]], temperature: float, max_tokens: Optional[int]) -> Any:
+        """Return a cached response or None"""
+        key = self.make_key(model_id, messages, tools, temperature, max_tokens)
+        value = self.exact.get(key)
+        if value is not None:
+            self.exact_hits += 1
+            return copy.deepcopy(value)
+
+        if self.semantic:
+            value = self._semantic_lookup(self._scope(model_id, tools, temperature, max_tokens), key, messages)
+            if value is not None:
+                self.semantic_hits += 1
+                return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    def _semantic_lookup(self, scope: str, key: str, messages: List[Dict]) -> Any:
+        with self._lock:
+            candidates = self._vectors.get(scope)
+            if not candidates:
+                return None
+            keys = list(candidates.keys())
+            matrix = np.stack(list(candidates.values()))
+        vector = self._embed(messages)
+        if vector is None:
+            return None
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            self._remember_pending(key, vector)
+            return None
+        value = self.exact.get(keys[best])
+        if value is None:
+            # Expired or evicted from the exact tier; drop the stale vector too
+            with self._lock:
+                if candidates.pop(keys[best], None) is not None:
+                    self._vector_count -= 1
+            self._remember_pending(key, vector)
+        return value
+
+    def _remember_pending(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._pending[key] = vector
+            self._pending.move_to_end(key)
+            while len(self._pending) > self.max_semantic_entries:
+                self._pending.popitem(last=False)
+
+    def set(self, model_id: str, messages: List[Dict], tools: Optional[List[Dict]], temperature: float, max_tokens: Optional[int], value: Any) -> None:
+        """Store a response"""
+        if value is None:
+            return
+        key = self.make_key(model_id, messages, tools, temperature, max_tokens)
+        self.exact.set(key, copy.deepcopy(value))
+        if not self.semantic:
+            return
+        with self._lock:
+            vector = self._pending.pop(key, None)
+        if vector is None:
+            vector = self._embed(messages)
+        if vector is None:
+            return
+        scope = self._scope(model_id, tools, temperature, max_tokens)
+        with self._lock:
+            candidates = self._vectors.setdefault(scope, OrderedDict())
+            if key not in candidates:
+                self._vector_count += 1
+            candidates[key] = vector
+            candidates.move_to_end(key)
+            while self._vector_count > self.max_semantic_entries:
+                # Evict the oldest vector from the largest scope
+                largest = max(self._vectors.values(), key=len)
+                largest.popitem(last=False)
+                self._vector_count -= 1
+
+    def clear(self) -> None:
+        self.exact.clear()
+        with self._lock:
+            self._vectors.clear()
+            self._vector_count = 0
+            self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit-rate metrics for both tiers"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            'lookups': lookups,
+            'exact_hits': self.exact_hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'hit_rate': (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            'size': len(self.exact),
+            'semantic_entries': self._vector_count,
+            'evictions': self.exact.evictions
+        }
@@ -0,0 +1,173 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class HedgePolicy:
+    """
+    When and how to hedge an LLM call.
+
+    If no response has arrived after the hedge delay, another request is fired, either a
+    duplicate or the same prompt to fallback_model_id. The first successful response wins.
+    The delay is the given percentile of the model's observed latency (from the scheduler),
+    clamped to at least min_delay, or default_delay until enough samples exist. Streams
+    are hedged on time to first chunk, so they use that percentile instead.
+    max_hedges bounds the extra requests a single call may make.
+    """
+
+    def __init__(self,
+                 percentile: float = 0.95,
+                 min_delay: float = 0.5,
+                 default_delay: float = 3.0,
+                 max_hedges: int = 1,
+                 fallback_model_id: Optional[str] = None):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.max_hedges = max_hedges
+        self.fallback_model_id = fallback_model_id
+
+    def hedge_delay(self, model_id: str, scheduler, first_chunk: bool = False) -> float:
+        if first_chunk:
+            observed = scheduler.first_chunk_percentile(model_id, self.percentile)
+        else:
+            observed = scheduler.latency_percentile(model_id, self.percentile)
+        if observed is None:
+            return self.default_delay
+        return max(self.min_delay, observed)
+
+    def hedge_model(self, model_id: str) -> str:
+        return self.fallback_model_id or model_id
+
+class HedgeStats:
+    """Counters for hedged calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges_issued = 0
+        self.hedges_won = 0
+        self.primary_won = 0
+        self.failed = 0
+
+    def record(self, hedges_issued: int, winner: Optional[int]) -> None:
+        with self._lock:
+            self.calls += 1
+            self.hedges_issued += hedges_issued
+            if winner is None:
+                self.failed += 1
+            elif winner == 0:
+                self.primary_won += 1
+            else:
+                self.hedges_won += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'hedges_issued': self.hedges_issued,
+                'hedges_won': self.hedges_won,
+                'primary_won': self.primary_won,
+                'failed': self.failed,
+                'hedge_rate': self.hedges_issued / self.calls if self.calls else 0.0
+            }
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        return _executor
+
+def run_hedged(call: Callable[[str], Any], model_id: str, policy: HedgePolicy, scheduler, stats: HedgeStats) -> Any:
+    """
+    Run call(model_id) with hedging.
+
+    A blocking request cannot be interrupted, so the losing request is abandoned and
+    its result discarded when it completes. Attempts run in pool threads with a copy of
+    the caller's context, so context-derived settings such as the LLM priority carry over.
+    """
+    executor = _get_executor()
+    attempts: Dict[Any, int] = {executor.submit(contextvars.copy_context().run, call, model_id): 0}
+    budget = policy.max_hedges
+    error: Optional[BaseException] = None
+    deadline = time.monotonic() + policy.hedge_delay(model_id, scheduler)
+
+    while True:
+        timeout = max(0.0, deadline - time.monotonic()) if budget > 0 else None
+        done, _ = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = attempts.pop(future)
+            if future.exception() is None:
+                for loser in attempts:
+                    loser.cancel()
+                stats.record(policy.max_hedges - budget, index)
+                return future.result()
+            error = future.exception()
+            logger.warning(f"Hedged LLM attempt {index} failed: {error}")
+
+        if budget > 0 and (not done or not attempts):
+            # Hedge when the delay elapses, or right away once every in-flight attempt has failed
+            budget -= 1
+            index = policy.max_hedges - budget
+            hedge_model_id = policy.hedge_model(model_id)
+            logger.info(f"Hedging LLM call to {model_id} with attempt {index} on {hedge_model_id}")
+            attempts[executor.submit(contextvars.copy_context().run, call, hedge_model_id)] = index
+            deadline = time.monotonic() + policy.hedge_delay(hedge_model_id, scheduler)
+        elif not attempts:
+            stats.record(policy.max_hedges - budget, None)
+            raise error
+
+async def run_hedged_async(call: Callable[[str], Awaitable[Any]],
+                           model_id: str,
+                           policy: HedgePolicy,
+                           scheduler,
+                           stats: HedgeStats,
+                           discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+                           first_chunk: bool = False) -> Any:
+    """
+    Async version of run_hedged. Losing requests are cancelled; discard is awaited with
+    the result of a loser that had already completed, e.g. to close an open stream.
+    With first_chunk, call opens a stream and the delay comes from time-to-first-chunk samples.
+    """
+    attempts: Dict[asyncio.Task, int] = {asyncio.ensure_future(call(model_id)): 0}
+    budget = policy.max_hedges
+    error: Optional[BaseException] = None
+    deadline = time.monotonic() + policy.hedge_delay(model_id, scheduler, first_chunk)
+
+    try:
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if budget > 0 else None
+            done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = attempts.pop(task)
+                if task.exception() is None:
+                    stats.record(policy.max_hedges - budget, index)
+                    return task.result()
+                error = task.exception()
+                logger.warning(f"Hedged LLM attempt {index} failed: {error}")
+
+            if budget > 0 and (not done or not attempts):
+                budget -= 1
+                index = policy.max_hedges - budget
+                hedge_model_id = policy.hedge_model(model_id)
+                logger.info(f"Hedging LLM call to {model_id} with attempt {index} on {hedge_model_id}")
+                attempts[asyncio.ensure_future(call(hedge_model_id))] = index
+                deadline = time.monotonic() + policy.hedge_delay(hedge_model_id, scheduler, first_chunk)
+            elif not attempts:
+                stats.record(policy.max_hedges - budget, None)
+                raise error
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+            elif discard and not task.cancelled() and task.exception() is None:
+                await discard(task.result())
@@ -0,0 +1,166 @@
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from .llm_scheduler import estimate_input_tokens
+
+logger = logging.getLogger(__name__)
+
+# Task types callers can declare; the routing table decides which model serves each
+TASK_CHAT = "chat"
+TASK_CLASSIFICATION = "classification"
+TASK_TOOL_SELECTION = "tool_selection"
+TASK_EXTRACTION = "extraction"
+
+# Alias for the model the caller passed in
+DEFAULT_MODEL_ALIAS = "default"
+
+# Observations needed before a model's latency estimate is trusted
+_MIN_SAMPLES = 5
+
+_ENV_PATTERN = re.compile(r"\$\{(\w+)(?::-([^}]*))?\}")
+
+def _expand_env(value: str) -> str:
+    """Expand ${VAR} and ${VAR:-default} references"""
+    return _ENV_PATTERN.sub(lambda m: os.getenv(m.group(1)) or (m.group(2) or ""), value)
+
+class ModelMetrics:
+    """Latency and token throughput observed for one model"""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_ewma: Optional[float] = None
+        self.output_tps_ewma: Optional[float] = None
+
+    def record(self, latency: float, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        self.requests += 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if completion_tokens and latency > 0:
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens
+            tps = completion_tokens / latency
+            self.output_tps_ewma = tps if self.output_tps_ewma is None else 0.8 * self.output_tps_ewma + 0.2 * tps
+
+    def estimate_latency(self, max_tokens: Optional[int]) -> Optional[float]:
+        """Expected seconds for a completion of up to max_tokens, or None without enough data"""
+        if self.requests < _MIN_SAMPLES:
+            return None
+        if not self.output_tps_ewma:
+            return self.latency_ewma
+        expected_tokens = max_tokens or self.completion_tokens / self.requests
+        return expected_tokens / self.output_tps_ewma
+
+class ModelRouter:
+    """
+    Pick a model per call from the declared task type, estimated input tokens and latency SLO.
+
+    routes maps a task type to an ordered list of rules:
+        {'max_input_tokens': 4000, 'latency_slo': 5, 'models': ['small', 'large']}
+    The first rule whose max_input_tokens (if any) covers the prompt applies. Its models are
+    in preference order; with a latency SLO (from the call or the rule) the first model whose
+    estimated latency fits is chosen, otherwise the first model. models maps aliases to model
+    IDs; "default" is the model the caller passed. Tasks without routes keep the caller's model.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, List[Dict[str, Any]]]] = None, models: Optional[Dict[str, str]] = None):
+        self.routes = routes or {}
+        self.models = models or {}
+        self._metrics: Dict[str, ModelMetrics] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_yaml(cls, path: Path) -> 'ModelRouter':
+        """Load a routing table; a missing file gives a router that never reroutes"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            logger.info(f"No model routing table at {path}, using caller-selected models")
+            return cls()
+        models = {alias: _expand_env(str(model)) for alias, model in (config.get('models') or {}).items()}
+        return cls(routes=config.get('routes') or {}, models=models)
+
+    def _resolve(self, alias: str, model_id: str) -> str:
+        if alias == DEFAULT_MODEL_ALIAS:
+            return model_id
+        return self.models.get(alias) or alias
+
+    def route(self,
+              task: Optional[str],
+              model_id: str,
+              messages: List[Dict],
+              max_tokens: Optional[int] = None,
+              latency_slo: Optional[float] = None) -> str:
+        """
+        Choose the model for a call.
+
+        Args:
+            task: Declared task type, e.g. TASK_CLASSIFICATION
+            model_id: Model the caller asked for, used when no route applies
+            messages: Prompt messages, used to estimate input tokens
+            max_tokens: Completion limit of the call
+            latency_slo: Seconds the call should complete in; overrides the rule's SLO
+
+        Returns:
+            str: Model ID to call
+        """
+        rules = self.routes.get(task) if task else None
+        if not rules:
+            return model_id
+        input_tokens = estimate_input_tokens(messages)
+        for rule in rules:
+            limit = rule.get('max_input_tokens')
+            if limit is not None and input_tokens > limit:
+                continue
+            candidates = [self._resolve(alias, model_id) for alias in rule.get('models') or [DEFAULT_MODEL_ALIAS]]
+            candidates = [candidate for candidate in candidates if candidate]
+            if not candidates:
+                continue
+            slo = latency_slo if latency_slo is not None else rule.get('latency_slo')
+            return self._pick(candidates, max_tokens, slo)
+        return model_id
+
+    def _pick(self, candidates: List[str], max_tokens: Optional[int], slo: Optional[float]) -> str:
+        if slo is None:
+            return candidates[0]
+        estimates = {}
+        with self._lock:
+            for candidate in candidates:
+                metrics = self._metrics.get(candidate)
+                estimates[candidate] = metrics.estimate_latency(max_tokens) if metrics else None
+        for candidate in candidates:
+            if estimates[candidate] is None or estimates[candidate] <= slo:
+                return candidate
+        # Nothing meets the SLO; take the fastest
+        return min(candidates, key=lambda candidate: estimates[candidate])
+
+    def record(self, model_id: str, latency: float, usage: Any = None) -> None:
+        """Record a completed request; usage is the response's token usage, if reported"""
+        with self._lock:
+            metrics = self._metrics.setdefault(model_id, ModelMetrics())
+            metrics.record(
+                latency,
+                getattr(usage, 'prompt_tokens', None),
+                getattr(usage, 'completion_tokens', None)
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model latency and throughput, for tuning the routing table"""
+        with self._lock:
+            return {
+                model_id: {
+                    'requests': metrics.requests,
+                    'latency_ewma': metrics.latency_ewma,
+                    'output_tokens_per_second': metrics.output_tps_ewma,
+                    'prompt_tokens': metrics.prompt_tokens,
+                    'completion_tokens': metrics.completion_tokens
+                }
+                for model_id, metrics in self._metrics.items()
+            }
@@ -0,0 +1,362 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+_PRIORITY_RANK = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 1}
+
+# Longest a waiter sleeps before re-checking; releases wake waiters earlier
+_MAX_WAIT = 1.0
+
+_current_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+@contextmanager
+def llm_priority(priority: str):
+    """
+    Set the default scheduling priority for LLM calls made in this context.
+
+    Example:
+        with llm_priority(PRIORITY_BACKGROUND):
+            await agent.agent_cot(...)
+    """
+    if priority not in _PRIORITY_RANK:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+def estimate_input_tokens(messages: List[Dict]) -> int:
+    """Rough prompt token estimate (~4 characters per token)"""
+    return sum(len(str(m.get('content') or "")) for m in messages) // 4
+
+def estimate_tokens(messages: List[Dict], max_tokens: Optional[int] = None) -> int:
+    """Rough token estimate for prompt plus completion"""
+    return estimate_input_tokens(messages) + (max_tokens or 256)
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute, holding at most one minute of budget"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be consumed (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+class _Waiter:
+    __slots__ = ('rank', 'loop', 'future')
+
+    def __init__(self, rank: tuple):
+        self.rank = rank
+        self.loop = None
+        self.future = None
+
+    def __lt__(self, other: '_Waiter') -> bool:
+        return self.rank < other.rank
+
+class _ModelState:
+    def __init__(self, max_concurrency: int, min_concurrency: int, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.waiters: List[_Waiter] = []
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.latencies: deque = deque(maxlen=256)
+        self.first_chunk_latencies: deque = deque(maxlen=256)
+        self.completed = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+class SchedulerSlot:
+    """Handle for one admitted request; report rate limiting or failures through it"""
+
+    def __init__(self, scheduler: 'LLMScheduler', model_id: str):
+        self._scheduler = scheduler
+        self.model_id = model_id
+        self.started = time.monotonic()
+        self.outcome = "success"
+        self.retry_after: Optional[float] = None
+        self.streaming = False
+
+    def mark_streaming(self) -> None:
+        """The slot is held for a whole stream, so its duration is not a completion latency"""
+        self.streaming = True
+
+    def mark_first_chunk(self) -> None:
+        self._scheduler._record_first_chunk(self.model_id, time.monotonic() - self.started)
+
+    def mark_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        self.outcome = "rate_limited"
+        self.retry_after = retry_after
+
+    def mark_failed(self) -> None:
+        self.outcome = "failed"
+
+    def mark_cancelled(self) -> None:
+        self.outcome = "cancelled"
+
+class LLMScheduler:
+    """
+    Admission control for LLM requests.
+
+    Each model gets an adaptive concurrency limit (AIMD: additive increase on success,
+    multiplicative decrease on 429s or when latency exceeds latency_target), optional
+    token buckets for requests and tokens per minute, and a pause honoring Retry-After.
+    Interactive requests are always admitted before waiting background requests.
+    Safe to use from multiple threads and multiple event loops.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 16,
+                 min_concurrency: int = 1,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 latency_target: Optional[float] = None,
+                 model_limits: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.defaults = {
+            'max_concurrency': max_concurrency,
+            'min_concurrency': min_concurrency,
+            'requests_per_minute': requests_per_minute,
+            'tokens_per_minute': tokens_per_minute
+        }
+        self.latency_target = latency_target
+        self.model_limits = model_limits or {}
+        self._models: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._sequence = itertools.count()
+
+    def _state(self, model_id: str) -> _ModelState:
+        state = self._models.get(model_id)
+        if state is None:
+            settings = {**self.defaults, **self.model_limits.get(model_id, {})}
+            state = _ModelState(**settings)
+            self._models[model_id] = state
+        return state
+
+    def _try_acquire(self, state: _ModelState, waiter: _Waiter, tokens: int) -> Optional[float]:
+        """Admit waiter if possible. Returns None when admitted, otherwise seconds to wait."""
+        now = time.monotonic()
+        if state.paused_until > now:
+            return state.paused_until - now
+        if state.waiters[0] is not waiter:
+            return _MAX_WAIT
+        if state.in_flight >= max(state.min_concurrency, int(state.limit)):
+            return _MAX_WAIT
+        wait = 0.0
+        if state.requests:
+            wait = max(wait, state.requests.wait_time(1, now))
+        if state.tokens:
+            wait = max(wait, state.tokens.wait_time(tokens, now))
+        if wait > 0:
+            return min(wait, _MAX_WAIT)
+        if state.requests:
+            state.requests.consume(1)
+        if state.tokens:
+            state.tokens.consume(tokens)
+        state.in_flight += 1
+        heapq.heappop(state.waiters)
+        return None
+
+    def _notify(self, state: _ModelState) -> None:
+        """Wake sync and async waiters of a model. Caller holds the lock."""
+        self._condition.notify_all()
+        for waiter in state.waiters:
+            if waiter.future is not None and not waiter.future.done():
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def _enqueue(self, model_id: str, priority: Optional[str]) -> tuple:
+        state = self._state(model_id)
+        rank = (_PRIORITY_RANK.get(priority or current_priority(), 0), next(self._sequence))
+        waiter = _Waiter(rank)
+        heapq.heappush(state.waiters, waiter)
+        return state, waiter
+
+    def _dequeue(self, state: _ModelState, waiter: _Waiter) -> None:
+        if waiter in state.waiters:
+            state.waiters.remove(waiter)
+            heapq.heapify(state.waiters)
+            self._notify(state)
+
+    def acquire(self, model_id: str, priority: Optional[str] = None, tokens: int = 0) -> SchedulerSlot:
+        """Block until a request to model_id may start"""
+        with self._condition:
+            state, waiter = self._enqueue(model_id, priority)
+            try:
+                while True:
+                    wait = self._try_acquire(state, waiter, tokens)
+                    if wait is None:
+                        self._notify(state)
+                        return SchedulerSlot(self, model_id)
+                    self._condition.wait(wait)
+            except BaseException:
+                self._dequeue(state, waiter)
+                raise
+
+    async def acquire_async(self, model_id: str, priority: Optional[str] = None, tokens: int = 0) -> SchedulerSlot:
+        """Wait without blocking the event loop until a request to model_id may start"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state, waiter = self._enqueue(model_id, priority)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire(state, waiter, tokens)
+                    if wait is None:
+                        waiter.future = None
+                        self._notify(state)
+                        return SchedulerSlot(self, model_id)
+                    waiter.loop = loop
+                    waiter.future = loop.create_future()
+                    future = waiter.future
+                try:
+                    await asyncio.wait_for(future, wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                self._dequeue(state, waiter)
+            raise
+
+    def release(self, slot: SchedulerSlot) -> None:
+        """Finish a request and adapt the model's concurrency limit"""
+        latency = time.monotonic() - slot.started
+        with self._lock:
+            state = self._state(slot.model_id)
+            state.in_flight -= 1
+            if slot.outcome == "rate_limited":
+                state.rate_limited += 1
+                state.limit = max(state.min_concurrency, state.limit / 2)
+                if slot.retry_after:
+                    state.paused_until = max(state.paused_until, time.monotonic() + slot.retry_after)
+                logger.warning(f"Rate limited by {slot.model_id}, concurrency limit now {state.limit:.1f}")
+            elif slot.outcome == "failed":
+                state.failed += 1
+            elif slot.outcome == "success" and slot.streaming:
+                # Stream length depends on the output, not on load; only time to first chunk is sampled
+                state.completed += 1
+                state.limit = min(state.max_concurrency, state.limit + 1.0 / max(state.limit, 1.0))
+            elif slot.outcome == "success":
+                state.completed += 1
+                state.latencies.append(latency)
+                state.latency_ewma = latency if state.latency_ewma is None else 0.8 * state.latency_ewma + 0.2 * latency
+                if self.latency_target and latency > self.latency_target:
+                    state.limit = max(state.min_concurrency, state.limit * 0.9)
+                else:
+                    state.limit = min(state.max_concurrency, state.limit + 1.0 / max(state.limit, 1.0))
+            self._notify(state)
+
+    @contextmanager
+    def slot(self, model_id: str, priority: Optional[str] = None, tokens: int = 0):
+        slot = self.acquire(model_id, priority, tokens)
+        try:
+            yield slot
+        except (asyncio.CancelledError, GeneratorExit):
+            slot.mark_cancelled()
+            raise
+        except BaseException:
+            if slot.outcome == "success":
+                slot.mark_failed()
+            raise
+        finally:
+            self.release(slot)
+
+    @asynccontextmanager
+    async def slot_async(self, model_id: str, priority: Optional[str] = None, tokens: int = 0):
+        slot = await self.acquire_async(model_id, priority, tokens)
+        try:
+            yield slot
+        except (asyncio.CancelledError, GeneratorExit):
+            slot.mark_cancelled()
+            raise
+        except BaseException:
+            if slot.outcome == "success":
+                slot.mark_failed()
+            raise
+        finally:
+            self.release(slot)
+
+    def latency_percentile(self, model_id: str, percentile: float, min_samples: int = 20) -> Optional[float]:
+        """Observed completion latency percentile (0-1) for a model, or None without enough samples"""
+        with self._lock:
+            state = self._models.get(model_id)
+            if state is None or len(state.latencies) < min_samples:
+                return None
+            return self._percentile(state.latencies, percentile)
+
+    def first_chunk_percentile(self, model_id: str, percentile: float, min_samples: int = 20) -> Optional[float]:
+        """Observed time-to-first-chunk percentile (0-1) of a model's streams, or None without enough samples"""
+        with self._lock:
+            state = self._models.get(model_id)
+            if state is None or len(state.first_chunk_latencies) < min_samples:
+                return None
+            return self._percentile(state.first_chunk_latencies, percentile)
+
+    def _record_first_chunk(self, model_id: str, latency: float) -> None:
+        with self._lock:
+            self._state(model_id).first_chunk_latencies.append(latency)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model scheduler state"""
+        with self._lock:
+            return {
+                model_id: {
+                    'concurrency_limit': round(state.limit, 2),
+                    'in_flight': state.in_flight,
+                    'waiting': len(state.waiters),
+                    'completed': state.completed,
+                    'failed': state.failed,
+                    'rate_limited': state.rate_limited,
+                    'latency_ewma': state.latency_ewma,
+                    'latency_p50': self._percentile(state.latencies, 0.5),
+                    'latency_p95': self._percentile(state.latencies, 0.95),
+                    'first_chunk_p50': self._percentile(state.first_chunk_latencies, 0.5),
+                    'first_chunk_p95': self._percentile(state.first_chunk_latencies, 0.95),
+                    'paused_for': max(0.0, state.paused_until - time.monotonic())
+                }
+                for model_id, state in self._models.items()
+            }
+
+    @staticmethod
+    def _percentile(samples: deque, percentile: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,198 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: Iterable[Tuple[str, str]], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Counter:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+        return "\n".join(lines)
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self, **labels) -> Dict[str, Optional[float]]:
+        """Count, mean and bucket-interpolated p50/p95/p99 for one label set"""
+        with self._lock:
+            entry = self._values.get(_label_key(labels))
+            if entry is None:
+                return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None}
+            counts, total, count = list(entry[0]), entry[1], entry[2]
+        return {
+            'count': count,
+            'mean': total / count,
+            'p50': self._quantile(counts, count, 0.5),
+            'p95': self._quantile(counts, count, 0.95),
+            'p99': self._quantile(counts, count, 0.99)
+        }
+
+    def _quantile(self, counts: list, count: int, quantile: float) -> float:
+        rank = quantile * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines)
+
+class MetricsRegistry:
+    """Process-wide set of counters and histograms, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, description))
+
+    def histogram(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, description, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+_registry = MetricsRegistry()
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+class Span:
+    """
+    Lightweight trace context for one unit of work, e.g. a mesh task.
+
+    Code running inside the span (including awaited LLM and API calls) adds the time
+    it spends per phase with metrics.phase(); the owner reads span.phases when done.
+    """
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, **attributes):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.attributes = attributes
+        self.started = time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self.phase_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase_name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase_name] = self.phases.get(phase_name, 0.0) + seconds
+            self.phase_counts[phase_name] = self.phase_counts.get(phase_name, 0) + 1
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("metrics_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes):
+    """Make a new span current for the enclosed code and the tasks it spawns"""
+    new_span = Span(name, trace_id, **attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    finally:
+        _current_span.reset(token)
+        logger.debug(f"Span {name} [{new_span.trace_id}] took {new_span.elapsed():.3f}s, phases: {new_span.phases}")
+
+@contextmanager
+def phase(name: str):
+    """Attribute the time of the enclosed code to a phase of the current span, if any"""
+    current = _current_span.get()
+    if current is None:
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        current.add(name, time.monotonic() - started)
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1", registry: Optional[MetricsRegistry] = None) -> web.AppRunner:
+    """Serve the registry in the Prometheus text format at http://host:port/metrics"""
+    registry = registry or _registry
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
@@ -2,68 +2,117 @@ from functools import wraps
 from typing import Any, Callable, Dict, Optional, TypeVar
 import logging
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
+from core import metrics
+from core.cache import get_default_cache
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=Callable)
 
-def with_cache(ttl_seconds: int = 300):
-    """Cache function results for specified duration"""
+FUNCTION_SECONDS = metrics.get_registry().histogram(
+    "function_seconds", "Execution time of functions decorated with monitor_execution"
+)
+
+_MISSING = object()
+
+_inflight: Dict[tuple, asyncio.Task] = {}
+
+SINGLE_FLIGHT_TOTAL = metrics.get_registry().counter(
+    "single_flight_calls_total", "Calls through single_flight, by function and whether they ran or joined a pending call"
+)
+
+def _is_method_call(func: Callable, first_arg: Any) -> bool:
+    """Whether func was defined in a class and first_arg is an instance of that class"""
+    owner, _, _ = func.__qualname__.rpartition(".")
+    if not owner or owner.endswith("<locals>"):
+        return False
+    return any(cls.__qualname__ == owner and cls.__module__ == func.__module__ for cls in type(first_arg).__mro__)
+
+def make_cache_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """
+    Build a key from the function and its arguments. For methods, the instance is replaced
+    by its class, so every instance of an agent shares entries for the same arguments.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+    if args and _is_method_call(func, args[0]):
+        name = f"{type(args[0]).__module__}.{type(args[0]).__qualname__}.{func.__name__}"
+        args = args[1:]
+    return f"{name}:{args!r}:{sorted(kwargs.items())!r}"
+
+def _finish_flight(flight_key: tuple, task: asyncio.Task) -> None:
+    _inflight.pop(flight_key, None)
+    # Mark the exception as retrieved in case every caller was cancelled
+    if not task.cancelled():
+        task.exception()
+
+async def _shared_call(key: str, func: Callable, args: tuple, kwargs: dict) -> Any:
+    """Run func(*args, **kwargs), or join the pending call already running for key"""
+    loop = asyncio.get_running_loop()
+    flight_key = (id(loop), key)
+    task = _inflight.get(flight_key)
+    if task is None:
+        SINGLE_FLIGHT_TOTAL.inc(function=func.__qualname__, outcome="leader")
+        task = loop.create_task(func(*args, **kwargs))
+        _inflight[flight_key] = task
+        task.add_done_callback(lambda done: _finish_flight(flight_key, done))
+    else:
+        SINGLE_FLIGHT_TOTAL.inc(function=func.__qualname__, outcome="shared")
+        logger.debug(f"Joining in-flight call to {func.__name__}")
+    return await asyncio.shield(task)
+
+def single_flight():
+    """
+    Share one pending call between concurrent callers with the same arguments.
+
+    The first caller starts the call and later callers await the same result (or exception)
+    until it finishes. Cancelling one caller does not cancel the shared call.
+    """
+    def decorator(func: T) -> T:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            return await _shared_call(make_cache_key(func, args, kwargs), func, args, kwargs)
+        return wrapper
+    return decorator
+
+def with_cache(ttl_seconds: int = 300, cache=None):
+    """
+    Cache function results for specified duration, sharing in-flight calls for the same key.
+
+    Results go to the process-wide cache from core.cache.get_default_cache() (bounded, LRU,
+    backend chosen by CACHE_BACKEND) unless a cache backend is passed.
+    """
     def decorator(func: T) -> T:
-        cache: Dict[str, Any] = {}
-        cache_ttl: Dict[str, datetime] = {}
-        
         @wraps(func)
         async def wrapper(*args, **kwargs) -> Any:
-            cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
+            backend = cache if cache is not None else get_default_cache()
+            cache_key = make_cache_key(func, args, kwargs)
             
             # Check cache
-            if cache_key in cache and datetime.now() < cache_ttl[cache_key]:
+            if backend.blocking:
+                result = await asyncio.to_thread(backend.get, cache_key, _MISSING)
+            else:
+                result = backend.get(cache_key, _MISSING)
+            if result is not _MISSING:
                 logger.debug(f"Cache hit for {func.__name__}")
-                return cache[cache_key]
+                return result
             
-            # Execute function
-            result = await func(*args, **kwargs)
+            # Execute function, or join a call already fetching this key
+            result = await _shared_call(cache_key, func, args, kwargs)
             
             # Update cache
-            cache[cache_key] = result
-            cache_ttl[cache_key] = datetime.now() + timedelta(seconds=ttl_seconds)
+            try:
+                if backend.blocking:
+                    await asyncio.to_thread(backend.set, cache_key, result, ttl_seconds)
+                else:
+                    backend.set(cache_key, result, ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Failed to cache result of {func.__name__}: {e}")
             
             return result
         return wrapper
     return decorator
 
-# TODO: Use Redis in a multi-process environment
-# def with_cache(ttl_seconds: int = 300):
-#     """Cache function results using Redis"""
-#     def decorator(func: T) -> T:
-#         redis_client = redis.Redis(host='localhost', port=6379, db=0)
-        
-#         @wraps(func)
-#         async def wrapper(*args, **kwargs) -> Any:
-#             cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            
-#             # Check Redis cache
-#             cached = redis_client.get(cache_key)
-#             if cached:
-#                 logger.debug(f"Cache hit for {func.__name__}")
-#                 return json.loads(cached)
-            
-#             # Execute function
-#             result = await func(*args, **kwargs)
-            
-#             # Update Redis cache
-#             redis_client.setex(
-#                 cache_key,
-#                 ttl_seconds,
-#                 json.dumps(result)
-#             )
-            
-#             return result
-#         return wrapper
-#     return decorator
-
 def with_retry(max_retries: int = 3, delay: float = 1.0):
     """Retry function execution on failure"""
     def decorator(func: T) -> T:
@@ -95,10 +144,12 @@ def monitor_execution():
                 result = await func(*args, **kwargs)
                 execution_time = (datetime.now() - start_time).total_seconds()
                 logger.info(f"{func.__name__} executed successfully in {execution_time:.2f}s")
+                FUNCTION_SECONDS.observe(execution_time, function=func.__qualname__, status="success")
                 return result
             except Exception as e:
                 execution_time = (datetime.now() - start_time).total_seconds()
                 logger.error(f"{func.__name__} failed after {execution_time:.2f}s: {e}")
+                FUNCTION_SECONDS.observe(execution_time, function=func.__qualname__, status="error")
                 raise
         return wrapper
     return decorator
\ No newline at end of file
@@ -1,8 +1,12 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
+import asyncio
+import json
 import logging
 import os
 from pathlib import Path
 from agents.core_agent import CoreAgent
+from clients.session_manager import close_sessions
+from core.llm import aclose_openai_clients
 import dotenv
 from functools import wraps
 
@@ -21,6 +25,30 @@ def require_api_key(f):
         return await f(*args, **kwargs)
     return decorated_function
 
+def iterate_async_generator(make_generator):
+    """
+    Drive an async generator from a sync WSGI response iterator.
+
+    The generator is created inside its own event loop, so streamed responses
+    keep working after the async view that returned them has finished. The LLM
+    clients and HTTP session pooled on that loop are closed with it.
+    """
+    loop = asyncio.new_event_loop()
+    agen = make_generator()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        try:
+            loop.run_until_complete(agen.aclose())
+        finally:
+            loop.run_until_complete(aclose_openai_clients())
+            loop.run_until_complete(close_sessions())
+            loop.close()
+
 class FlaskAgent(CoreAgent):
     def __init__(self, core_agent=None):
         if core_agent:
@@ -67,6 +95,11 @@ class FlaskAgent(CoreAgent):
         #   "text": "AI is a field of computer science...", 
         #   "image_url": "http://example.com/image.jpg"  # Optional
         # }
+        #
+        # Add "stream": true to the body to receive the response incrementally.
+        # With "Accept: text/event-stream" events are sent as SSE, otherwise as
+        # newline-delimited JSON. Each event is {"type": "text", "content": ...}
+        # followed by a final {"type": "done", "text": ..., "image_url": ..., "tool_call": ...}
         @self._app.route('/message', methods=['POST'])
         @require_api_key
         async def handle_message():
@@ -80,6 +113,8 @@ class FlaskAgent(CoreAgent):
                 logger.info(external_tools)
                 if 'chat_id' in data:
                     chat_id = data['chat_id']
+                if data.get('stream'):
+                    return self._stream_response(data['message'], chat_id, external_tools)
                 text_response, image_url, tool_calls = await self.handle_message(
                     data['message'],
                     source_interface='api',
@@ -104,6 +139,27 @@ class FlaskAgent(CoreAgent):
                 logger.error(f"Message handling failed: {str(e)}")
                 return jsonify({'error': 'Internal server error'}), 500
 
+    def _stream_response(self, message: str, chat_id, external_tools) -> Response:
+        """Stream handle_message_stream events as SSE or newline-delimited JSON"""
+        use_sse = 'text/event-stream' in request.headers.get('Accept', '')
+
+        def make_generator():
+            return self.handle_message_stream(
+                message,
+                source_interface='api',
+                chat_id=chat_id,
+                external_tools=external_tools
+            )
+
+        def generate():
+            for event in iterate_async_generator(make_generator):
+                payload = json.dumps(event, default=str)
+                yield f"data: {payload}\n\n" if use_sse else f"{payload}\n"
+
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        mimetype = 'text/event-stream' if use_sse else 'application/x-ndjson'
+        return Response(generate(), mimetype=mimetype, headers=headers)
+
 def main():
     agent = FlaskAgent()
     agent.run()
@@ -12,6 +12,7 @@ import dotenv
 import yaml
 from agents.core_agent import CoreAgent
 from core.llm import call_llm, LLMError
+from core.llm_scheduler import llm_priority, PRIORITY_BACKGROUND
 from core.imgen import generate_image_with_retry, generate_image_prompt
 
 # Set up logging
@@ -254,7 +255,9 @@ class FarcasterAgent(CoreAgent):
     async def _run(self):
         while True:
             try:
-                cast_result = await self.generate_cast()
+                # Scheduled casts yield to interactive chats for LLM capacity
+                with llm_priority(PRIORITY_BACKGROUND):
+                    cast_result = await self.generate_cast()
                 logger.info("Cast result: %s", cast_result)
                 
                 cast, image_url, cast_data = cast_result
@@ -2,6 +2,7 @@ from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 import logging
 import os
+import time
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 import dotenv
@@ -18,6 +19,8 @@ dotenv.load_dotenv()
 
 # Constants
 TELEGRAM_API_TOKEN = os.getenv("TELEGRAM_API_TOKEN")
+# Telegram rate-limits message edits, so streamed replies are flushed at most this often
+STREAM_EDIT_INTERVAL = float(os.getenv("TELEGRAM_STREAM_EDIT_INTERVAL", 1.0))
 
 if not TELEGRAM_API_TOKEN:
     raise ValueError("TELEGRAM_API_TOKEN not found in environment variables")
@@ -218,12 +221,54 @@ class TelegramAgent(CoreAgent):
             # Notify the user
             await update.message.reply_text("Voice note received. Processing...")
             user_message = await self.transcribe_audio(file_path)
-            text_response, image_url,_ = await self.handle_message(user_message)
+            await self.reply_streaming(update, self.handle_message_stream(user_message, source_interface='telegram'))
+
+    async def reply_streaming(self, update: Update, events) -> None:
+        """
+        Reply with a message that is edited progressively as the response streams in.
         
-            if image_url:
-                await update.message.reply_photo(photo=image_url)
-            elif text_response:
-                await update.message.reply_text(text_response.replace('"', ''))
+        Args:
+            update: The Telegram update to reply to
+            events: Async iterator of handle_message_stream events
+        """
+        reply = None
+        text = ""
+        sent_text = ""
+        last_edit = 0.0
+        image_url = None
+        async for event in events:
+            if event['type'] == 'text':
+                text += event['content']
+            elif event['type'] == 'done':
+                text = event['text'] or text
+                image_url = event['image_url']
+                break
+            current = text.replace('"', '').strip()
+            now = time.monotonic()
+            if not current or now - last_edit < STREAM_EDIT_INTERVAL:
+                continue
+            try:
+                if reply is None:
+                    reply = await update.message.reply_text(current)
+                elif current != sent_text:
+                    await reply.edit_text(current)
+                sent_text = current
+                last_edit = now
+            except Exception as e:
+                logger.warning(f"Failed to update streamed reply: {str(e)}")
+
+        if image_url:
+            if reply is not None:
+                await reply.delete()
+            await update.message.reply_photo(photo=image_url)
+            return
+        final = text.replace('"', '').strip()
+        if not final:
+            return
+        if reply is None:
+            await update.message.reply_text(final)
+        elif final != sent_text:
+            await reply.edit_text(final)
     def run(self):
         """Start the bot"""
         logger.info("Starting Telegram bot...")
@@ -9,6 +9,7 @@ from typing import Dict, Any
 import dotenv
 import yaml
 from agents.core_agent import CoreAgent
+from core.llm_scheduler import llm_priority, PRIORITY_BACKGROUND
 from platforms.twitter_api import tweet_with_image, tweet_text_only
 import asyncio
 
@@ -194,7 +195,9 @@ class TwitterAgent(CoreAgent):
         while True:
             try:
                 # Generate tweet returns (tweet, image_url, tweet_data)
-                tweet_result = await self.generate_tweet()
+                # Scheduled tweets yield to interactive chats for LLM capacity
+                with llm_priority(PRIORITY_BACKGROUND):
+                    tweet_result = await self.generate_tweet()
                 logger.info("Tweet result: %s", tweet_result)
                 
                 # Unpack all three values
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Type
+
+from .mesh_agent import MeshAgent
+
+logger = logging.getLogger(__name__)
+
+class AgentPool:
+    """
+    Bounded pool of warm agent instances of one type.
+
+    Instances are created on demand up to max_size, started with startup() and reused
+    across tasks, so API clients, sessions and per-instance caches survive between tasks.
+    Idle instances are health-checked before reuse once health_check_interval has passed,
+    or right away when their last task raised. Unhealthy instances are cleaned up and replaced.
+    """
+
+    def __init__(self,
+                 agent_class: Type[MeshAgent],
+                 max_size: int,
+                 warm_size: int = 1,
+                 health_check_interval: float = 60.0):
+        self.agent_class = agent_class
+        self.max_size = max_size
+        self.warm_size = min(warm_size, max_size)
+        self.health_check_interval = health_check_interval
+        self._idle: List[MeshAgent] = []
+        self._last_checked: Dict[int, float] = {}
+        self._size = 0
+        self._condition = asyncio.Condition()
+        self._closed = False
+        self.created = 0
+        self.discarded = 0
+
+    async def start(self) -> None:
+        """Create and start the warm instances"""
+        self._closed = False
+        count = max(0, self.warm_size - self._size)
+        self._size += count
+        results = await asyncio.gather(*(self._create() for _ in range(count)), return_exceptions=True)
+        async with self._condition:
+            for result in results:
+                if isinstance(result, BaseException):
+                    logger.error(f"Failed to start {self.agent_class.__name__}: {result}")
+                else:
+                    self._idle.append(result)
+            self._condition.notify_all()
+
+    async def _create(self) -> MeshAgent:
+        """Build and start an instance in a slot already counted in _size"""
+        try:
+            agent = self.agent_class()
+            await agent.startup()
+        except BaseException:
+            async with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self.created += 1
+        self._last_checked[id(agent)] = time.monotonic()
+        return agent
+
+    async def _discard(self, agent: MeshAgent) -> None:
+        async with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        self.discarded += 1
+        self._last_checked.pop(id(agent), None)
+        try:
+            await agent.cleanup()
+        except Exception as e:
+            logger.warning(f"Cleanup of {self.agent_class.__name__} failed: {e}")
+
+    async def _healthy(self, agent: MeshAgent) -> bool:
+        if time.monotonic() - self._last_checked.get(id(agent), 0.0) < self.health_check_interval:
+            return True
+        try:
+            healthy = await agent.health_check()
+        except Exception as e:
+            logger.warning(f"Health check of {self.agent_class.__name__} raised: {e}")
+            healthy = False
+        if healthy:
+            self._last_checked[id(agent)] = time.monotonic()
+        return healthy
+
+    async def checkout(self) -> MeshAgent:
+        """Take an idle instance, creating one if the pool is below max_size"""
+        while True:
+            async with self._condition:
+                if self._closed:
+                    raise RuntimeError(f"{self.agent_class.__name__} pool is closed")
+                if self._idle:
+                    agent = self._idle.pop()
+                elif self._size < self.max_size:
+                    agent = None
+                    self._size += 1  # Reserve the slot while the instance is built
+                else:
+                    await self._condition.wait()
+                    continue
+            if agent is None:
+                return await self._create()
+            if await self._healthy(agent):
+                return agent
+            logger.warning(f"Replacing unhealthy {self.agent_class.__name__} instance")
+            await self._discard(agent)
+
+    async def checkin(self, agent: MeshAgent, failed: bool = False) -> None:
+        """Return an instance; failed marks it for a health check before its next use"""
+        if self._closed:
+            await self._discard(agent)
+            return
+        if failed:
+            self._last_checked[id(agent)] = 0.0
+        async with self._condition:
+            self._idle.append(agent)
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def agent(self):
+        """Check out an instance for the duration of a task"""
+        agent = await self.checkout()
+        failed = False
+        try:
+            yield agent
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.checkin(agent, failed)
+
+    async def close(self) -> None:
+        """Clean up idle instances; instances still in use are cleaned up when returned"""
+        async with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        await asyncio.gather(*(self._discard(agent) for agent in idle))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': self._size,
+            'idle': len(self._idle),
+            'in_use': self._size - len(self._idle),
+            'created': self.created,
+            'discarded': self.discarded
+        }
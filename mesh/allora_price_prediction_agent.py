@@ -1,18 +1,16 @@
 from typing import Dict, Any
 from .mesh_agent import MeshAgent, monitor_execution, with_retry, with_cache
-from core.llm import call_llm_with_tools_async, call_llm_async
-import os
-import requests
+from core.llm import call_llm_with_tools_async, call_llm_async, run_tool_calls, tool_calls_message
+from core.llm_router import TASK_TOOL_SELECTION
+from clients.allora_client import AlloraClient
 from dotenv import load_dotenv
 import json
-import aiohttp
 
 load_dotenv()
 
 class AlloraPricePredictionAgent(MeshAgent):
     def __init__(self):
         super().__init__()
-        self.session = None  # Initialize as None
         self.metadata.update({
             'name': 'Allora Price Prediction Agent',
             'version': '1.0.0',
@@ -37,52 +35,29 @@ class AlloraPricePredictionAgent(MeshAgent):
             'tags': ['Trading', 'Allora'],
             'mcp_tool_name': 'get_allora_price_prediction'
         })
+        self._api_clients['allora'] = AlloraClient()
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()  # Create session when entering context
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()  # Close session when exiting context
-            self.session = None
+        await self.cleanup()
 
     @monitor_execution()
     @with_cache(ttl_seconds=300)
     @with_retry(max_retries=3)
     async def get_allora_prediction(self, token: str, timeframe: str) -> Dict:
-        should_close = False
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            should_close = True
-            
-        try:
-            base_url = "https://api.upshot.xyz/v2/allora/consumer/price/ethereum-11155111"
-            url = f"{base_url}/{token.upper()}/{timeframe}"
-
-            headers = {
-                "accept": "application/json",
-                "x-api-key": os.getenv("ALLORA_API_KEY"),
-            }
-
-            async with self.session.get(url, headers=headers) as response:
-                response.raise_for_status()
-                data = await response.json()
-                # print('data', data)
+        data = await self._api_clients['allora'].get_price_prediction(token, timeframe)
 
-                prediction = float(data["data"]["inference_data"]["network_inference_normalized"])
-                confidence_intervals = data["data"]["inference_data"]["confidence_interval_percentiles_normalized"]
-                confidence_interval_values_normalized = data["data"]["inference_data"]["confidence_interval_values_normalized"]
+        prediction = float(data["data"]["inference_data"]["network_inference_normalized"])
+        confidence_intervals = data["data"]["inference_data"]["confidence_interval_percentiles_normalized"]
+        confidence_interval_values_normalized = data["data"]["inference_data"]["confidence_interval_values_normalized"]
 
-                return {
-                    "prediction": prediction,
-                    "confidence_intervals": confidence_intervals,
-                    "confidence_interval_values_normalized": confidence_interval_values_normalized,
-                }
-        finally:
-            if should_close and self.session:
-                await self.session.close()
-                self.session = None
+        return {
+            "prediction": prediction,
+            "confidence_intervals": confidence_intervals,
+            "confidence_interval_values_normalized": confidence_interval_values_normalized,
+        }
 
     def get_system_prompt(self) -> str:
         return """You are a helpful assistant that can access external tools to provide Bitcoin and Ethereum price prediction data.
@@ -132,7 +107,9 @@ class AlloraPricePredictionAgent(MeshAgent):
             system_prompt=self.get_system_prompt(),
             user_prompt=query,
             temperature=0.1,
-            tools=[self.get_tool_schema()]
+            tools=[self.get_tool_schema()],
+            use_cache=True,
+            task=TASK_TOOL_SELECTION
         )
 
         print(response)
@@ -140,23 +117,24 @@ class AlloraPricePredictionAgent(MeshAgent):
         if not response or not response.get('tool_calls'):
             return {"response": response.get('content')}
 
-        tool_call = response['tool_calls']
-        function_args = json.loads(tool_call.function.arguments)
-        token = function_args['token']
-        timeframe = function_args['timeframe']
-        
-        # Get prediction data
-        result = await self.get_allora_prediction(token, timeframe)
-        # print('result', result)
-        
-        tool_response = (
-            f"Price prediction for {function_args['token']} ({function_args['timeframe']} timeframe):\n"
-            f"Predicted price: {result['prediction']}\n"
-            f"Confidence Intervals: {result['confidence_intervals']}\n"
-            f"Confidence Interval Values Normalized: {result['confidence_interval_values_normalized']}\n"
-        )
+        tool_calls = response['tool_calls']
+
+        async def predict(name: str, function_args: Dict[str, Any]) -> str:
+            result = await self.get_allora_prediction(function_args['token'], function_args['timeframe'])
+            # print('result', result)
+            return (
+                f"Price prediction for {function_args['token']} ({function_args['timeframe']} timeframe):\n"
+                f"Predicted price: {result['prediction']}\n"
+                f"Confidence Intervals: {result['confidence_intervals']}\n"
+                f"Confidence Interval Values Normalized: {result['confidence_interval_values_normalized']}\n"
+            )
+
+        # Get prediction data for every requested token/timeframe at once
+        tool_responses = await run_tool_calls(tool_calls, predict)
+        if all(isinstance(tool_response, BaseException) for tool_response in tool_responses):
+            raise tool_responses[0]
 
-        # print('tool_response', tool_response)
+        # print('tool_response', tool_responses)
         final_response = await call_llm_async(
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
@@ -164,7 +142,11 @@ class AlloraPricePredictionAgent(MeshAgent):
             messages=[
                 {"role": "system", "content": self.get_system_prompt()},
                 {"role": "user", "content": query},
-                {"role": "tool", "content": tool_response, "tool_call_id": tool_call.id}
+                tool_calls_message(tool_calls, response.get('content')),
+                *(
+                    {"role": "tool", "content": f"Error: {tool_response}" if isinstance(tool_response, BaseException) else tool_response, "tool_call_id": tool_call.id}
+                    for tool_call, tool_response in zip(tool_calls, tool_responses)
+                )
             ],
             temperature=0.1
         )
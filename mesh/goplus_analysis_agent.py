@@ -1,8 +1,11 @@
 from typing import Dict, Any, Optional
 from .mesh_agent import MeshAgent, monitor_execution, with_retry, with_cache
-from core.llm import call_llm_with_tools_async, call_llm_async
+from core.llm import call_llm_with_tools_async, call_llm_async, run_tool_calls, tool_calls_message
+from core.llm_router import TASK_TOOL_SELECTION
+from clients.goplus_client import GoPlusClient
+import aiohttp
+import asyncio
 import os
-import requests
 from dotenv import load_dotenv
 import json
 
@@ -33,6 +36,11 @@ class TokenContractSecurityAgent(MeshAgent):
                     'name': 'data',
                     'description': 'The security details of the token contract. Raw data from GoPlus API',
                     'type': 'dict'
+                },
+                {
+                    'name': 'all_data',
+                    'description': 'The security details of every token contract checked, when the query names several',
+                    'type': 'list'
                 }
             ],
             'external_apis': ['goplus'],
@@ -50,6 +58,7 @@ class TokenContractSecurityAgent(MeshAgent):
             "4200": "Merlin", "200901": "Bitlayer Mainnet", 
             "810180": "zkLink Nova", "196": "X Layer Mainnet"
         }
+        self._api_clients['goplus'] = GoPlusClient()
 
     @monitor_execution()
     @with_cache(ttl_seconds=300)
@@ -58,19 +67,9 @@ class TokenContractSecurityAgent(MeshAgent):
         """
         Fetch security details from GoPlus API with retry and caching
         """
-        base_url = f"https://api.gopluslabs.io/api/v1/token_security/{chain_id}"
-        params = {
-            "contract_addresses": contract_address
-        }
-        headers = {
-            "accept": "*/*"
-        }
-        
         try:
-            response = requests.get(base_url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self._api_clients['goplus'].get_token_security(contract_address, chain_id)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             print(f"Error fetching security details: {e}")
             return None
 
@@ -105,6 +104,39 @@ class TokenContractSecurityAgent(MeshAgent):
             }
         }
 
+    def _essential_security_info(self, tool_result: Optional[Dict], contract_address: str) -> Dict:
+        """Summary of the GoPlus fields that matter for one contract"""
+        token_data = (tool_result or {}).get('result', {}).get(contract_address.lower(), {})
+        
+        return {
+            "token_info": {
+                "name": token_data.get('token_name'),
+                "symbol": token_data.get('token_symbol'),
+                "total_supply": token_data.get('total_supply'),
+                "holder_count": token_data.get('holder_count')
+            },
+            "security_metrics": {
+                "is_honeypot": bool(int(token_data.get('is_honeypot', '0'))),
+                "is_blacklisted": bool(int(token_data.get('is_blacklisted', '0'))),
+                "is_open_source": bool(int(token_data.get('is_open_source', '0'))),
+                "buy_tax": token_data.get('buy_tax', '0'),
+                "sell_tax": token_data.get('sell_tax', '0'),
+                "can_take_back_ownership": bool(int(token_data.get('can_take_back_ownership', '0'))),
+                "is_proxy": bool(int(token_data.get('is_proxy', '0'))),
+                "is_mintable": bool(int(token_data.get('is_mintable', '0')))
+            },
+            "liquidity_info": {
+                "is_in_dex": bool(int(token_data.get('is_in_dex', '0'))),
+                "dex": token_data.get('dex', []),
+                "lp_holder_count": token_data.get('lp_holder_count')
+            },
+            "ownership": {
+                "creator_address": token_data.get('creator_address'),
+                "owner_address": token_data.get('owner_address'),
+                "top_holders": token_data.get('holders', [])[:3]  # Only include top 3 holders
+            }
+        }
+
     @monitor_execution()
     @with_retry(max_retries=3)
     async def handle_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -119,18 +151,26 @@ class TokenContractSecurityAgent(MeshAgent):
             system_prompt=self.get_system_prompt(),
             user_prompt=query,
             temperature=0.1,
-            tools=[self.get_tool_schema()]
+            tools=[self.get_tool_schema()],
+            use_cache=True,
+            task=TASK_TOOL_SELECTION
         )
 
         if not response or not response.get('tool_calls'):
             return {"response": response.get('content')}
 
-        tool_call = response['tool_calls']
-        function_args = json.loads(tool_call.function.arguments)
-        tool_result = await self.fetch_security_details(
-            function_args['contract_address'],
-            function_args.get('chain_id', 1)
-        )
+        tool_calls = response['tool_calls']
+
+        async def fetch(name: str, function_args: Dict[str, Any]) -> Optional[Dict]:
+            return await self.fetch_security_details(
+                function_args['contract_address'],
+                function_args.get('chain_id', 1)
+            )
+
+        # Check every contract the model asked about at once
+        tool_results = await run_tool_calls(tool_calls, fetch)
+        if all(isinstance(tool_result, BaseException) for tool_result in tool_results):
+            raise tool_results[0]
 
         explanation = await call_llm_async(
             base_url=self.heurist_base_url,
@@ -139,43 +179,25 @@ class TokenContractSecurityAgent(MeshAgent):
             messages=[
                 {"role": "system", "content": self.get_system_prompt()},
                 {"role": "user", "content": query},
-                {"role": "tool", "content": str(tool_result), "tool_call_id": tool_call.id}
+                tool_calls_message(tool_calls, response.get('content')),
+                *(
+                    {"role": "tool", "content": f"Error: {tool_result}" if isinstance(tool_result, BaseException) else str(tool_result), "tool_call_id": tool_call.id}
+                    for tool_call, tool_result in zip(tool_calls, tool_results)
+                )
             ],
             temperature=0.7
         )
 
-        token_data = tool_result.get('result', {}).get(function_args['contract_address'].lower(), {})
-        
-        essential_security_info = {
-            "token_info": {
-                "name": token_data.get('token_name'),
-                "symbol": token_data.get('token_symbol'),
-                "total_supply": token_data.get('total_supply'),
-                "holder_count": token_data.get('holder_count')
-            },
-            "security_metrics": {
-                "is_honeypot": bool(int(token_data.get('is_honeypot', '0'))),
-                "is_blacklisted": bool(int(token_data.get('is_blacklisted', '0'))),
-                "is_open_source": bool(int(token_data.get('is_open_source', '0'))),
-                "buy_tax": token_data.get('buy_tax', '0'),
-                "sell_tax": token_data.get('sell_tax', '0'),
-                "can_take_back_ownership": bool(int(token_data.get('can_take_back_ownership', '0'))),
-                "is_proxy": bool(int(token_data.get('is_proxy', '0'))),
-                "is_mintable": bool(int(token_data.get('is_mintable', '0')))
-            },
-            "liquidity_info": {
-                "is_in_dex": bool(int(token_data.get('is_in_dex', '0'))),
-                "dex": token_data.get('dex', []),
-                "lp_holder_count": token_data.get('lp_holder_count')
-            },
-            "ownership": {
-                "creator_address": token_data.get('creator_address'),
-                "owner_address": token_data.get('owner_address'),
-                "top_holders": token_data.get('holders', [])[:3]  # Only include top 3 holders
-            }
-        }
+        security_infos = []
+        for tool_call, tool_result in zip(tool_calls, tool_results):
+            if isinstance(tool_result, BaseException):
+                continue
+            function_args = json.loads(tool_call.function.arguments)
+            security_infos.append(self._essential_security_info(tool_result, function_args['contract_address']))
         
         return {
             "response": explanation,
-            "data": essential_security_info
+            # data keeps its single-contract shape; every checked contract is in all_data
+            "data": security_infos[0] if security_infos else None,
+            "all_data": security_infos
         }
\ No newline at end of file
@@ -41,6 +41,14 @@ class MeshAgent(ABC):
         """Handle incoming message - must be implemented by subclasses"""
         pass
     
+    async def startup(self):
+        """Prepare the agent before its first task, e.g. open connections. Called once by the agent pool."""
+        pass
+
+    async def health_check(self) -> bool:
+        """Report whether the agent can keep serving tasks; unhealthy instances are replaced"""
+        return True
+
     async def cleanup(self):
         """Cleanup API clients"""
         for client in self._api_clients.values():
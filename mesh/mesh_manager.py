@@ -1,29 +1,86 @@
 import asyncio
 import aiohttp
 import logging
-from typing import Dict, Type
+import time
+from typing import Dict, List, Optional, Type
 import uuid
+from core import metrics
+from clients.session_manager import close_sessions
+from core.llm import aclose_openai_clients
+from .agent_pool import AgentPool
 
 logger = logging.getLogger(__name__)
 
+# Delay between submission retries while the sequencer is failing, doubling up to the max
+SUBMIT_RETRY_MIN_BACKOFF = 0.5
+SUBMIT_RETRY_MAX_BACKOFF = 30.0
+
+_registry = metrics.get_registry()
+TASKS_TOTAL = _registry.counter("mesh_tasks_total", "Mesh tasks finished, by agent type and status")
+TASK_SECONDS = _registry.histogram("mesh_task_seconds", "Time from fetching a mesh task to submitting its result")
+TASK_PHASE_SECONDS = _registry.histogram(
+    "mesh_task_phase_seconds",
+    "Time a mesh task spends per phase: queue_wait, execution, llm, external_api, submit"
+)
+SUBMIT_FAILURES_TOTAL = _registry.counter("mesh_submit_failures_total", "Failed /miner_submit requests")
+
 class MeshManager:
-    """Manages task execution and communication with V2 Protocol server"""
+    """
+    Manages task execution and communication with V2 Protocol server.
+
+    Each agent type has its own fetcher that asks the sequencer for up to its number of free
+    slots per /miner_request call and long-polls (the server holds the request for up to
+    long_poll_seconds). If the server answers empty without waiting, the fetcher backs off
+    exponentially between min_backoff and max_backoff. Results are buffered and posted to
+    /miner_submit in batches of up to submit_batch_size, at least every submit_interval seconds.
+    Failed submissions are retried with exponential backoff; a result is dropped only after
+    it has waited submit_retention seconds. Like fetching, submission falls back to the
+    one-result-per-request protocol when the sequencer rejects a batch with a 4xx, or
+    always uses it with batched_submit=False.
+    Task metrics are recorded in core.metrics and served at /metrics when metrics_port is set.
+    """
     
     def __init__(self, config: dict):
         self.config = config
-        # Mapping of agent_type to {agent_class, semaphore, max_concurrency}
+        # Mapping of agent_type to {agent_class, semaphore, max_concurrency, pool, pending, running, slot_freed}
         self.agents: Dict[str, dict] = {}
         self.session: Optional[aiohttp.ClientSession] = None
+        self.miner_id = config.get('miner_id') or str(uuid.uuid4())
+        self.long_poll_seconds = config.get('long_poll_seconds', 20)
+        self.min_backoff = config.get('min_backoff', 0.1)
+        self.max_backoff = config.get('max_backoff', 5.0)
+        self.submit_batch_size = config.get('submit_batch_size', 20)
+        self.submit_interval = config.get('submit_interval', 0.1)
+        self.shutdown_timeout = config.get('shutdown_timeout', 30)
+        self.submit_retention = config.get('submit_retention', 600)
+        self.batched_submit = config.get('batched_submit', True)
         self._shutdown = False
         self._poll_task = None
+        self._submit_task = None
+        self._task_handlers: set = set()
+        self._submit_buffer: List[dict] = []
+        self._submit_ready: Optional[asyncio.Event] = None
+        self._submit_backoff = 0.0
+        self._submit_retry_at = 0.0
+        self._metrics_runner = None
     
-    def register_agent(self, agent_class: Type['MeshAgent'], max_concurrency: int = 5):
-        """Register an agent type with its concurrency limit"""
+    def register_agent(self, agent_class: Type['MeshAgent'], max_concurrency: int = 5, warm_instances: int = 1):
+        """Register an agent type with its concurrency limit and number of instances to keep warm"""
         agent_type = agent_class.__name__
         self.agents[agent_type] = {
             'class': agent_class,
             'semaphore': asyncio.Semaphore(max_concurrency),
-            'max_concurrency': max_concurrency
+            'max_concurrency': max_concurrency,
+            'pool': AgentPool(
+                agent_class,
+                max_size=max_concurrency,
+                warm_size=warm_instances,
+                health_check_interval=self.config.get('health_check_interval', 60)
+            ),
+            # Tasks fetched but not finished; free slots are max_concurrency - pending
+            'pending': 0,
+            'running': 0,
+            'slot_freed': asyncio.Event()
         }
         logger.info(f"Registered {agent_type} with max concurrency {max_concurrency}")
 
@@ -31,11 +88,19 @@ class MeshManager:
         """Start the manager and polling loop"""
         self.session = aiohttp.ClientSession()
         self._shutdown = False
+        self._submit_ready = asyncio.Event()
+        await asyncio.gather(*(info['pool'].start() for info in self.agents.values()))
         self._poll_task = asyncio.create_task(self._poll_loop())
-        logger.info("MeshManager started")
+        self._submit_task = asyncio.create_task(self._submit_loop())
+        if self.config.get('metrics_port'):
+            self._metrics_runner = await metrics.start_metrics_server(
+                self.config['metrics_port'],
+                host=self.config.get('metrics_host', '127.0.0.1')
+            )
+        logger.info(f"MeshManager started as miner {self.miner_id}")
     
     async def stop(self):
-        """Stop the manager"""
+        """Stop fetching, let running tasks finish, flush their results and stop the manager"""
         self._shutdown = True
         if self._poll_task:
             self._poll_task.cancel()
@@ -43,87 +108,238 @@ class MeshManager:
                 await self._poll_task
             except asyncio.CancelledError:
                 pass
+        if self._task_handlers:
+            await asyncio.wait(self._task_handlers, timeout=self.shutdown_timeout)
+        # Handlers still running would queue results after the final flush
+        leftover = list(self._task_handlers)
+        for handler in leftover:
+            handler.cancel()
+        if leftover:
+            logger.warning(f"Cancelled {len(leftover)} tasks still running after {self.shutdown_timeout}s")
+            await asyncio.gather(*leftover, return_exceptions=True)
+        if self._submit_task:
+            self._submit_task.cancel()
+            try:
+                await self._submit_task
+            except asyncio.CancelledError:
+                pass
+        await self._flush_results(force=True)
+        await asyncio.gather(*(info['pool'].close() for info in self.agents.values()))
+        if self._metrics_runner:
+            await self._metrics_runner.cleanup()
+            self._metrics_runner = None
         if self.session:
             await self.session.close()
+        # Agents share the process-wide API client session and LLM clients
+        await close_sessions()
+        await aclose_openai_clients()
         logger.info("MeshManager stopped")
 
     async def _poll_loop(self):
-        """Main loop for polling tasks from server"""
+        """Main loop for polling tasks from server, one fetcher per agent type"""
+        await asyncio.gather(*(self._poll_agent_type(agent_type) for agent_type in self.agents))
+
+    async def _poll_agent_type(self, agent_type: str):
+        """Fetch tasks for one agent type whenever it has free slots"""
+        info = self.agents[agent_type]
+        backoff = self.min_backoff
         while not self._shutdown:
+            free_slots = info['max_concurrency'] - info['pending']
+            if free_slots <= 0:
+                info['slot_freed'].clear()
+                await info['slot_freed'].wait()
+                continue
+
+            started = time.monotonic()
             try:
-                for agent_type, info in self.agents.items():
-                    # Check if we can handle more tasks for this agent type
-                    if info['semaphore'].locked():
-                        continue
-                    
-                    # Poll for new task
-                    async with self.session.post(
-                        f"{self.config['sequencer_url']}/miner_request",
-                        json={
-                            "miner_id": str(uuid.uuid4()),
-                            "agent_type": agent_type
-                        }
-                    ) as response:
-                        if response.status == 200:
-                            task_data = await response.json()
-                            if task_data.get('task'):
-                                # Spawn new task handler
-                                asyncio.create_task(
-                                    self._handle_task(agent_type, task_data['task'])
-                                )
-                
+                tasks = await self._fetch_tasks(agent_type, free_slots)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Error in polling loop: {e}")
-            
-            await asyncio.sleep(1)  # Poll frequently but don't overwhelm
+                logger.error(f"Error polling tasks for {agent_type}: {e}")
+                tasks = None
+
+            fetched_at = time.monotonic()
+            for task_data in tasks or []:
+                info['pending'] += 1
+                handler = asyncio.create_task(self._handle_task(agent_type, task_data, fetched_at))
+                self._task_handlers.add(handler)
+                handler.add_done_callback(self._task_handlers.discard)
 
-    async def _handle_task(self, agent_type: str, task_data: dict):
+            if tasks:
+                backoff = self.min_backoff
+            elif tasks is None or time.monotonic() - started < self.long_poll_seconds / 2:
+                # Failed, or the server answered without holding the request: back off
+                await asyncio.sleep(backoff)
+                backoff = min(self.max_backoff, backoff * 2)
+
+    async def _fetch_tasks(self, agent_type: str, max_tasks: int) -> Optional[List[dict]]:
+        """Long-poll the sequencer for up to max_tasks tasks. Returns None on a failed request."""
+        async with self.session.post(
+            f"{self.config['sequencer_url']}/miner_request",
+            json={
+                "miner_id": self.miner_id,
+                "agent_type": agent_type,
+                "max_tasks": max_tasks,
+                "wait": self.long_poll_seconds
+            },
+            timeout=aiohttp.ClientTimeout(total=self.long_poll_seconds + 10)
+        ) as response:
+            if response.status == 204:
+                return []
+            if response.status != 200:
+                logger.error(f"Task request for {agent_type} failed: {response.status}")
+                return None
+            data = await response.json()
+        tasks = data.get('tasks')
+        if tasks is None:
+            # Sequencers without batching return a single task
+            tasks = [data['task']] if data.get('task') else []
+        return tasks
+
+    async def _handle_task(self, agent_type: str, task_data: dict, fetched_at: float):
         """Handle a single task with concurrency control"""
         info = self.agents[agent_type]
         
-        async with info['semaphore']:
-            try:
-                # Create new agent instance for this task
-                agent = info['class']()
-                
-                # Execute task
-                result = await agent.handle_message(task_data['params'])
-                
+        try:
+            async with info['semaphore']:
+                TASK_PHASE_SECONDS.observe(time.monotonic() - fetched_at, agent_type=agent_type, phase="queue_wait")
+                info['running'] += 1
+                error = None
+                result = None
+                # LLM and API calls made by the agent add their time to the span's phases
+                with metrics.span(agent_type, trace_id=task_data['task_id'], agent_type=agent_type) as task_span:
+                    try:
+                        # Reuse a warm agent instance from the pool
+                        async with info['pool'].agent() as agent:
+                            result = await agent.handle_message(task_data['params'])
+                    except Exception as e:
+                        logger.error(f"Error processing task: {e}")
+                        error = str(e)
+                    finally:
+                        info['running'] -= 1
+
+                TASK_PHASE_SECONDS.observe(task_span.elapsed(), agent_type=agent_type, phase="execution")
+                for phase_name, seconds in task_span.phases.items():
+                    TASK_PHASE_SECONDS.observe(seconds, agent_type=agent_type, phase=phase_name)
+                TASKS_TOTAL.inc(agent_type=agent_type, status="error" if error else "success")
+
                 # Submit result
-                await self._submit_result(task_data['task_id'], result)
-                
-            except Exception as e:
-                logger.error(f"Error processing task: {e}")
-                await self._submit_result(
-                    task_data['task_id'],
-                    None,
-                    error=str(e)
-                )
-
-    async def _submit_result(self, task_id: str, result: dict, error: str = None):
-        """Submit task result to server"""
+                await self._submit_result(task_data['task_id'], result, error=error, agent_type=agent_type, fetched_at=fetched_at)
+        finally:
+            info['pending'] -= 1
+            info['slot_freed'].set()
+
+    async def _submit_result(self, task_id: str, result: dict, error: str = None, agent_type: str = None, fetched_at: float = None):
+        """Queue a task result for the next batched submission"""
+        now = time.monotonic()
+        self._submit_buffer.append({
+            "task_id": task_id,
+            "result": result,
+            "status": "error" if error else "success",
+            "error": error,
+            "_agent_type": agent_type,
+            "_queued_at": now,
+            "_fetched_at": fetched_at or now
+        })
+        if len(self._submit_buffer) >= self.submit_batch_size and self._submit_ready:
+            self._submit_ready.set()
+
+    async def _submit_loop(self):
+        """Flush buffered results when a batch fills up or submit_interval elapses"""
+        while True:
+            try:
+                await asyncio.wait_for(self._submit_ready.wait(), self.submit_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._submit_ready.clear()
+            await self._flush_results()
+
+    async def _flush_results(self, force: bool = False):
+        """Submit buffered results to server in batches, unless waiting out a retry backoff"""
+        if not force and time.monotonic() < self._submit_retry_at:
+            return
+        while self._submit_buffer:
+            batch = self._submit_buffer[:self.submit_batch_size]
+            del self._submit_buffer[:self.submit_batch_size]
+            try:
+                failed = await self._post_results(batch)
+            except asyncio.CancelledError:
+                # Stopped mid-request; keep the batch for the final flush
+                self._submit_buffer[:0] = batch
+                raise
+            submitted_at = time.monotonic()
+            failed_ids = {id(entry) for entry in failed}
+            for entry in batch:
+                if id(entry) not in failed_ids:
+                    TASK_PHASE_SECONDS.observe(submitted_at - entry['_queued_at'], agent_type=entry['_agent_type'], phase="submit")
+                    TASK_SECONDS.observe(submitted_at - entry['_fetched_at'], agent_type=entry['_agent_type'])
+            if not failed:
+                self._submit_backoff = 0.0
+                self._submit_retry_at = 0.0
+                continue
+            SUBMIT_FAILURES_TOTAL.inc()
+            now = time.monotonic()
+            retry = []
+            for entry in failed:
+                if now - entry['_queued_at'] < self.submit_retention:
+                    retry.append(entry)
+                else:
+                    logger.error(f"Dropping result of task {entry['task_id']} after failing to submit it for {self.submit_retention}s")
+            # Retry after a growing delay rather than spinning on a failing server
+            self._submit_buffer[:0] = retry
+            self._submit_backoff = min(SUBMIT_RETRY_MAX_BACKOFF, max(SUBMIT_RETRY_MIN_BACKOFF, self._submit_backoff * 2))
+            self._submit_retry_at = now + self._submit_backoff
+            break
+
+    async def _post_results(self, batch: List[dict]) -> List[dict]:
+        """Submit a batch of results; returns the entries that were not accepted"""
+        results = [{key: value for key, value in entry.items() if not key.startswith('_')} for entry in batch]
+        if self.batched_submit:
+            status = await self._post_submit({"miner_id": self.miner_id, "results": results})
+            if status == 200:
+                return []
+            if status is None or not 400 <= status < 500 or status == 429:
+                logger.error(f"Failed to submit results: {status}")
+                return batch
+            # Sequencers without batching reject the batched body; submit one result at a time
+            logger.warning(f"Sequencer rejected batched results ({status}), submitting them one at a time")
+            self.batched_submit = False
+
+        failed = []
+        for entry, result in zip(batch, results):
+            status = await self._post_submit(result)
+            if status != 200:
+                logger.error(f"Failed to submit result of task {entry['task_id']}: {status}")
+                failed.append(entry)
+        return failed
+
+    async def _post_submit(self, body: dict) -> Optional[int]:
+        """POST to /miner_submit; returns the response status, or None if the request failed"""
         try:
-            async with self.session.post(
-                f"{self.config['sequencer_url']}/miner_submit",
-                json={
-                    "task_id": task_id,
-                    "result": result,
-                    "status": "error" if error else "success",
-                    "error": error
-                }
-            ) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to submit result: {response.status}")
-                    
+            async with self.session.post(f"{self.config['sequencer_url']}/miner_submit", json=body) as response:
+                return response.status
         except Exception as e:
-            logger.error(f"Error submitting result: {e}")
+            logger.error(f"Error submitting results: {e}")
+            return None
     
     def get_status(self) -> dict:
-        """Get current status"""
+        """Get current status, with task counts, latency percentiles and mean time per phase"""
         return {
             agent_type: {
                 'max_concurrency': info['max_concurrency'],
-                'current_tasks': info['max_concurrency'] - info['semaphore']._value
+                'current_tasks': info['running'],
+                'pending_tasks': info['pending'],
+                'pool': info['pool'].stats(),
+                'tasks': {
+                    'success': TASKS_TOTAL.value(agent_type=agent_type, status="success"),
+                    'error': TASKS_TOTAL.value(agent_type=agent_type, status="error")
+                },
+                'latency': TASK_SECONDS.snapshot(agent_type=agent_type),
+                'phase_mean_seconds': {
+                    phase_name: TASK_PHASE_SECONDS.snapshot(agent_type=agent_type, phase=phase_name)['mean']
+                    for phase_name in ("queue_wait", "execution", "llm", "external_api", "submit")
+                }
             }
             for agent_type, info in self.agents.items()
         }
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from typing import Dict, List, Optional, Type
+
+from .mesh_manager import MeshManager
+
+logger = logging.getLogger(__name__)
+
+# How often workers publish their status to the supervisor, in seconds
+STATUS_INTERVAL = 1.0
+# Crashed workers are restarted after a delay doubling from the first to the second value
+RESTART_MIN_BACKOFF = 1.0
+RESTART_MAX_BACKOFF = 60.0
+# A worker that stays up this long is considered healthy again
+RESTART_RESET_AFTER = 60.0
+
+def _run_worker(index: int, config: dict, registrations: List[dict], stop_event, status_queue) -> None:
+    """Worker process entry point: run a MeshManager for a shard of agent types on its own event loop"""
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_worker_main(index, config, registrations, stop_event, status_queue))
+
+async def _worker_main(index: int, config: dict, registrations: List[dict], stop_event, status_queue) -> None:
+    manager = MeshManager(config)
+    for registration in registrations:
+        manager.register_agent(**registration)
+    await manager.start()
+    try:
+        while not stop_event.is_set():
+            status_queue.put((index, os.getpid(), manager.get_status()))
+            await asyncio.to_thread(stop_event.wait, STATUS_INTERVAL)
+    finally:
+        await manager.stop()
+        status_queue.put((index, os.getpid(), None))
+
+class MeshSupervisor:
+    """
+    Runs agent types across worker processes, each with its own MeshManager and event loop,
+    so CPU-heavy work in one agent cannot stall polling for the others.
+
+    Agent types are sharded over the workers to balance their total max_concurrency; a type
+    registered with replicas > 1 runs on that many workers, each long-polling for it
+    independently. Every worker gets the same config, with miner_id suffixed by the worker
+    index and metrics_port offset by it. Crashed workers are restarted with exponential
+    backoff, and left down after max_worker_crashes crashes in a row (config, default 5).
+    restart() replaces workers one at a time, letting running tasks finish.
+    """
+
+    def __init__(self, config: dict, workers: Optional[int] = None):
+        self.config = config
+        self.workers = workers or os.cpu_count() or 1
+        self.shutdown_timeout = config.get('shutdown_timeout', 30)
+        self.max_worker_crashes = config.get('max_worker_crashes', 5)
+        self._registrations: List[dict] = []
+        self._shards: List[List[dict]] = []
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._stop_events: list = []
+        self._stopping: set = set()
+        self._status: Dict[int, dict] = {}
+        self._pids: Dict[int, int] = {}
+        self._started_at: Dict[int, float] = {}
+        self._crashes: Dict[int, int] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._context = multiprocessing.get_context("spawn")
+        self._status_queue = None
+        self._monitor_task = None
+        self._shutdown = False
+
+    def register_agent(self, agent_class: Type['MeshAgent'], max_concurrency: int = 5, warm_instances: int = 1, replicas: int = 1):
+        """
+        Register an agent type; takes the same arguments as MeshManager.register_agent.
+        replicas runs the type on that many workers (at most one per worker), each with
+        max_concurrency of its own.
+        """
+        if replicas > self.workers:
+            logger.warning(f"{agent_class.__name__} asks for {replicas} replicas but there are {self.workers} workers")
+        self._registrations.append({
+            'agent_class': agent_class,
+            'max_concurrency': max_concurrency,
+            'warm_instances': warm_instances,
+            'replicas': max(1, min(replicas, self.workers))
+        })
+
+    def _shard(self) -> List[List[dict]]:
+        """Assign agent type replicas to workers, heaviest first onto the least loaded worker without that type"""
+        count = max(1, min(self.workers, sum(r['replicas'] for r in self._registrations)))
+        shards: List[List[dict]] = [[] for _ in range(count)]
+        loads = [0] * count
+        for registration in sorted(self._registrations, key=lambda r: r['max_concurrency'], reverse=True):
+            manager_registration = {key: value for key, value in registration.items() if key != 'replicas'}
+            for _ in range(registration['replicas']):
+                index = min((i for i in range(count) if manager_registration not in shards[i]), key=loads.__getitem__)
+                shards[index].append(manager_registration)
+                loads[index] += registration['max_concurrency']
+        return shards
+
+    def _spawn(self, index: int) -> None:
+        config = dict(self.config)
+        if config.get('miner_id'):
+            config['miner_id'] = f"{config['miner_id']}-{index}"
+        if config.get('metrics_port'):
+            # Each worker serves its own metrics on consecutive ports
+            config['metrics_port'] = config['metrics_port'] + index
+        stop_event = self._context.Event()
+        process = self._context.Process(
+            target=_run_worker,
+            args=(index, config, self._shards[index], stop_event, self._status_queue),
+            name=f"mesh-worker-{index}",
+            daemon=False
+        )
+        process.start()
+        self._processes[index] = process
+        self._stop_events[index] = stop_event
+        self._started_at[index] = time.monotonic()
+        agent_types = [r['agent_class'].__name__ for r in self._shards[index]]
+        logger.info(f"Started mesh worker {index} (pid {process.pid}) for {agent_types}")
+
+    async def _stop_worker(self, index: int) -> None:
+        """Ask a worker to finish its running tasks and exit, terminating it if it does not"""
+        process = self._processes[index]
+        if process is None:
+            return
+        self._stopping.add(index)
+        try:
+            self._stop_events[index].set()
+            await asyncio.to_thread(process.join, self.shutdown_timeout + 5)
+            if process.is_alive():
+                logger.warning(f"Mesh worker {index} did not stop in time, terminating")
+                process.terminate()
+                await asyncio.to_thread(process.join)
+            self._processes[index] = None
+            self._status.pop(index, None)
+        finally:
+            self._stopping.discard(index)
+
+    async def start(self):
+        """Start the worker processes and the monitor that restarts crashed workers"""
+        self._shutdown = False
+        self._shards = self._shard()
+        self._processes = [None] * len(self._shards)
+        self._stop_events = [None] * len(self._shards)
+        self._status_queue = self._context.Queue()
+        self._crashes.clear()
+        self._restart_at.clear()
+        for index in range(len(self._shards)):
+            self._spawn(index)
+        self._monitor_task = asyncio.create_task(self._monitor())
+        logger.info(f"MeshSupervisor started {len(self._shards)} workers")
+
+    async def stop(self):
+        """Gracefully stop all workers"""
+        self._shutdown = True
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.gather(*(self._stop_worker(index) for index in range(len(self._processes))))
+        logger.info("MeshSupervisor stopped")
+
+    async def restart(self):
+        """Rolling restart: replace workers one at a time so other shards keep serving"""
+        for index in range(len(self._processes)):
+            await self._stop_worker(index)
+            if not self._shutdown:
+                # Also brings back workers the monitor gave up on
+                self._crashes.pop(index, None)
+                self._restart_at.pop(index, None)
+                self._spawn(index)
+
+    async def _monitor(self):
+        while not self._shutdown:
+            self._drain_status()
+            now = time.monotonic()
+            for index, process in enumerate(self._processes):
+                if index in self._restart_at:
+                    if now >= self._restart_at[index]:
+                        del self._restart_at[index]
+                        self._spawn(index)
+                    continue
+                if process is None or index in self._stopping or process.is_alive():
+                    continue
+                self._status.pop(index, None)
+                if now - self._started_at.get(index, now) >= RESTART_RESET_AFTER:
+                    self._crashes[index] = 0
+                crashes = self._crashes[index] = self._crashes.get(index, 0) + 1
+                if crashes >= self.max_worker_crashes:
+                    logger.error(f"Mesh worker {index} exited with code {process.exitcode}, "
+                                 f"giving up after {crashes} crashes in a row")
+                    self._processes[index] = None
+                    continue
+                delay = min(RESTART_MAX_BACKOFF, RESTART_MIN_BACKOFF * 2 ** (crashes - 1))
+                logger.error(f"Mesh worker {index} exited with code {process.exitcode}, restarting in {delay:.0f}s")
+                self._restart_at[index] = now + delay
+            await asyncio.sleep(STATUS_INTERVAL)
+
+    def _drain_status(self) -> None:
+        while True:
+            try:
+                index, pid, status = self._status_queue.get_nowait()
+            except queue.Empty:
+                return
+            process = self._processes[index] if index < len(self._processes) else None
+            # Ignore late reports from a worker that has been replaced
+            if process is None or process.pid != pid:
+                continue
+            if status is None:
+                self._status.pop(index, None)
+            else:
+                self._status[index] = status
+                self._pids[index] = pid
+
+    def get_status(self) -> dict:
+        """
+        Get the status of every agent type across workers: task counts summed over its
+        replicas, and each replica's MeshManager.get_status entry by worker index
+        """
+        self._drain_status()
+        status = {}
+        for index, worker_status in sorted(self._status.items()):
+            for agent_type, info in worker_status.items():
+                entry = status.setdefault(agent_type, {'max_concurrency': 0, 'current_tasks': 0, 'pending_tasks': 0, 'workers': {}})
+                for key in ('max_concurrency', 'current_tasks', 'pending_tasks'):
+                    entry[key] += info[key]
+                entry['workers'][index] = {**info, 'pid': self._pids.get(index)}
+        return status
+
+# Usage Example
+# supervisor = MeshSupervisor({'sequencer_url': 'http://localhost:8000', 'miner_id': 'miner-1'}, workers=4)
+# supervisor.register_agent(ZkIgniteYieldAgent, max_concurrency=5)
+# supervisor.register_agent(TokenContractSecurityAgent, max_concurrency=10, replicas=2)
+# await supervisor.start()
+# print(supervisor.get_status())
+# # {'TokenContractSecurityAgent': {'max_concurrency': 20, ..., 'workers': {0: {..., 'pid': 4242}, 1: {...}}}, ...}
+# await supervisor.stop()
@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+import asyncio
+import fnmatch
+import tempfile
+import threading
+import time
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from core.cache import TTLCache, SQLiteCache, RedisCache
+from decorators import with_cache
+
+class LocalRedis:
+    """In-memory stand-in for a redis-py client, covering the calls RedisCache makes"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            value, expires_at = self._data.get(name, (None, None))
+            if expires_at is not None and time.time() >= expires_at:
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._data[name] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match="*"):
+        with self._lock:
+            keys = list(self._data)
+        return (key for key in keys if fnmatch.fnmatch(key, match))
+
+class PriceAgent:
+    calls = 0
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def fetch(self, token: str, timeframe: str = "5m"):
+        PriceAgent.calls += 1
+        await asyncio.sleep(0.05)
+        return {'token': token, 'timeframe': timeframe, 'price': 100}
+
+async def check_backend(cache) -> dict:
+    PriceAgent.calls = 0
+    fetch = with_cache(ttl_seconds=1, cache=cache)(PriceAgent.fetch)
+
+    # Concurrent calls from different instances share one upstream call
+    results = await asyncio.gather(*(fetch(PriceAgent(cache), 'ETH') for _ in range(10)))
+    assert all(result == results[0] for result in results)
+    assert PriceAgent.calls == 1, PriceAgent.calls
+
+    # Later calls are served from the cache until the TTL passes
+    await fetch(PriceAgent(cache), 'ETH')
+    assert PriceAgent.calls == 1, PriceAgent.calls
+    await asyncio.sleep(1.1)
+    await fetch(PriceAgent(cache), 'ETH')
+    assert PriceAgent.calls == 2, PriceAgent.calls
+    return cache.stats()
+
+def check_bounds(cache) -> dict:
+    for i in range(20):
+        cache.set(f"key-{i}", "x" * 1000)
+        cache.get("key-0")  # keep key-0 recently used
+    assert cache.get("key-0") is not None
+    assert cache.get("key-1") is None
+    return cache.stats()
+
+async def run_tests():
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            'memory': TTLCache(max_size=100, ttl_seconds=300, max_bytes=1024 * 1024),
+            'sqlite': SQLiteCache(str(Path(tmp) / "cache.sqlite3"), max_size=100, ttl_seconds=300),
+            'redis': RedisCache(LocalRedis(), prefix="test:")
+        }
+        for name, cache in backends.items():
+            print(name, await check_backend(cache))
+
+        print('memory bounds', check_bounds(TTLCache(max_size=10, ttl_seconds=300, max_bytes=8000)))
+        print('sqlite bounds', check_bounds(SQLiteCache(str(Path(tmp) / "bounded.sqlite3"), max_size=10, max_bytes=8000)))
+        backends['sqlite'].close()
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import List
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from clients import json_codec
+from clients.merkl_client import MerklOpportunity
+
+def synthetic_opportunities(count: int) -> bytes:
+    """Merkl-like /opportunities payload, for when no recorded payload is given"""
+    rng = random.Random(42)
+    tokens = [{'id': f"token-{i}", 'name': f"Token {i}", 'symbol': f"T{i}", 'address': f"0x{i:040x}",
+               'decimals': 18, 'icon': f"https://icons.example/{i}.png", 'verified': True, 'price': rng.random() * 100}
+              for i in range(50)]
+    items = []
+    for i in range(count):
+        items.append({
+            'chainId': 324,
+            'type': 'CLAMM',
+            'identifier': f"0x{i:040x}",
+            'name': f"Provide liquidity to Pool {i}",
+            'status': rng.choice(['LIVE', 'PAST']),
+            'action': 'POOL',
+            'tvl': rng.random() * 1e7,
+            'apr': rng.random() * 100,
+            'dailyRewards': rng.random() * 1e4,
+            'tags': ['zksync', 'ignite'],
+            'tokens': rng.sample(tokens, 2),
+            'protocol': {'id': f"protocol-{i % 20}", 'name': f"Protocol {i % 20}", 'icon': 'https://icons.example/p.png',
+                         'tags': ['DEX'], 'description': 'x' * 200},
+            'rewardsRecord': {'id': f"rr-{i}", 'total': rng.random() * 1e4, 'timestamp': 1700000000,
+                              'breakdowns': [{'token': rng.choice(tokens), 'amount': str(rng.randint(1, 10 ** 20)), 'value': rng.random() * 1e4}]},
+            'tvlRecord': {'id': f"tvl-{i}", 'total': rng.random() * 1e7,
+                          'breakdowns': [{'identifier': t['address'], 'value': rng.random() * 1e6, 'type': 'TOKEN'} for t in tokens[:8]]},
+            'aprRecord': {'cumulated': rng.random() * 100,
+                          'breakdowns': [{'identifier': f"campaign-{j}", 'value': rng.random() * 10, 'type': 'CAMPAIGN'} for j in range(6)]}
+        })
+    return json.dumps(items).encode("utf-8")
+
+def measure(label: str, decode, payload: bytes, repeat: int) -> dict:
+    decode(payload)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode(payload)
+    seconds = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    result = decode(payload)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return {'decoder': label, 'ms': round(seconds * 1000, 2), 'retained_kb': retained // 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON decoding of a large API payload")
+    parser.add_argument('--payload', type=Path, help="Recorded response body, e.g. Merkl /opportunities or DefiLlama /protocols")
+    parser.add_argument('--items', type=int, default=5000, help="Items in the synthetic payload when --payload is not given")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    payload = args.payload.read_bytes() if args.payload else synthetic_opportunities(args.items)
+    print(f"Payload: {len(payload) / 1024 / 1024:.1f} MB, fast decoder: {json_codec.BACKEND}, msgspec: {json_codec.msgspec is not None}")
+
+    results = [
+        measure('stdlib json', json.loads, payload, args.repeat),
+        measure(f"json_codec.loads ({json_codec.BACKEND})", json_codec.loads, payload, args.repeat),
+    ]
+    if not args.payload:
+        results.append(measure('json_codec.decode (projected)', lambda data: json_codec.decode(data, List[MerklOpportunity]), payload, args.repeat))
+    for result in results:
+        print(result)
+
+if __name__ == "__main__":
+    main()
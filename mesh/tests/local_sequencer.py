@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+import asyncio
+import time
+import uuid
+from collections import defaultdict, deque
+
+from aiohttp import web
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+class LocalSequencer:
+    """
+    In-process stand-in for the V2 Protocol sequencer, for testing MeshManager.
+
+    /miner_request hands out up to max_tasks queued tasks of an agent type and holds the
+    request for up to wait seconds while the queue is empty. With legacy=True it behaves
+    like a sequencer without batching: one task per request and no waiting.
+    /miner_submit accepts a batch ({"results": [...]}) or a single result; with legacy=True
+    it rejects batches with 400, like a sequencer that only knows the single-result body.
+    """
+
+    def __init__(self, legacy: bool = False):
+        self.legacy = legacy
+        self.queues = defaultdict(deque)
+        self.results = {}
+        self.requests = 0
+        self.submissions = 0
+        self.miner_ids = set()
+        self._arrivals = defaultdict(asyncio.Event)
+        self._runner = None
+
+    def enqueue(self, agent_type: str, params: dict) -> str:
+        task_id = str(uuid.uuid4())
+        self.queues[agent_type].append({'task_id': task_id, 'params': params})
+        self._arrivals[agent_type].set()
+        return task_id
+
+    async def miner_request(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests += 1
+        self.miner_ids.add(body.get('miner_id'))
+        agent_type = body['agent_type']
+        queue = self.queues[agent_type]
+
+        if self.legacy:
+            return web.json_response({'task': queue.popleft() if queue else None})
+
+        deadline = time.monotonic() + float(body.get('wait', 0))
+        while not queue and time.monotonic() < deadline:
+            arrival = self._arrivals[agent_type]
+            arrival.clear()
+            try:
+                await asyncio.wait_for(arrival.wait(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                pass
+        tasks = [queue.popleft() for _ in range(min(len(queue), int(body.get('max_tasks', 1))))]
+        return web.json_response({'tasks': tasks})
+
+    async def miner_submit(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.submissions += 1
+        if self.legacy and 'results' in body:
+            return web.json_response({'error': 'task_id is required'}, status=400)
+        for result in body.get('results', [body]):
+            self.results[result['task_id']] = result
+        return web.json_response({'status': 'ok'})
+
+    async def start(self, port: int = 8000) -> str:
+        app = web.Application()
+        app.router.add_post('/miner_request', self.miner_request)
+        app.router.add_post('/miner_submit', self.miner_submit)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, 'localhost', port).start()
+        return f"http://localhost:{port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+async def run_sequencer():
+    sequencer = LocalSequencer()
+    url = await sequencer.start()
+    print(f"Local sequencer listening on {url}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"requests={sequencer.requests} submissions={sequencer.submissions} results={len(sequencer.results)}")
+    finally:
+        await sequencer.stop()
+
+if __name__ == "__main__":
+    asyncio.run(run_sequencer())
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+import argparse
+import asyncio
+import time
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from mesh.mesh_agent import MeshAgent
+from mesh.mesh_manager import MeshManager
+from mesh.tests.local_sequencer import LocalSequencer
+
+class EchoAgent(MeshAgent):
+    """Agent that simulates an I/O bound task"""
+
+    latency = 0.02
+
+    async def handle_message(self, params):
+        await asyncio.sleep(self.latency)
+        return {'response': params.get('query')}
+
+async def run_benchmark(tasks: int, concurrency: int, legacy: bool, port: int) -> dict:
+    sequencer = LocalSequencer(legacy=legacy)
+    url = await sequencer.start(port)
+    manager = MeshManager({'sequencer_url': url, 'long_poll_seconds': 2})
+    manager.register_agent(EchoAgent, max_concurrency=concurrency, warm_instances=concurrency)
+    await manager.start()
+    try:
+        started = time.monotonic()
+        for i in range(tasks):
+            sequencer.enqueue('EchoAgent', {'query': f"task {i}"})
+        while len(sequencer.results) < tasks:
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - started
+    finally:
+        await manager.stop()
+        await sequencer.stop()
+    return {
+        'sequencer': 'legacy' if legacy else 'batched',
+        'tasks': tasks,
+        'seconds': round(elapsed, 3),
+        'tasks_per_second': round(tasks / elapsed, 1),
+        'fetch_requests': sequencer.requests,
+        'submit_requests': sequencer.submissions,
+        'miner_ids': len(sequencer.miner_ids)
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure MeshManager task throughput against a local sequencer")
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--port', type=int, default=8099)
+    args = parser.parse_args()
+
+    for legacy in (True, False):
+        print(await run_benchmark(args.tasks, args.concurrency, legacy, args.port))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+import asyncio
+import time
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from aiohttp import web
+from clients.binance_client import BinanceClient, PriceFeed
+from clients.session_manager import close_sessions
+
+class LocalBinance:
+    """Stand-in for the Binance REST endpoints and miniTicker stream used by BinanceClient"""
+
+    def __init__(self):
+        self.requests = {'ticker': 0, 'klines': 0}
+        self.prices = {'BTCUSDT': 65000.0, 'ETHUSDT': 3200.0}
+        self.app = web.Application()
+        self.app.router.add_get('/api/v3/ticker/price', self.ticker)
+        self.app.router.add_get('/api/v3/klines', self.klines)
+        self.app.router.add_get('/ws', self.stream)
+
+    async def ticker(self, request):
+        self.requests['ticker'] += 1
+        await asyncio.sleep(0.05)
+        symbol = request.query['symbol']
+        return web.json_response({'symbol': symbol, 'price': str(self.prices[symbol])})
+
+    async def klines(self, request):
+        self.requests['klines'] += 1
+        start = int(request.query['startTime'])
+        return web.json_response([[start, "1", "2", "0.5", "1.5", "10", start + 59999]])
+
+    async def stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        try:
+            while not ws.closed:
+                await ws.send_json([{'e': '24hrMiniTicker', 's': symbol, 'c': str(price + 1)} for symbol, price in self.prices.items()])
+                await asyncio.sleep(0.1)
+        except ConnectionResetError:
+            pass  # the client went away
+        return ws
+
+async def run_tests():
+    server = LocalBinance()
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        client = BinanceClient(base_url=f"http://127.0.0.1:{port}/api/v3")
+
+        # A burst of identical questions costs one upstream request
+        prices = await asyncio.gather(*(client.get_spot_price('BTCUSDT') for _ in range(50)))
+        assert set(prices) == {65000.0}
+        assert server.requests['ticker'] == 1, server.requests
+        await client.get_spot_price('BTCUSDT')
+        assert server.requests['ticker'] == 1, server.requests
+
+        # Closed klines are cached for good, the current one is not
+        past = int(time.time() * 1000) - 86_400_000
+        assert await client.get_historical_price('ETHUSDT', past) == 1.5
+        assert await client.get_historical_price('ETHUSDT', past) == 1.5
+        assert server.requests['klines'] == 1, server.requests
+        now = int(time.time() * 1000)
+        await client.get_historical_price('ETHUSDT', now)
+        await client.get_historical_price('ETHUSDT', now)
+        assert server.requests['klines'] == 3, server.requests
+
+        # With a feed, prices come from the local table
+        feed = PriceFeed(f"ws://127.0.0.1:{port}/ws", max_age=1)
+        feed_client = BinanceClient(base_url=f"http://127.0.0.1:{port}/api/v3", feed=feed)
+        feed.ensure_started()
+        await asyncio.sleep(0.3)
+        before = server.requests['ticker']
+        assert await feed_client.get_spot_price('ETHUSDT') == 3201.0
+        assert server.requests['ticker'] == before, server.requests
+
+        # A stalled feed falls back to REST
+        await feed_client.close()
+        await asyncio.sleep(1.1)
+        assert feed.get('ETHUSDT') is None
+        assert await feed_client.get_spot_price('ETHUSDT') == 3200.0
+        assert server.requests['ticker'] == before + 1, server.requests
+        await feed_client.close()
+        print('requests', server.requests, client.stats())
+    finally:
+        await close_sessions()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
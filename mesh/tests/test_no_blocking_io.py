@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+import ast
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+MESH_DIR = Path(__file__).parent.parent
+
+# Calls that block the event loop; a name matches itself and anything under it (e.g. requests.get)
+BLOCKING_CALLS = (
+    "requests",
+    "urllib.request.urlopen",
+    "urllib3",
+    "http.client",
+    "socket.create_connection",
+    "time.sleep",
+    "httpx.get", "httpx.post", "httpx.put", "httpx.patch", "httpx.delete", "httpx.head",
+    "httpx.request", "httpx.stream", "httpx.Client",
+    "subprocess.run", "subprocess.call", "subprocess.check_call", "subprocess.check_output",
+)
+
+def _import_aliases(tree: ast.Module) -> dict:
+    """Map local names to the dotted names they were imported as"""
+    aliases = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                aliases[alias.asname or alias.name.split('.')[0]] = alias.name if alias.asname else alias.name.split('.')[0]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+    return aliases
+
+def _dotted_name(node: ast.AST, aliases: dict) -> str:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return ""
+    parts.append(aliases.get(node.id, node.id))
+    return ".".join(reversed(parts))
+
+def _is_blocking(name: str) -> bool:
+    return any(name == call or name.startswith(call + ".") for call in BLOCKING_CALLS)
+
+def _coroutine_calls(function: ast.AsyncFunctionDef):
+    """Yield calls made directly in a coroutine body, skipping nested sync functions and lambdas"""
+    stack = list(function.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            continue
+        if isinstance(node, ast.Call):
+            yield node
+        stack.extend(ast.iter_child_nodes(node))
+
+def find_blocking_calls(path: Path) -> list:
+    """Return (line, coroutine, call) for each blocking call made inside a coroutine in path"""
+    tree = ast.parse(path.read_text(encoding='utf-8'), filename=str(path))
+    aliases = _import_aliases(tree)
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.AsyncFunctionDef):
+            for call in _coroutine_calls(node):
+                name = _dotted_name(call.func, aliases)
+                if _is_blocking(name):
+                    found.append((call.lineno, node.name, name))
+    return sorted(found)
+
+def test_no_blocking_io_in_mesh_coroutines():
+    violations = [
+        f"{path.relative_to(MESH_DIR.parent)}:{line} {name}() blocks the event loop in async def {coroutine}"
+        for path in sorted(MESH_DIR.glob("*.py"))
+        for line, coroutine, name in find_blocking_calls(path)
+    ]
+    assert not violations, "Blocking I/O in mesh coroutines:\n" + "\n".join(violations)
+
+if __name__ == "__main__":
+    try:
+        test_no_blocking_io_in_mesh_coroutines()
+        print("No blocking I/O found in mesh coroutines")
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
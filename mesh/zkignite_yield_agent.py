@@ -1,7 +1,8 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
+from contextlib import aclosing
 from .mesh_agent import MeshAgent, monitor_execution, with_retry, with_cache
 from core.llm import call_llm_async
-from clients.merkl_client import MerklClient
+from clients.merkl_client import MerklClient, MerklOpportunity
 
 system_prompt = '''You are a professional DeFi analyst. Based on the raw data list provided by the user, generate a concise and comprehensive overview of top 10 yield opportunities on ZKsync Era. These projects are participants of ZKIgnite program, which streams 300M ZK tokens over 9 months to DeFi users who provide liquidity for key token pairs, supply to lending markets, and trade on selected DeFi protocols. Each item in the list is a yield opportunity, which may be a DEX liquidity pool, or a lending market where user can supply assets to earn yields.
 
@@ -19,11 +20,14 @@ Requirements:
 - You must follow the data source provided, and do not make up any data
 '''
 
-def is_zk_rewards(item):
+# Opportunities passed to the LLM; enough to rank the top 10 by APR
+MAX_OPPORTUNITIES = 50
+
+def is_zk_rewards(item: MerklOpportunity):
     """Check if an opportunity has ZK token rewards"""
     ZK_TOKEN_ADDRESS = "0x5A7d6b2F92C77FAD6CCaBd7EE0624E64907Eaf3E".lower()
     
-    rewards_record = item.get('rewardsRecord', {})
+    rewards_record = item.rewardsRecord or {}
     breakdowns = rewards_record.get('breakdowns', [])
     
     for breakdown in breakdowns:
@@ -67,48 +71,58 @@ class ZkIgniteYieldAgent(MeshAgent):
     @with_cache(ttl_seconds=300)
     async def get_opportunities(self, chain_id: str, items: int) -> Dict:
         return await self._api_clients['merkl'].get_opportunities(chain_id=chain_id, items=items)
+
+    @monitor_execution()
+    @with_cache(ttl_seconds=300)
+    async def get_zk_opportunities(self, chain_id: str, limit: int) -> List[MerklOpportunity]:
+        """Collect up to `limit` live opportunities with ZK rewards, highest APR first, across pages"""
+        opportunities = []
+        # aclosing stops the pages still in flight as soon as we break out
+        async with aclosing(self._api_clients['merkl'].iter_opportunities(
+            chain_id=chain_id, status="LIVE", sort="apr", order="desc", item_schema=MerklOpportunity
+        )) as items:
+            async for item in items:
+                if item.protocol is None or item.status != 'LIVE' or not is_zk_rewards(item):
+                    continue
+                opportunities.append(item)
+                if len(opportunities) >= limit:
+                    break
+        return opportunities
     
     @monitor_execution()
     @with_retry(max_retries=3)
     async def handle_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
         data_to_analyze = []
         data_to_return = []
-        base_data = await self.get_opportunities(chain_id="324", items=100)
+        base_data = await self.get_zk_opportunities(chain_id="324", limit=MAX_OPPORTUNITIES)
         for item in base_data:
-            if 'protocol' not in item:
-                continue
-            if item['status'] != 'LIVE':
-                continue
-
-            if not is_zk_rewards(item):
-                continue
             # important: only select those fields that are needed
             data_to_analyze.append({
-                'protocol_name': item['protocol']['name'],
-                'opportunity_name': item['name'],
-                'apr': item['apr'],
-                'rewardsRecord': item['rewardsRecord'],
-                'protocol_icon': item['protocol']['icon']
+                'protocol_name': item.protocol.name,
+                'opportunity_name': item.name,
+                'apr': item.apr,
+                'rewardsRecord': item.rewardsRecord,
+                'protocol_icon': item.protocol.icon
             })
             tokens = []
-            if item['tokens']:
-                for token in item['tokens']:
+            if item.tokens:
+                for token in item.tokens:
                     tokens.append({
-                        'id': token['id'],
-                        'icon': token['icon'],
+                        'id': token.id,
+                        'icon': token.icon,
                     })
             protocol = {
-                'name': item['protocol']['name'],
-                'icon': item['protocol']['icon'],
+                'name': item.protocol.name,
+                'icon': item.protocol.icon,
             }
             
             data_to_return.append({
-                'name': item['name'].replace('Provide liquidity to ', '').replace('Supply ', '').replace(' ', '\n'),
+                'name': item.name.replace('Provide liquidity to ', '').replace('Supply ', '').replace(' ', '\n'),
                 'protocol': protocol,
-                'tvl': item['tvl'],
-                'apr': item['apr'],
-                'status': item['status'],
-                'dailyRewards': item['dailyRewards'],
+                'tvl': item.tvl,
+                'apr': item.apr,
+                'status': item.status,
+                'dailyRewards': item.dailyRewards,
                 'tokens': tokens
             })
 
@@ -1,6 +1,7 @@
 import json
 import logging
 from core.llm import call_llm
+from core.llm_router import TASK_CLASSIFICATION
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +37,9 @@ def should_ignore_message(
             system_prompt=system_prompt,
             user_prompt=message,
             temperature=temperature,
-            max_tokens=100
+            max_tokens=100,
+            use_cache=True,
+            task=TASK_CLASSIFICATION
         )
 
         # Extract JSON from code block if present